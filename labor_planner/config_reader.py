@@ -7,9 +7,13 @@ Configuration reader for YAML.
 
 """
 
+import copy
 import os
 import yaml
 
+from labor_planner.pivot import DIMENSIONS
+from labor_planner.probability_tiers import DEFAULT_TIER_NAMES, DEFAULT_TIER_EDGES, DEFAULT_TIER_HEADERS
+
 
 class ReadConfig:
     """Configuration reader for YAML.
@@ -19,12 +23,52 @@ class ReadConfig:
     :param config_file:         Full path with file name and extension to the input YAML configuration file.
     :type config_file:          str
 
+    :param validate:            True to only validate the staff workbooks; overrides `validate_workbooks` in
+                                the configuration file when set.
+    :type validate:             bool
+
     Attributes:
         in_dir (str):           Full path to the directory containing the staff Excel spreadsheets.
         out_dir (str):          Full path to the output directory.
         in_staff_csv (str):     Full path with file name and extension to the staff list CSV file.
         in_work_hours (str):    Full path with file name and extension to the work hours CSV file.
         fiscal_year (int):      Fiscal year in format YYYY
+        designs (list):         Run designs to write outputs for
+        design (str):           Run design of the outputs written with this configuration; the first design
+                                in `designs`
+        link_mode (str):        How staff workbooks are created from the rendered template; 'copy', 'hardlink',
+                                or 'reflink'
+        build_jobs (int):       Number of worker processes used to write workbooks that differ per staff member
+        team_column (str):      Staff file column naming the manager whose workbook lists each staff member or
+                                None to list the full roster in every workbook
+        free_staff_rows (int):  Number of blank rows to add staff by name on each worksheet of a team workbook
+        update_existing (bool): Update existing staff workbooks to the staff file, keeping entered hours, rather
+                                than overwriting them
+        rollover_from (str):    Full path to this year's staff workbook directory or to a rollover snapshot CSV
+                                file to carry projects into the workbooks built, or None
+        rollover_months (int):  Number of trailing months of hours carried from this year's workbooks
+        rollover_snapshot (str): Full path to the CSV file the rollover projects read from workbooks are saved
+                                to, or None
+        jobs (int):             Number of worker processes used to read staff workbooks
+        reader (str):           Backend used to read staff workbooks; either 'xlrd' or 'stream'
+        cache_dir (str):        Full path to the ingest cache directory or None to disable caching
+        validate (bool):        Only validate the staff workbooks
+        source_links (bool):    Add a column linking each row of the individual and project outputs to its
+                                source worksheet
+        funding_scenarios (int): Number of Monte Carlo funding outcomes to draw; 0 to skip the funding
+                                scenarios workbook
+        scenario_seed (int):    Seed for repeatable funding scenarios or None
+        tier_names (list):      Names of the funding probability tiers from most to least likely
+        tier_edges (list):      Descending funding probability edges between the tiers
+        tier_headers (list):    Overview column header of each tier
+        custom_tiers (bool):    True if the funding probability tiers differ from the default 50% split
+        rebalance (bool):       Write the rebalancing workbook of proposed hour transfers
+        allocation_cap (float): Proportion of the monthly available hours a staff member can be allocated
+        coverage_target (float): Proportion of the monthly available hours below which staff are under target
+        staff_caps_file (str):  Full path to the optional CSV file of per person caps and eligibility or None
+        rebalance_min_probability (float): Only move hours on projects with at least this funding probability
+        manager_rollups (bool): Write a rollup worksheet for every manager from the staff file supervisors
+        pivots (list):          Lists of dimensions to group hours and coverage by in the pivots workbook
 
     """
 
@@ -34,13 +78,20 @@ class ReadConfig:
     PROJECT_KEY_REQ = ['input_directory', 'staff_file', 'work_hours_csv', 'fiscal_year', 'staff_workbook_dir']
     BUILDER_KEY_REQ = ['num_blank_wksheets']
     PLANNER_KEY_REQ = ['output_directory', 'run_design']
+    READERS = ('xlrd', 'stream')
+    LINK_MODES = ('copy', 'hardlink', 'reflink')
+    DESIGNS = ('full_year', 'quarter_2_3_4', 'quarter_2_3', 'quarter_2', 'quarter_3_4_1', 'quarter_3_4')
 
-    def __init__(self, config_file):
+    def __init__(self, config_file, validate=False):
 
         d = self.read_yaml(config_file)
 
+        # only check the staff workbooks for data problems; no workbooks or outputs are built
+        self.validate = validate or self.check_bool('validate_workbooks',
+                                                    d.get('project', {}).get('validate_workbooks', False))
+
         # ensure all needed content is in the configuration file
-        self.check_content(d)
+        self.check_content(d, self.validate)
 
         # project level settings
         project = d['project']
@@ -67,23 +118,144 @@ class ReadConfig:
 
             self.num_blank_wksheets = int(builder['num_blank_wksheets'])
 
-        if self.plan:
+            # how workbooks after the first are created from the rendered template
+            self.link_mode = self.check_link_mode(builder.get('link_mode', 'copy'))
+
+            # number of worker processes used to write workbooks that differ per staff member
+            self.build_jobs = self.check_jobs(builder.get('jobs', 1))
+
+            # list only each manager's team from this staff file column, plus free rows to add other staff
+            self.team_column = builder.get('team_column', None)
+            self.free_staff_rows = self.check_free_rows(builder.get('free_staff_rows', 5))
+
+            # only create workbooks for new staff and rewrite workbooks whose staff rows changed
+            self.update_existing = self.check_bool('update_existing', builder.get('update_existing', False))
+
+            # carry the projects of this year's workbooks, or of a saved snapshot, into each owner's workbook
+            self.rollover_from = builder.get('rollover_from', None)
+            self.rollover_months = self.check_rollover_months(builder.get('rollover_months', 0))
+            self.rollover_snapshot = builder.get('rollover_snapshot', None)
+
+            if self.rollover_from is not None:
+                if os.path.splitext(self.rollover_from)[-1].lower() == '.csv':
+                    self.check_file(self.rollover_from)
+                elif not os.path.isdir(self.rollover_from):
+                    raise NotADirectoryError(self.rollover_from)
+
+        if self.plan or self.validate:
 
             planner = d['planner']
 
             self.out_dir = self.check_directory(planner['output_directory'])
-            self.design = planner['run_design']
+
+            # one or more run designs; outputs for each design go to their own subdirectory when there are several
+            self.designs = self.check_designs(planner['run_design'])
+            self.design = self.designs[0]
+
+            # number of worker processes used to read staff workbooks; defaults to a serial run
+            self.jobs = self.check_jobs(planner.get('jobs', 1))
+
+            # backend used to read staff workbooks; either 'xlrd' or 'stream'
+            self.reader = self.check_reader(planner.get('reader', 'xlrd'))
+
+            # directory for the ingest cache of parsed staff workbooks; None disables the cache
+            self.cache_dir = planner.get('cache_directory', None)
+
+            # link rows of the individual and project outputs to the staff workbook sheet they were read from
+            self.source_links = self.check_bool('source_links', planner.get('source_links', False))
+
+            # number of funding outcomes drawn for the funding scenarios workbook; 0 does not write it
+            self.funding_scenarios = self.check_scenarios(planner.get('funding_scenarios', 0))
+            self.scenario_seed = planner.get('scenario_seed', None)
+
+            # funding probability tiers; defaults to splitting projects at 50%
+            self.tier_names, self.tier_edges = self.check_tiers(planner.get('probability_tiers', None),
+                                                                planner.get('probability_edges', None))
+
+            if self.tier_names == list(DEFAULT_TIER_NAMES):
+                self.tier_headers = list(DEFAULT_TIER_HEADERS)
+            else:
+                self.tier_headers = self.tier_names
+
+            self.custom_tiers = (self.tier_names, self.tier_edges) != (list(DEFAULT_TIER_NAMES),
+                                                                       list(DEFAULT_TIER_EDGES))
+
+            # propose hour transfers between staff on the same project for staff over their cap
+            self.rebalance = self.check_bool('rebalance', planner.get('rebalance', False))
+            self.allocation_cap = self.check_proportion('allocation_cap', planner.get('allocation_cap', 1.0))
+            self.coverage_target = self.check_proportion('coverage_target', planner.get('coverage_target', 0.8))
+            self.rebalance_min_probability = self.check_proportion('rebalance_min_probability',
+                                                                   planner.get('rebalance_min_probability', 0.0))
+
+            self.staff_caps_file = planner.get('staff_caps_file', None)
+            if self.staff_caps_file is not None:
+                self.staff_caps_file = self.check_file(self.staff_caps_file)
+
+            # rollup of every manager's team from the `supervisor` column of the staff file
+            self.manager_rollups = self.check_bool('manager_rollups', planner.get('manager_rollups', False))
+
+            # groupings of hours and coverage by client, manager, tier, quarter, staff, or project
+            self.pivots = self.check_pivots(planner.get('pivots', None))
 
             # output files
-            self.out_overview_file = os.path.join(self.out_dir, "overview_chart.xlsx")
-            self.out_individ_file = os.path.join(self.out_dir, "individual_staff_summary.xlsx")
-            self.out_rollup_file = os.path.join(self.out_dir, "rollup.xlsx")
-            self.out_project_file = os.path.join(self.out_dir, "projects.xlsx")
-            self.out_summary_file = os.path.join(self.out_dir, "summary.xlsx")
+            self.set_output_files(self.out_dir)
 
         # get last two digits of the fiscal year as a string
         self.fy = str(self.fiscal_year)[-2:]
 
+    def set_output_files(self, out_dir):
+        """Set the full path of each output file.
+
+        :param out_dir:     Full path to the directory the outputs are written to.
+        :type out_dir:      str
+
+        """
+        self.out_overview_file = os.path.join(out_dir, "overview_chart.xlsx")
+        self.out_individ_file = os.path.join(out_dir, "individual_staff_summary.xlsx")
+        self.out_rollup_file = os.path.join(out_dir, "rollup.xlsx")
+        self.out_project_file = os.path.join(out_dir, "projects.xlsx")
+        self.out_summary_file = os.path.join(out_dir, "summary.xlsx")
+        self.out_validation_file = os.path.join(out_dir, "validation_report.csv")
+        self.out_scenario_file = os.path.join(out_dir, "funding_scenarios.xlsx")
+        self.out_what_if_file = os.path.join(out_dir, "what_if.xlsx")
+        self.out_rebalance_file = os.path.join(out_dir, "rebalance.xlsx")
+        self.out_manager_rollup_file = os.path.join(out_dir, "manager_rollup.xlsx")
+        self.out_pivot_file = os.path.join(out_dir, "pivots.xlsx")
+
+    def for_design(self, design, subdirectory=True):
+        """Create a copy of the configuration for a single run design.
+
+        :param design:      Run design name.
+        :type design:       str
+
+        :param subdirectory: True to write outputs to a subdirectory of the output directory named by the design.
+        :type subdirectory: bool
+
+        :return:            ReadConfig object
+        """
+        design_config = copy.copy(self)
+        design_config.design = design
+
+        if subdirectory:
+            out_dir = os.path.join(self.out_dir, design)
+
+            if not os.path.isdir(out_dir):
+                os.makedirs(out_dir)
+
+            design_config.set_output_files(out_dir)
+
+        return design_config
+
+    def design_configs(self):
+        """Get a configuration for each run design.  A single design writes to the output directory itself.
+
+        :return:            List of ReadConfig objects
+        """
+        if len(self.designs) == 1:
+            return [self]
+
+        return [self.for_design(design) for design in self.designs]
+
     @staticmethod
     def check_file(f):
         """Check the existence of a file.
@@ -98,6 +270,213 @@ class ReadConfig:
         else:
             raise FileNotFoundError(f)
 
+    @staticmethod
+    def check_jobs(n):
+        """Validate the number of worker processes.
+
+        :param n:           Number of worker processes.  Values less than 1 use all available CPUs.
+        :type n:            int
+
+        :return:            Number of worker processes.
+        """
+        if type(n) is not int:
+            raise TypeError("'jobs' value is type {}. Must be an integer.".format(type(n)))
+
+        if n < 1:
+            return os.cpu_count() or 1
+
+        return n
+
+    @staticmethod
+    def check_free_rows(n):
+        """Validate the number of free staff rows.
+
+        :param n:           Number of blank rows to add staff by name.
+        :type n:            int
+
+        :return:            Number of blank rows.
+        """
+        if type(n) is not int:
+            raise TypeError("'free_staff_rows' value is type {}. Must be an integer.".format(type(n)))
+
+        if n < 0:
+            raise ValueError("'free_staff_rows' value {} not valid. Must be 0 or greater.".format(n))
+
+        return n
+
+    @staticmethod
+    def check_rollover_months(n):
+        """Validate the number of trailing months of hours carried by a rollover.
+
+        :param n:           Number of months.
+        :type n:            int
+
+        :return:            Number of months.
+        """
+        if type(n) is not int:
+            raise TypeError("'rollover_months' value is type {}. Must be an integer.".format(type(n)))
+
+        if not 0 <= n <= 12:
+            raise ValueError("'rollover_months' value {} not valid. Must be from 0 to 12.".format(n))
+
+        return n
+
+    @staticmethod
+    def check_scenarios(n):
+        """Validate the number of funding scenarios.
+
+        :param n:           Number of funding outcomes to draw.
+        :type n:            int
+
+        :return:            Number of funding outcomes to draw.
+        """
+        if type(n) is not int:
+            raise TypeError("'funding_scenarios' value is type {}. Must be an integer.".format(type(n)))
+
+        if n < 0:
+            raise ValueError("'funding_scenarios' value {} not valid. Must be 0 or greater.".format(n))
+
+        return n
+
+    @staticmethod
+    def check_tiers(names, edges):
+        """Validate the funding probability tiers.
+
+        :param names:       Tier names from most to least likely or None for the default tiers.
+        :type names:        list
+
+        :param edges:       Descending probability edges between the tiers; one less than the number of names.
+        :type edges:        list
+
+        :return:            [0] list of tier names
+                            [1] list of tier edges
+        """
+        if names is None and edges is None:
+            return list(DEFAULT_TIER_NAMES), list(DEFAULT_TIER_EDGES)
+
+        if type(names) is not list or type(edges) is not list:
+            raise TypeError("'probability_tiers' and 'probability_edges' must both be lists.")
+
+        if len(names) < 2 or len(edges) != len(names) - 1:
+            raise ValueError("'probability_edges' must have one value less than the {} 'probability_tiers'.".format(
+                len(names)))
+
+        edges = [float(i) for i in edges]
+
+        if any(lo >= hi for hi, lo in zip(edges, edges[1:])) or edges[0] > 1 or edges[-1] < 0:
+            raise ValueError("'probability_edges' {} must be descending values between 0 and 1.".format(edges))
+
+        return [str(i) for i in names], edges
+
+    @staticmethod
+    def check_proportion(key, v):
+        """Validate a proportion setting.
+
+        :param key:         Name of the setting.
+        :type key:          str
+
+        :param v:           Setting value; 1.0 is 100%.
+        :type v:            float
+
+        :return:            Setting value as a float.
+        """
+        if type(v) not in (int, float) or v < 0:
+            raise ValueError("'{}' value '{}' not valid. Must be a number of 0 or greater.".format(key, v))
+
+        return float(v)
+
+    @staticmethod
+    def check_pivots(pivots):
+        """Validate the pivot groupings.
+
+        :param pivots:      List of pivots, each a list of dimension names, or None for no pivots.
+        :type pivots:       list
+
+        :return:            List of pivots.
+        """
+        if pivots is None:
+            return []
+
+        if type(pivots) is not list or any(type(p) is not list or len(p) == 0 for p in pivots):
+            raise TypeError("'pivots' must be a list of lists of dimension names.")
+
+        for p in pivots:
+            for dim in p:
+                if dim not in DIMENSIONS:
+                    raise ValueError("'pivots' dimension '{}' not valid. Must be one of {}.".format(dim, DIMENSIONS))
+
+            if len(set(p)) != len(p):
+                raise ValueError("'pivots' grouping {} repeats a dimension.".format(p))
+
+        return pivots
+
+    @staticmethod
+    def check_bool(key, v):
+        """Validate a True/False setting.
+
+        :param key:         Name of the setting.
+        :type key:          str
+
+        :param v:           Setting value.
+        :type v:            bool
+
+        :return:            Setting value.
+        """
+        if type(v) is not bool:
+            raise TypeError("'{}' value is type {}. Must be True or False.".format(key, type(v)))
+
+        return v
+
+    @staticmethod
+    def check_designs(designs):
+        """Validate the run designs.
+
+        :param designs:     Run design name or list of names.
+        :type designs:      str, list
+
+        :return:            List of run design names.
+        """
+        if isinstance(designs, str):
+            designs = [designs]
+
+        if len(designs) == 0:
+            raise ValueError("'run_design' must name at least one design.")
+
+        for design in designs:
+            if design not in ReadConfig.DESIGNS:
+                raise ValueError("'run_design' value '{}' not valid. Must be one of {}.".format(design,
+                                                                                            ReadConfig.DESIGNS))
+
+        return list(designs)
+
+    @staticmethod
+    def check_reader(r):
+        """Validate the workbook reader backend.
+
+        :param r:           Reader backend name.
+        :type r:            str
+
+        :return:            Reader backend name.
+        """
+        if r not in ReadConfig.READERS:
+            raise ValueError("'reader' value '{}' not valid. Must be one of {}.".format(r, ReadConfig.READERS))
+
+        return r
+
+    @staticmethod
+    def check_link_mode(m):
+        """Validate how staff workbooks are created from the template.
+
+        :param m:           Link mode name.
+        :type m:            str
+
+        :return:            Link mode name.
+        """
+        if m not in ReadConfig.LINK_MODES:
+            raise ValueError("'link_mode' value '{}' not valid. Must be one of {}.".format(m, ReadConfig.LINK_MODES))
+
+        return m
+
     @staticmethod
     def check_directory(pth):
         """Check the existence of a file.
@@ -170,10 +549,11 @@ class ReadConfig:
             raise KeyError(subcat_msg.format(key, key_valid))
 
     @classmethod
-    def check_content(cls, d):
+    def check_content(cls, d, validate=False):
         """Ensure all desired parameters have been defined in the configuration file.
 
         :param d:                   Input config_obj object
+        :param validate:            True if the planner settings are needed to validate the staff workbooks
 
         """
 
@@ -185,5 +565,5 @@ class ReadConfig:
             cls.check_section_content(d, cls.BUILDER_KEY, cls.BUILDER_KEY_REQ)
 
         # validate planner level settings
-        if d[cls.PROJECT_KEY]['run_labor_planner'] is True:
+        if d[cls.PROJECT_KEY]['run_labor_planner'] is True or validate:
             cls.check_section_content(d, cls.PLANNER_KEY, cls.PLANNER_KEY_REQ)
@@ -0,0 +1,152 @@
+"""funding_scenarios.py
+
+Probability weighted expected hours and Monte Carlo funding scenarios.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import numpy as np
+
+
+# percentiles of the scenario distributions that are reported
+PERCENTILES = (10, 50, 90)
+
+
+class FundingScenarios:
+    """Draw funding outcomes for every project from its funding probability and summarize the hours covered.
+
+    Each draw funds a project with the probability declared on its worksheet; the hours of funded projects
+    are summed per staff member over the design term and over the staff per month.  Draws are made in chunks
+    as a (draws, projects) matrix so that all projects of a chunk are sampled and reduced with two matrix
+    products.  The funded projects of every draw are kept so the hours of each staff member per month can be
+    reduced later.
+
+    :param cube:                        HoursCube of staff hours per project and month
+    :param n_draws:                     Number of funding outcomes to draw
+    :param staff_codes:                 Optional staff codes to report; all staff when None.  Staff results
+                                        are in this order and month results sum over these staff.
+    :param seed:                        Optional seed for repeatable draws
+    :param chunk_size:                  Number of draws made at once; bounds memory use
+
+    """
+
+    def __init__(self, cube, n_draws, staff_codes=None, seed=None, chunk_size=1000):
+
+        if staff_codes is None:
+            staff_codes = np.arange(cube.n_staff)
+
+        self.staff_codes = np.asarray(staff_codes, dtype=np.int64)
+        self.n_draws = n_draws
+        self.n_months = cube.n_months
+
+        # position of each reported staff member; -1 for staff that are not reported
+        position = np.full(cube.n_staff, -1, dtype=np.int64)
+        position[self.staff_codes] = np.arange(len(self.staff_codes))
+
+        entry_position = position[cube.entry_staff]
+        keep = entry_position >= 0
+
+        self.entry_project = entry_project = cube.entry_project[keep]
+        self.entry_position = entry_position = entry_position[keep]
+        self.entry_hours = entry_hours = cube.entry_hours[keep]
+
+        # hours per project for each reported staff member over the design term and for each month
+        self.project_staff_hours = np.zeros((cube.n_projects, len(self.staff_codes)), dtype=np.float32)
+        np.add.at(self.project_staff_hours, (entry_project, entry_position), entry_hours.sum(axis=1))
+
+        self.project_month_hours = np.zeros((cube.n_projects, cube.n_months), dtype=np.float32)
+        np.add.at(self.project_month_hours, entry_project, entry_hours)
+
+        # probability weighted hours per reported staff member and month
+        self.expected_staff_month = np.zeros((len(self.staff_codes), cube.n_months), dtype=np.float64)
+        np.add.at(self.expected_staff_month, entry_position,
+                  entry_hours * cube.project_probability[entry_project][:, None])
+
+        # hours covered in each draw per staff member over the design term and per month for the reported staff
+        self.staff_draws = np.empty((n_draws, len(self.staff_codes)), dtype=np.float32)
+        self.month_draws = np.empty((n_draws, cube.n_months), dtype=np.float32)
+
+        # projects funded in each draw
+        self.funded = np.empty((n_draws, cube.n_projects), dtype=bool)
+
+        rng = np.random.default_rng(seed)
+
+        for start in range(0, n_draws, chunk_size):
+            stop = min(start + chunk_size, n_draws)
+
+            self.funded[start:stop] = rng.random((stop - start, cube.n_projects)) < cube.project_probability
+
+            funded = self.funded[start:stop].astype(np.float32)
+
+            self.staff_draws[start:stop] = funded @ self.project_staff_hours
+            self.month_draws[start:stop] = funded @ self.project_month_hours
+
+    @property
+    def expected_staff(self):
+        """Probability weighted hours per staff member over the design term."""
+
+        return self.expected_staff_month.sum(axis=1)
+
+    @property
+    def expected_month(self):
+        """Probability weighted hours per month summed over staff."""
+
+        return self.expected_staff_month.sum(axis=0)
+
+    def staff_percentiles(self, percentiles=PERCENTILES):
+        """Percentiles of the hours covered per staff member over the design term.
+
+        :param percentiles:             Percentiles to compute
+
+        :return:                        Array with shape (staff, percentiles)
+
+        """
+        return np.percentile(self.staff_draws, percentiles, axis=0).T
+
+    def month_percentiles(self, percentiles=PERCENTILES):
+        """Percentiles of the hours covered per month, summed over staff.
+
+        :param percentiles:             Percentiles to compute
+
+        :return:                        Array with shape (months, percentiles)
+
+        """
+        return np.percentile(self.month_draws, percentiles, axis=0).T
+
+    def staff_month_percentiles(self, percentiles=PERCENTILES):
+        """Percentiles of the hours covered per staff member and month.  The draws of each staff member are
+        summed over only the projects they have hours on, so the cost follows the entries rather than the
+        full staff x project matrix.
+
+        :param percentiles:             Percentiles to compute
+
+        :return:                        Array with shape (staff, months, percentiles)
+
+        """
+        n_staff = len(self.staff_codes)
+
+        result = np.zeros((n_staff, self.n_months, len(percentiles)), dtype=np.float64)
+
+        # entries of each reported staff member
+        order = np.argsort(self.entry_position, kind='stable')
+        bounds = np.searchsorted(self.entry_position[order], np.arange(n_staff + 1))
+
+        for position in range(n_staff):
+            rows = order[bounds[position]:bounds[position + 1]]
+
+            if rows.size == 0:
+                continue
+
+            # hours per month on each project of the staff member
+            projects, project_rows = np.unique(self.entry_project[rows], return_inverse=True)
+
+            hours = np.zeros((len(projects), self.n_months), dtype=np.float32)
+            np.add.at(hours, project_rows, self.entry_hours[rows])
+
+            draws = self.funded[:, projects].astype(np.float32) @ hours
+
+            result[position] = np.percentile(draws, percentiles, axis=0).T
+
+        return result
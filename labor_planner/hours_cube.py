@@ -0,0 +1,638 @@
+"""hours_cube.py
+
+Columnar staff x project x month hours.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import collections
+import copy
+
+import numpy as np
+
+from labor_planner.probability_tiers import assign_tiers, DEFAULT_TIER_EDGES
+
+
+# client, start and end dates, and funding amount of a project from rows 5-7 of its worksheet; dates are ISO
+#  formatted when entered as Excel dates and as entered otherwise
+ProjectDetails = collections.namedtuple('ProjectDetails', ['client', 'start_date', 'end_date', 'funding'])
+
+# details of a project without them
+NO_DETAILS = ProjectDetails('', '', '', 0.0)
+
+# metadata of a single project; `file` and `sheet` are the worksheet the project was first read from
+ProjectMeta = collections.namedtuple('ProjectMeta', ['prj_id', 'title', 'manager', 'probability', 'file', 'sheet',
+                                                     'client', 'start_date', 'end_date', 'funding'])
+
+# location of the staff row an entry was read from; row is one-based as shown in Excel
+Lineage = collections.namedtuple('Lineage', ['file', 'sheet', 'row'])
+
+# worksheet that declares a project ID already read with a different funding probability
+ProjectConflict = collections.namedtuple('ProjectConflict', ['prj_id', 'probability', 'file', 'sheet',
+                                                             'first_probability', 'first_file', 'first_sheet'])
+
+
+class HoursCube:
+    """Columnar store of staff hours per project and month.
+
+    Staff and projects are integer coded.  Each entry is one staff row of a project worksheet and holds the
+    staff code, the project code, and a dense row of hours for each month read.  Project metadata is stored
+    once per project in a table indexed by project code; the first worksheet read for a project sets its
+    metadata and any later worksheet declaring a different probability is recorded in `conflicts`.  The
+    workbook, worksheet, and row of each entry are kept as integer columns for drill-down to source cells.
+
+    :param staff_list:                  List of staff full names; staff codes are their roster positions
+    :param n_months:                    Number of months on the month axis
+
+    Attributes:
+        staff_names (list):             Staff axis labels
+        staff_index (dict):             {staff_name: staff code}
+        project_ids (list):             Project axis labels
+        project_index (dict):           {project_id: project code}
+        project_title (list):           Project title as entered on the worksheet; may be empty
+        project_manager (list):         Project manager
+        project_probability (ndarray):  Funding probability from 0.0 to 1.0 for each project
+        project_source (list):          Source code of the worksheet the metadata of each project was read from
+        sources (list):                 (file, sheet) for each source code
+        conflicts (list):               ProjectConflict for each worksheet that disagrees on a probability
+        staff_listed (list):            Staff codes listed on any worksheet, with or without hours, in order of
+                                        first appearance
+        listed_projects (dict):         {prj_id: ProjectMeta} of every project with listed staff, with or without
+                                        hours, in order of first appearance; the metadata of the first worksheet
+                                        that lists the project is kept
+        declared_projects (set):        Identifiers of listed projects declared by a project, proposal, or work
+                                        package number on a worksheet
+        blank_staff (ndarray):          int32 staff code of each listed row without hours
+        blank_project (list):           Project identifier of each listed row without hours
+        blank_probability (ndarray):    Funding probability of each listed row without hours
+        blank_position (ndarray):       int64 number of entries added before each listed row without hours
+        entry_staff (ndarray):          int32 staff code for each entry
+        entry_project (ndarray):        int32 project code for each entry
+        entry_hours (ndarray):          int32 hours with shape (entries, months)
+        entry_source (ndarray):         int32 source code for each entry
+        entry_row (ndarray):            int32 one-based worksheet row for each entry
+
+    """
+
+    def __init__(self, staff_list, n_months):
+
+        self.n_months = n_months
+
+        self.staff_names = list(staff_list)
+        self.staff_index = {}
+        for idx, nm in enumerate(self.staff_names):
+            self.staff_index.setdefault(nm, idx)
+
+        self.project_ids = []
+        self.project_index = {}
+        self.project_title = []
+        self.project_manager = []
+        self.project_probability = []
+        self.project_source = []
+        self.project_details = []
+
+        # worksheets entries were read from; {(file, sheet): source code}
+        self.sources = []
+        self.source_index = {}
+
+        # [ProjectConflict, ...] and the (project identifier, source code) already reported
+        self.conflicts = []
+        self._conflict_keys = set()
+
+        # staff listed on a worksheet; rows without hours are not stored as entries but the staff still count
+        self.staff_listed = []
+        self._is_listed = np.zeros(self.n_staff, dtype=bool)
+
+        # projects and staff rows listed without hours; only counted by the dictionary views
+        self.listed_projects = collections.OrderedDict()
+        self.declared_projects = set()
+        self.blank_staff = []
+        self.blank_project = []
+        self.blank_probability = []
+        self.blank_position = []
+
+        # entries are gathered in lists until `finalize` converts them to arrays
+        self.entry_staff = []
+        self.entry_project = []
+        self.entry_hours = []
+        self.entry_source = []
+        self.entry_row = []
+
+    @property
+    def n_staff(self):
+        return len(self.staff_names)
+
+    @property
+    def n_projects(self):
+        return len(self.project_ids)
+
+    @property
+    def n_entries(self):
+        return len(self.entry_staff)
+
+    def add_source(self, file, sheet):
+        """Get the code for a worksheet, adding it to the source table the first time it is seen.
+
+        :return:                        Source code
+
+        """
+        code = self.source_index.get((file, sheet))
+
+        if code is None:
+            code = len(self.sources)
+            self.source_index[(file, sheet)] = code
+            self.sources.append((file, sheet))
+
+        return code
+
+    def first_declaration(self, prj_id):
+        """Funding probability and worksheet of the first declaration of a project; the first worksheet that lists
+        it, with or without hours.
+
+        :return:                        (probability, file, sheet) or None for a new project
+
+        """
+        meta = self.listed_projects.get(prj_id)
+
+        if meta is not None:
+            return meta.probability, meta.file, meta.sheet
+
+        code = self.project_index.get(prj_id)
+
+        if code is not None:
+            return (float(self.project_probability[code]),) + self.sources[self.project_source[code]]
+
+        return None
+
+    def check_conflict(self, prj_id, probability, file=None, sheet=None):
+        """Record a ProjectConflict when a worksheet declares a project with a different funding probability than
+        its first declaration.  Each worksheet is reported once.
+
+        :return:                        Funding probability of the first declaration
+
+        """
+        first = self.first_declaration(prj_id)
+
+        if first is None:
+            return probability
+
+        source = self.add_source(file, sheet)
+
+        if first[0] != probability and (prj_id, source) not in self._conflict_keys:
+            self._conflict_keys.add((prj_id, source))
+            self.conflicts.append(ProjectConflict(prj_id, probability, file, sheet, *first))
+
+        return first[0]
+
+    def add_project(self, prj_id, title, manager, probability, file=None, sheet=None, details=None):
+        """Get the code for a project, adding it to the project table the first time it is seen.  The details
+        of the first worksheet with hours for the project are kept; the funding probability is that of its first
+        declaration.
+
+        :return:                        Project code
+
+        """
+        probability = self.check_conflict(prj_id, probability, file, sheet)
+
+        code = self.project_index.get(prj_id)
+
+        if code is None:
+            code = len(self.project_ids)
+            self.project_index[prj_id] = code
+            self.project_ids.append(prj_id)
+            self.project_title.append(title)
+            self.project_manager.append(manager)
+            self.project_probability.append(probability)
+            self.project_source.append(self.add_source(file, sheet))
+            self.project_details.append(NO_DETAILS if details is None else details)
+
+        return code
+
+    def project_meta(self, code):
+        """Get the metadata record of a project.
+
+        :param code:                    Project code
+
+        :return:                        ProjectMeta
+
+        """
+        return ProjectMeta(self.project_ids[code], self.project_title[code], self.project_manager[code],
+                           float(self.project_probability[code]), *self.sources[self.project_source[code]],
+                           *self.project_details[code])
+
+    def add_listed(self, staff_names):
+        """Record staff listed on a worksheet whether or not they have hours.
+
+        :param staff_names:             Iterable of staff full names; must be on the roster
+
+        """
+        for nm in staff_names:
+            code = self.staff_index[nm]
+
+            if not self._is_listed[code]:
+                self._is_listed[code] = True
+                self.staff_listed.append(code)
+
+    def add_listed_projects(self, projects):
+        """Record projects with listed staff whether or not they have hours.  A worksheet that declares a listed
+        project with a different funding probability is recorded as a ProjectConflict.
+
+        :param projects:                Iterable of (ProjectMeta, declared); declared is False when the worksheet
+                                        has no project identifier
+
+        """
+        for meta, declared in projects:
+            self.check_conflict(meta.prj_id, meta.probability, meta.file, meta.sheet)
+
+            self.listed_projects.setdefault(meta.prj_id, meta)
+
+            if declared:
+                self.declared_projects.add(meta.prj_id)
+
+    def add_blank(self, staff_name, prj_id, probability):
+        """Record a listed staff row without hours.
+
+        :param staff_name:              Staff full name; must be on the roster
+        :param prj_id:                  Project identifier
+        :param probability:             Funding probability from 0.0 to 1.0; the probability of the first
+                                        declaration of the project is used when there is one
+
+        """
+        self.add_listed((staff_name,))
+
+        first = self.first_declaration(prj_id)
+
+        self.blank_staff.append(self.staff_index[staff_name])
+        self.blank_project.append(prj_id)
+        self.blank_probability.append(probability if first is None else first[0])
+        self.blank_position.append(self.n_entries)
+
+    def add(self, staff_name, prj_id, title, manager, probability, hours, file=None, sheet=None, row=0,
+            details=None):
+        """Add the hours of a staff member on a project.
+
+        :param staff_name:              Staff full name; must be on the roster
+        :param prj_id:                  Project identifier
+        :param title:                   Project title as entered on the worksheet
+        :param manager:                 Project manager
+        :param probability:             Funding probability from 0.0 to 1.0
+        :param hours:                   List of hours for each month
+        :param file:                    Workbook the hours were read from
+        :param sheet:                   Worksheet the hours were read from
+        :param row:                     One-based worksheet row the hours were read from
+        :param details:                 ProjectDetails of the project or None
+
+        """
+        self.add_listed((staff_name,))
+
+        self.entry_staff.append(self.staff_index[staff_name])
+        self.entry_project.append(self.add_project(prj_id, title, manager, probability, file, sheet, details))
+        self.entry_hours.append(hours)
+        self.entry_source.append(self.add_source(file, sheet))
+        self.entry_row.append(row)
+
+    def finalize(self):
+        """Convert the gathered entries and project metadata to arrays."""
+
+        self.entry_staff = np.array(self.entry_staff, dtype=np.int32)
+        self.entry_project = np.array(self.entry_project, dtype=np.int32)
+        self.entry_hours = np.array(self.entry_hours, dtype=np.int32).reshape(-1, self.n_months)
+        self.project_probability = np.array(self.project_probability, dtype=np.float64)
+        self.entry_source = np.array(self.entry_source, dtype=np.int32)
+        self.entry_row = np.array(self.entry_row, dtype=np.int32)
+        self.blank_staff = np.array(self.blank_staff, dtype=np.int32)
+        self.blank_probability = np.array(self.blank_probability, dtype=np.float64)
+        self.blank_position = np.array(self.blank_position, dtype=np.int64)
+
+    def lineage(self, entry):
+        """Get the workbook, worksheet, and row an entry was read from.
+
+        :param entry:                   Entry index
+
+        :return:                        Lineage
+
+        """
+        return Lineage(*self.sources[self.entry_source[entry]], int(self.entry_row[entry]))
+
+    def entry_mask(self, staff_name=None, prj_id=None):
+        """Boolean mask of the entries of a staff member, a project, or both.
+
+        :param staff_name:              Optional staff full name
+        :param prj_id:                  Optional project identifier
+
+        """
+        mask = np.ones(self.n_entries, dtype=bool)
+
+        if staff_name is not None:
+            mask &= self.entry_staff == self.staff_index.get(staff_name, -1)
+
+        if prj_id is not None:
+            mask &= self.entry_project == self.project_index.get(prj_id, -1)
+
+        return mask
+
+    def slice_months(self, months):
+        """Create a cube over a subset of the month axis that shares the staff, project, and source tables.
+
+        :param months:                  List of positions on the month axis to keep
+
+        :return:                        HoursCube
+
+        """
+        cube = copy.copy(self)
+
+        cube.n_months = len(months)
+        cube.entry_hours = self.entry_hours[:, months]
+
+        return cube
+
+    @property
+    def entry_probability(self):
+        """Funding probability for each entry."""
+
+        return self.project_probability[self.entry_project]
+
+    @staticmethod
+    def is_high_probability(probability, edges=DEFAULT_TIER_EDGES):
+        """Split funding probabilities into high and low.  High is every funding probability tier but the least
+        likely one, that is above the lowest tier edge.  This is the single definition of the split used by
+        the rollup, the stage coverage lists, and the dictionary views.
+
+        :param probability:             Array of funding probabilities
+        :param edges:                   Descending tier edges, see `assign_tiers`; a 50% split by default
+
+        :return:                        Boolean array; True for high probability
+
+        """
+        return assign_tiers(probability, edges) < len(edges)
+
+    def high_probability_mask(self, edges=DEFAULT_TIER_EDGES):
+        """Boolean mask of entries on high probability projects, see `is_high_probability`.
+
+        :param edges:                   Descending tier edges; a 50% split by default
+
+        """
+        return self.is_high_probability(self.project_probability, edges)[self.entry_project]
+
+    def entry_tiers(self, edges):
+        """Funding probability tier of each entry; projects are binned once and entries take their tier.
+
+        :param edges:                   Descending tier edges, see `assign_tiers`
+
+        :return:                        int64 array with one tier per entry; 0 is the most likely tier
+
+        """
+        return assign_tiers(self.project_probability, edges)[self.entry_project]
+
+    @staticmethod
+    def first_seen(codes):
+        """Unique codes in order of first appearance."""
+
+        uniq, first_idx = np.unique(codes, return_index=True)
+
+        return uniq[np.argsort(first_idx)]
+
+    def staff_seen(self, mask=None):
+        """Staff codes in order of first appearance.  Without a mask these are all listed staff, including
+        those without hours; with a mask only staff with at least one selected entry.
+
+        :param mask:                    Optional boolean mask of entries to consider
+
+        """
+        if mask is None:
+            return np.array(self.staff_listed, dtype=np.int64)
+
+        return self.first_seen(self.entry_staff[mask])
+
+    def projects_seen(self):
+        """Project codes that have at least one entry, in order of first appearance."""
+
+        return self.first_seen(self.entry_project)
+
+    def staff_month_totals(self, mask=None):
+        """Sum hours per staff member and month.
+
+        :param mask:                    Optional boolean mask of entries to include
+
+        :return:                        int64 array with shape (staff, months)
+
+        """
+        out = np.zeros((self.n_staff, self.n_months), dtype=np.int64)
+
+        if mask is None:
+            np.add.at(out, self.entry_staff, self.entry_hours)
+        else:
+            np.add.at(out, self.entry_staff[mask], self.entry_hours[mask])
+
+        return out
+
+    def project_month_totals(self, mask=None):
+        """Sum hours per project and month.
+
+        :param mask:                    Optional boolean mask of entries to include
+
+        :return:                        int64 array with shape (projects, months)
+
+        """
+        out = np.zeros((self.n_projects, self.n_months), dtype=np.int64)
+
+        if mask is None:
+            np.add.at(out, self.entry_project, self.entry_hours)
+        else:
+            np.add.at(out, self.entry_project[mask], self.entry_hours[mask])
+
+        return out
+
+    def staff_totals(self, mask=None):
+        """Sum hours per staff member over all months.
+
+        :param mask:                    Optional boolean mask of entries to include
+
+        :return:                        int64 array with one value per staff member
+
+        """
+        return self.staff_month_totals(mask).sum(axis=1)
+
+    def staff_class_totals(self, classes, n_classes):
+        """Sum hours and count entries per staff member and entry class in a single pass.
+
+        :param classes:                 Integer array of the class of each entry, e.g. a probability bucket
+        :param n_classes:               Number of classes
+
+        :return:                        [0] int64 array of hours with shape (staff, classes)
+                                        [1] int64 array of entry counts with shape (staff, classes)
+
+        """
+        idx = self.entry_staff.astype(np.int64) * n_classes + classes
+        size = self.n_staff * n_classes
+
+        totals = np.bincount(idx, weights=self.entry_totals(), minlength=size).astype(np.int64)
+        counts = np.bincount(idx, minlength=size)
+
+        return totals.reshape(self.n_staff, n_classes), counts.reshape(self.n_staff, n_classes)
+
+    def staff_class_month_totals(self, classes, n_classes):
+        """Sum hours per staff member, entry class, and month in a single grouped reduction.
+
+        :param classes:                 Integer array of the class of each entry, e.g. a probability tier
+        :param n_classes:               Number of classes
+
+        :return:                        int64 array with shape (staff, classes, months)
+
+        """
+        idx = self.entry_staff.astype(np.int64) * n_classes + classes
+
+        out = np.zeros((self.n_staff * n_classes, self.n_months), dtype=np.int64)
+        np.add.at(out, idx, self.entry_hours)
+
+        return out.reshape(self.n_staff, n_classes, self.n_months)
+
+    def staff_codes_by_name(self):
+        """Staff codes in ascending name order."""
+
+        return np.array(sorted(range(self.n_staff), key=self.staff_names.__getitem__), dtype=np.int64)
+
+    def entry_totals(self):
+        """Total hours of each entry over all months."""
+
+        return self.entry_hours.sum(axis=1, dtype=np.int64)
+
+    def project_totals(self, mask=None):
+        """Sum hours per project over all months.
+
+        :param mask:                    Optional boolean mask of entries to include
+
+        :return:                        int64 array with one value per project
+
+        """
+        totals = self.entry_totals()
+
+        if mask is None:
+            return np.bincount(self.entry_project, weights=totals, minlength=self.n_projects).astype(np.int64)
+
+        return np.bincount(self.entry_project[mask], weights=totals[mask], minlength=self.n_projects).astype(np.int64)
+
+    def project_staff_counts(self, mask=None):
+        """Number of entries per project.
+
+        :param mask:                    Optional boolean mask of entries to include
+
+        :return:                        int64 array with one value per project
+
+        """
+        codes = self.entry_project if mask is None else self.entry_project[mask]
+
+        return np.bincount(codes, minlength=self.n_projects)
+
+    def select(self, mask=None):
+        """Entry indices in entry order.
+
+        :param mask:                    Optional boolean mask of entries to include
+
+        """
+        if mask is None:
+            return np.arange(self.n_entries)
+
+        return np.nonzero(mask)[0]
+
+    def staff_name_order(self, mask=None):
+        """Entry indices sorted by staff name, keeping entry order for each staff member.
+
+        :param mask:                    Optional boolean mask of entries to include
+
+        """
+        idx = self.select(mask)
+
+        # rank of each staff code when names are sorted
+        rank = np.empty(self.n_staff, dtype=np.int64)
+        rank[self.staff_codes_by_name()] = np.arange(self.n_staff)
+
+        return idx[np.argsort(rank[self.entry_staff[idx]], kind='stable')]
+
+    def group_entries(self, codes, order=None):
+        """Group entry indices by staff or project code.
+
+        :param codes:                   Array of codes for each entry; either `entry_staff` or `entry_project`
+        :param order:                   Optional array of entry indices to group, in the order they are visited;
+                                        defaults to all entries in entry order
+
+        :return:                        List of (code, array of entry indices) in order of the first appearance
+                                        of each code in `order`
+
+        """
+        if order is None:
+            order = self.select()
+
+        if order.size == 0:
+            return []
+
+        key = codes[order]
+        perm = np.argsort(key, kind='stable')
+        bounds = np.flatnonzero(np.diff(key[perm])) + 1
+
+        # a stable sort leaves the first visited entry of each code at the front of its group
+        positions = np.split(perm, bounds)
+        positions.sort(key=lambda g: g[0])
+
+        return [(int(key[g[0]]), order[g]) for g in positions]
+
+    def staff_hours_dict(self, mask=None, blank_mask=None):
+        """Hours of every listed row per staff member in the order rows were read; rows without hours are
+        zero-filled month lists.
+
+        :param mask:                    Optional boolean mask of entries to include
+        :param blank_mask:              Optional boolean mask of listed rows without hours to include
+
+        :return:                        Dictionary of {staff_name: [hours per month for all rows, ...]} in
+                                        order of first listing
+
+        """
+        # (position, is entry, entry or row index) of each row per staff member; a row without hours comes
+        #  before the entry added after it
+        rows = collections.defaultdict(list)
+
+        for entry in self.select(mask).tolist():
+            rows[int(self.entry_staff[entry])].append((entry, True, entry))
+
+        for idx in self.select_blanks(blank_mask).tolist():
+            rows[int(self.blank_staff[idx])].append((int(self.blank_position[idx]), False, idx))
+
+        zeros = [0] * self.n_months
+
+        d = collections.OrderedDict()
+
+        for code, staff_rows in sorted(rows.items(), key=lambda item: min(item[1])):
+            d[self.staff_names[code]] = [h for _, is_entry, idx in sorted(staff_rows)
+                                         for h in (self.entry_hours[idx].tolist() if is_entry else zeros)]
+
+        return d
+
+    def select_blanks(self, mask=None):
+        """Indices of listed rows without hours.
+
+        :param mask:                    Optional boolean mask of rows to include
+
+        """
+        if mask is None:
+            return np.arange(len(self.blank_staff))
+
+        return np.nonzero(mask)[0]
+
+    def listed_project_rows(self):
+        """Number of listed staff rows, with or without hours, per listed project.
+
+        :return:                        Dictionary of {prj_id: rows} in order of first listing
+
+        """
+        counts = self.project_staff_counts()
+        n_blank = collections.Counter(self.blank_project)
+
+        d = collections.OrderedDict()
+
+        for prj_id in self.listed_projects:
+            code = self.project_index.get(prj_id)
+            d[prj_id] = n_blank[prj_id] + (0 if code is None else int(counts[code]))
+
+        return d
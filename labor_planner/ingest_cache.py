@@ -0,0 +1,150 @@
+"""ingest_cache.py
+
+On-disk cache of parsed staff workbooks.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import hashlib
+import os
+import pickle
+
+
+def file_hash(f, block_size=1 << 20):
+    """Create a SHA-256 digest of a file's content.
+
+    :param f:                           Full path with file name and extension.
+    :param block_size:                  Number of bytes to read at a time.
+
+    :return:                            Hex digest string
+
+    """
+    h = hashlib.sha256()
+
+    with open(f, 'rb') as src:
+        for block in iter(lambda: src.read(block_size), b''):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+class IngestCache:
+    """Cache of parsed staff workbooks keyed by file path, size, modification time, and content hash.
+
+    Entries are only valid for the roster file, work hours file, and settings they were parsed with; if any of
+    these change the whole cache is discarded.
+
+    :param cache_dir:                   Full path to the directory where the cache file is stored
+    :param version_files:               List of reference files the parsed results depend on
+    :param settings:                    Any other picklable value the parsed results depend on
+
+    """
+
+    # increment when the layout of cached entries changes
+    CACHE_VERSION = 12
+
+    CACHE_FILE = 'ingest_cache.pkl'
+
+    def __init__(self, cache_dir, version_files, settings=None):
+
+        self.cache_file = os.path.join(cache_dir, self.CACHE_FILE)
+
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        # identifies the inputs every entry was parsed against
+        self.version = (self.CACHE_VERSION, tuple(file_hash(f) for f in version_files), settings)
+
+        # {path: [size, mtime_ns, sha256, parsed result]}
+        self.entries = self.load()
+
+        # number of lookups served from and missed by the cache
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Load cache entries from disk if they match the current version.
+
+        :return:                        Dictionary of cache entries
+
+        """
+        try:
+            with open(self.cache_file, 'rb') as src:
+                version, entries = pickle.load(src)
+
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError, ImportError):
+            return {}
+
+        if version != self.version:
+            return {}
+
+        return entries
+
+    def save(self):
+        """Write the cache to disk atomically."""
+
+        tmp_file = '{}.tmp'.format(self.cache_file)
+
+        with open(tmp_file, 'wb') as dst:
+            pickle.dump((self.version, self.entries), dst, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_file, self.cache_file)
+
+    def get(self, f):
+        """Get the cached parse result for a file if it has not changed.
+
+        A matching size and modification time is taken as unchanged; otherwise the content hash decides.
+
+        :param f:                       Full path with file name and extension to the workbook
+
+        :return:                        Cached parse result or None
+
+        """
+        entry = self.entries.get(f)
+
+        if entry is not None:
+            st = os.stat(f)
+
+            if entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                self.hits += 1
+                return entry[3]
+
+            # modification time changed without a change in content
+            if entry[0] == st.st_size and entry[2] == file_hash(f):
+                entry[1] = st.st_mtime_ns
+                self.hits += 1
+                return entry[3]
+
+        self.misses += 1
+
+        return None
+
+    def put(self, f, result):
+        """Store the parse result for a file.
+
+        :param f:                       Full path with file name and extension to the workbook
+        :param result:                  Parse result
+
+        """
+        st = os.stat(f)
+
+        self.entries[f] = [st.st_size, st.st_mtime_ns, file_hash(f), result]
+
+    def evict(self, keep_files):
+        """Remove entries for files that are no longer present.
+
+        :param keep_files:              List of workbook paths to keep
+
+        :return:                        List of evicted paths
+
+        """
+        keep = set(keep_files)
+
+        evicted = [f for f in self.entries if f not in keep]
+
+        for f in evicted:
+            del self.entries[f]
+
+        return evicted
@@ -7,13 +7,89 @@ Build staff workbooks to hold hours data.
 
 """
 
-import os
 import collections
+import concurrent.futures
+import io
+import os
+import re
+import sys
+import warnings
+import zipfile
 
 import numpy as np
 import pandas as pd
-import xlrd
 import xlsxwriter
+from xlsxwriter.exceptions import XlsxWriterException
+
+from labor_planner.rollover import collect_projects, read_plan, read_snapshot, write_snapshot
+from labor_planner.stream_reader import StreamWorkbook
+from labor_planner.workbook_reader import (RosterIndex, HEADER_ROWS, HEADER_COLS, HOURS_START_ROW, HOURS_START_COL,
+                                           HOURS_END_COL)
+
+
+# Linux ioctl that shares the extents of one file with another on copy-on-write filesystems
+FICLONE = 0x40049409
+
+# cell format properties of every workbook; xlsxwriter formats belong to a single workbook so only their
+#  properties are shared
+FORMATS = ({'bold': 1},
+           {'bold': 2, 'size': 22},
+           {'border': 1, 'bg_color': '#C1D4AB'},
+           {'border': 1, 'bold': 1},
+           {'border': 1, 'bg_color': '#BDBDBD'},
+           {'border': 1, 'bg_color': '#BDBDBD', 'align': 'right'},
+           {'border': 1, 'bg_color': '#BDBDBD', 'align': 'center', 'text_wrap': 1},
+           {'font_color': 'red', 'text_wrap': 1},
+           {'bold': 1, 'align': 'center', 'border': 1},
+           {'num_format': '0%', 'border': 1},
+           {'border': 1, 'bg_color': '#BED1DE'},
+           {'border': 1},
+           {'num_format': '0%', 'border': 1, 'bg_color': '#BED1DE'})
+
+# project header cells carried into an updated workbook as zero-based (row, column); project, proposal, and
+#  WP numbers, title, client, start and end dates, funding, probability, manager, and comments
+CARRIED_CELLS = ((2, 1), (2, 5), (2, 9), (3, 1), (4, 1), (5, 1), (5, 3), (6, 1), (7, 1), (8, 1), (9, 1))
+DATE_CELLS = ((5, 1), (5, 3))
+
+# content of an existing project worksheet
+#  header holds the cell values of rows 1-10 and columns A-J
+#  rows holds {staff_name: [hours value per month]} of the roster staff listed, in row order
+#  unknown holds (column A value, True if the row has hours) of the rows that do not match the roster
+CarriedSheet = collections.namedtuple('CarriedSheet', ['name', 'header', 'rows', 'unknown'])
+
+# outcome of writing a single staff workbook; error is None when the workbook was written
+BuildResult = collections.namedtuple('BuildResult', ['staff_name', 'file', 'error'])
+
+# builder of a worker process; set once per worker so its cached content is reused for every workbook
+_worker_builder = None
+
+
+def init_worker(builder):
+    """Keep the builder of a worker process."""
+
+    global _worker_builder
+    _worker_builder = builder
+
+
+def build_recipient(pm_name, wb_file):
+    """Write the workbook of a single staff member in a worker process."""
+
+    return _worker_builder.write_recipient(pm_name, wb_file)
+
+
+def print_progress(done, total, result):
+    """Report the progress of a build on the console.
+
+    :param done:                        Number of workbooks finished
+    :param total:                       Number of workbooks to build
+    :param result:                      BuildResult of the last workbook finished
+
+    """
+    if result.error is not None:
+        print("Could not write {}:  {}".format(result.file, result.error))
+
+    if done == total or done % 100 == 0:
+        print("Built {} of {} staff workbooks".format(done, total))
 
 
 class BuildStaffWorkbooks:
@@ -21,21 +97,64 @@ class BuildStaffWorkbooks:
      and those whom they manage, work hours for the calendar year.
 
      :param config_obj:                YAML configuration object
+     :param progress:                  Optional function called with the number of workbooks finished, the number
+                                       to build, and the BuildResult of each workbook as it finishes
 
     """
 
-    def __init__(self, config_obj):
+    def __init__(self, config_obj, progress=None):
 
+        self.config_obj = config_obj
         self.staffing_file = config_obj.in_staff_csv
         self.target_fy = config_obj.fy
         self.out_staff_sheets_dir = config_obj.data_dir
         self.num_blank_wksheets = config_obj.num_blank_wksheets
+        self.link_mode = config_obj.link_mode
+        self.jobs = config_obj.build_jobs
+        self.team_column = config_obj.team_column
+        self.free_staff_rows = config_obj.free_staff_rows
+        self.update_existing = config_obj.update_existing
+        self.rollover_from = config_obj.rollover_from
+        self.rollover_months = config_obj.rollover_months
+        self.rollover_snapshot = config_obj.rollover_snapshot
+        self.progress = progress
         self.working_hours_file = config_obj.in_work_hours
         self.wkg_hrs_list, self.mth_list, self.mth_span_list = self.read_wkg_hrs()
 
+        # content shared by every worksheet; built on first use in each process
+        self._header_cache = {}
+        self._roster_cache = {}
+
+        # staff file roster, {manager: [team member, ...]}, and the workbooks that could not be written
+        self.staff_list = []
+        self.teams = {}
+        self.failures = []
+
+        # {staff_name: [RolloverProject, ...]} of the projects carried into each workbook from this year
+        self.rollover = {}
+
+        # workbooks created, rewritten, and left untouched by an update of existing workbooks
+        self.created = []
+        self.updated = []
+        self.unchanged = []
+
         # build workbooks
         self.build()
 
+    def __getstate__(self):
+        """Builder state sent to worker processes; progress is only reported by the parent process."""
+
+        state = self.__dict__.copy()
+        state['progress'] = None
+
+        return state
+
+    @property
+    def per_recipient(self):
+        """True when workbooks differ per staff member and are written one at a time rather than cloned."""
+
+        return self.team_column is not None or self.rollover_from is not None
+
     def read_wkg_hrs(self):
         """Process working hours file and format data as needed.
 
@@ -58,21 +177,22 @@ class BuildStaffWorkbooks:
 
     @staticmethod
     def open_xlsx(in_file):
-        """Open and return workbook object
+        """Open and return a streaming workbook object
 
         :param in_file:                 Full path with file name and extension to the input file.
 
-        :return:                        XLRD workbook object
+        :return:                        StreamWorkbook object
 
         """
 
         msg = "The following file is either open by another user or cannot be opened:  {}".format(in_file)
 
         try:
-            return xlrd.open_workbook(in_file)
+            return StreamWorkbook(in_file)
 
-        except IOError:
-            raise msg
+        # a corrupt or non-zip .xlsx file
+        except (IOError, zipfile.BadZipFile):
+            raise IOError(msg)
 
     @staticmethod
     def format_file_name(s):
@@ -97,25 +217,39 @@ class BuildStaffWorkbooks:
         :return:                        Options for formatting
 
         """
+        return tuple(wkbook.add_format(properties) for properties in FORMATS)
+
+    def header_content(self, fy, wkg_hrs_list):
+        """Get the text of the worksheet headers; built once per fiscal year and set of working hours.
+
+        :param fy:                      Two-digit fiscal year
+        :param wkg_hrs_list:            List of working hours per month
+
+        :return:                        Dictionary of header content
+
+        """
+        key = (fy, tuple(wkg_hrs_list))
 
-        # formatting options
-        bold = wkbook.add_format({'bold': 1})
-        bold_big = wkbook.add_format({'bold': 2, 'size': 22})
-        bkg_green = wkbook.add_format({'border': 1, 'bg_color': '#C1D4AB'})
-        border_bold = wkbook.add_format({'border': 1, 'bold': 1})
-        border_gray = wkbook.add_format({'border': 1, 'bg_color': '#BDBDBD'})
-        border_gray_right = wkbook.add_format({'border': 1, 'bg_color': '#BDBDBD', 'align': 'right'})
-        border_gray_center = wkbook.add_format({'border': 1, 'bg_color': '#BDBDBD', 'align': 'center', 'text_wrap': 1})
-        red_text_wrap = wkbook.add_format({'font_color': 'red', 'text_wrap': 1})
-        bold_center_border = wkbook.add_format({'bold': 1, 'align': 'center', 'border': 1})
-        num_percent = wkbook.add_format({'num_format': '0%', 'border': 1})
-        bkg_blue = wkbook.add_format({'border': 1, 'bg_color': '#BED1DE'})
-        border_1 = wkbook.add_format({'border': 1})
-        num_percent_blue = wkbook.add_format({'num_format': '0%', 'border': 1, 'bg_color': '#BED1DE'})
-
-        return bold, bold_big, bkg_green, border_bold, border_gray, border_gray_right, \
-               border_gray_center, red_text_wrap, bold_center_border, num_percent, \
-               bkg_blue, border_1, num_percent_blue
+        if key not in self._header_cache:
+
+            p1 = "*Fill in either 1a. for a current project with funding; 1b. "
+            p2 = "for a proposal that has not been funded/awarded yet; or 1c. for wp#(s), "
+            p3 = "a task, or WBS that is funded from outside your group.  If this is a "
+            p4 = "proposal (1b), please enter teh probability % of being funded/awarded "
+            p5 = "in #6 above."
+
+            current_fy = int(fy[-2:])
+            next_fy = 'FY{0}'.format(current_fy + 1)
+
+            self._header_cache[key] = {
+                'text_fill': p1 + p2 + p3 + p4 + p5,
+                'quarters': ['Quarter 2 - {0}'.format(fy), 'Quarter 3 - {0}'.format(fy),
+                             'Quarter 4 - {0}'.format(fy), 'Quarter 1 - {0}'.format(next_fy)],
+                'months': [''] + ['{}-{}'.format(i, self.target_fy) for i in self.mth_list] + ['Total'],
+                'total_hours': sum(wkg_hrs_list),
+                'spans': ['Processing Month ='] + self.mth_span_list + ['', '']}
+
+        return self._header_cache[key]
 
     def write_static_worksheet_content(self, ws, fmt, fy, wkg_hrs_list):
         """Write static (non-staff row) worksheet content
@@ -127,6 +261,8 @@ class BuildStaffWorkbooks:
 
         """
 
+        header = self.header_content(fy, wkg_hrs_list)
+
         # set column widths
         ws.set_column('A:A', 22)
         ws.set_column('B:N', 14)
@@ -165,39 +301,26 @@ class BuildStaffWorkbooks:
         ws.write('A10', '8. Comments (optional):', fmt[0])
         ws.merge_range('B10:L10', '', fmt[2])
 
-        p1 = "*Fill in either 1a. for a current project with funding; 1b. "
-        p2 = "for a proposal that has not been funded/awarded yet; or 1c. for wp#(s), "
-        p3 = "a task, or WBS that is funded from outside your group.  If this is a "
-        p4 = "proposal (1b), please enter teh probability % of being funded/awarded "
-        p5 = "in #6 above."
-        text_fill = p1 + p2 + p3 + p4 + p5
-        ws.merge_range('A11:N11', text_fill, fmt[7])
+        ws.merge_range('A11:N11', header['text_fill'], fmt[7])
 
         ws.write('A12', 'Group Staff', fmt[3])
-        current_fy = int(fy[-2:])
-        next_fy = 'FY{0}'.format(current_fy + 1)
 
-        ws.merge_range('B12:D12', 'Quarter 2 - {0}'.format(fy), fmt[8])
-        ws.merge_range('E12:G12', 'Quarter 3 - {0}'.format(fy), fmt[8])
-        ws.merge_range('H12:J12', 'Quarter 4 - {0}'.format(fy), fmt[8])
-        ws.merge_range('K12:M12', 'Quarter 1 - {0}'.format(next_fy), fmt[8])
+        ws.merge_range('B12:D12', header['quarters'][0], fmt[8])
+        ws.merge_range('E12:G12', header['quarters'][1], fmt[8])
+        ws.merge_range('H12:J12', header['quarters'][2], fmt[8])
+        ws.merge_range('K12:M12', header['quarters'][3], fmt[8])
 
         ws.write('N12', '', fmt[8])
         ws.write('O12', '', fmt[8])
 
-        mth_list = [''] + ['{}-{}'.format(i, self.target_fy) for i in self.mth_list] + ['Total']
-
-        ws.write_row('A13', mth_list, fmt[6])
+        ws.write_row('A13', header['months'], fmt[6])
         ws.merge_range('O13:O14', '% of Available Hours Covered', fmt[6])
 
-        total_hours = sum(wkg_hrs_list)
         ws.write('A14', 'Wkg Hrs Available =', fmt[6])
         ws.write_row('B14', wkg_hrs_list, fmt[6])
-        ws.write('N14', total_hours, fmt[6])
-
-        span_list = ['Processing Month ='] + self.mth_span_list + ['', '']
+        ws.write('N14', header['total_hours'], fmt[6])
 
-        ws.write_row('A15', span_list, fmt[6])
+        ws.write_row('A15', header['spans'], fmt[6])
 
     @staticmethod
     def create_staff_row_content(staff_list, wkg_hrs_list):
@@ -230,6 +353,8 @@ class BuildStaffWorkbooks:
 
         """
 
+        row = start_row - 1
+
         for index, k in enumerate(ordered_dict.keys()):
 
             v = ordered_dict[k]
@@ -263,6 +388,32 @@ class BuildStaffWorkbooks:
         # return final staff row number + 1
         return row + 1
 
+    @staticmethod
+    def write_free_rows(n_rows, start_row, ws, fmt):
+        """Write blank rows where staff not listed on the worksheet can be added by name.
+
+        :param n_rows:                  Number of free rows
+        :param start_row:               Row to start writing free rows on in the worksheet
+        :param ws:                      Worksheet object
+        :param fmt:                     Formatting object
+
+        :return:                        Row after the last free row
+
+        """
+        for index in range(n_rows):
+
+            row = start_row + index
+
+            ws.write('A{0}'.format(row), '', fmt[2])
+            ws.write_row('B{0}'.format(row), [''] * 12, fmt[11])
+
+            sum_range = 'B{0}:M{0}'.format(row)
+            tot_cell = 'N{0}'.format(row)
+            ws.write_formula(tot_cell, '{=SUM(' + sum_range + ')}', fmt[11])
+            ws.write_formula('O{0}'.format(row), '{=' + tot_cell + '/ (N14)}', fmt[9])
+
+        return start_row + n_rows
+
     @staticmethod
     def write_totals_row(ws, totals_row, start_row, f):
         """Calculate the monthly totals rows and write them to the worksheet.
@@ -300,18 +451,38 @@ class BuildStaffWorkbooks:
 
         """
 
-        # start row
-        start_row = 16
+        # blank staff rows in name order; built once per roster
+        key = tuple(staff_list)
+
+        if key not in self._roster_cache:
+
+            # add data to dict where staff do not have hours on the project
+            d = self.create_staff_row_content(staff_list, wkg_hrs_list)
 
-        # add data to dict where staff do not have hours on the project
-        d = self.create_staff_row_content(staff_list, wkg_hrs_list)
+            # order dictionary
+            self._roster_cache[key] = collections.OrderedDict(sorted(d.items()))
 
-        # order dictionary
-        ordered_dict = collections.OrderedDict(sorted(d.items()))
+        self.write_staff_area(ws, self._roster_cache[key], fmt)
+
+    def write_staff_area(self, ws, ordered_dict, fmt):
+        """Write staff rows, free rows of team workbooks, and the totals row.
+
+        :param ws:                      Worksheet object
+        :param ordered_dict:            Ordered dictionary of staff and their associated content
+        :param fmt:                     Formatting object
+
+        """
+
+        # start row
+        start_row = 16
 
         # write staff information to worksheet; get row for totals
         totals_row = self.write_staff_rows(ordered_dict, start_row, ws, fmt)
 
+        # team workbooks have free rows to add staff from outside the team
+        if self.team_column is not None:
+            totals_row = self.write_free_rows(self.free_staff_rows, totals_row, ws, fmt)
+
         # write totals row
         self.write_totals_row(ws, totals_row, start_row, fmt[4])
 
@@ -348,6 +519,111 @@ class BuildStaffWorkbooks:
             # write staff area
             self.populate_staff_info(ws, staff_list, wkg_hrs_list, fmt)
 
+    @staticmethod
+    def project_sheet_names(projects, used):
+        """Unique worksheet names of at most 31 characters from project identifiers.
+
+        :param projects:                List of RolloverProject
+        :param used:                    Set of lower case worksheet names already taken; updated in place
+
+        :return:                        List of worksheet names
+
+        """
+        ws_names = []
+
+        for p in projects:
+
+            base = re.sub(r"[\[\]:*?/\\]", '_', str(p.prj_id)).strip("'").strip()[:31] or 'project'
+
+            ws_name = base
+            idx = 1
+            while ws_name.lower() in used:
+                idx += 1
+                suffix = '_{}'.format(idx)
+                ws_name = base[:31 - len(suffix)] + suffix
+
+            used.add(ws_name.lower())
+            ws_names.append(ws_name)
+
+        return ws_names
+
+    def create_rollover_worksheets(self, wbook, projects, staff_list, fmt):
+        """Create a worksheet named by project for each project carried from this year.  Carried hours fill the
+        first months of the year.
+
+        :param wbook:                   Workbook object
+        :param projects:                List of RolloverProject
+        :param staff_list:              List of staff listed on each worksheet
+        :param fmt:                     Formatting object
+
+        """
+        percent_fmt = wbook.add_format(dict(FORMATS[2], num_format='0%'))
+
+        # names of the blank project sheets that follow
+        used = set('new_project_{0}'.format(i) for i in range(1, self.num_blank_wksheets + 1))
+
+        blank = [''] * len(self.wkg_hrs_list)
+
+        for ws_name, p in zip(self.project_sheet_names(projects, used), projects):
+
+            ws = wbook.add_worksheet(ws_name)
+
+            # write static content
+            self.write_static_worksheet_content(ws, fmt, self.target_fy, self.wkg_hrs_list)
+
+            # write project cells
+            ws.write('B3', p.prj_id, fmt[2])
+            ws.write('B4', p.title, fmt[2])
+            ws.write('B5', p.client, fmt[2])
+            ws.write('B8', p.probability, percent_fmt)
+            ws.write('B9', p.manager, fmt[2])
+
+            # write staff area with the carried hours
+            d = {}
+            for nm in set(staff_list) | set(p.hours):
+                carried = [h if h else '' for h in p.hours.get(nm, [])]
+                d[nm] = [carried + blank[len(carried):], '', '']
+
+            self.write_staff_area(ws, collections.OrderedDict(sorted(d.items())), fmt)
+
+    def read_rollover(self):
+        """Read the projects carried into next year's workbooks from this year's staff workbooks or a snapshot.
+        Each project goes to the workbook of the staff member it was read from, or of its manager when that
+        staff member is no longer in the staff file.
+
+        :return:                            Dictionary of {staff_name: [RolloverProject, ...]}
+
+        """
+        if os.path.splitext(self.rollover_from)[-1].lower() == '.csv':
+            projects, n_months = read_snapshot(self.rollover_from)
+
+        else:
+            projects = collect_projects(read_plan(self.config_obj, self.rollover_from).cube, self.rollover_months)
+
+            if self.rollover_snapshot is not None:
+                write_snapshot(projects, self.rollover_months, self.rollover_snapshot)
+
+        staff_index = RosterIndex(self.staff_list)
+        owners = {self.format_file_name(nm): nm for nm in self.staff_list}
+
+        rollover = collections.OrderedDict()
+
+        for p in projects:
+
+            owner = owners.get(p.owner) or staff_index.match(p.manager)
+
+            if owner is None:
+                warnings.warn("Project '{}' is not carried forward; neither the owner of workbook '{}' nor manager "
+                              "'{}' is in the staff file.".format(p.prj_id, p.owner, p.manager))
+                continue
+
+            # only staff still in the staff file keep their hours
+            hours = {nm: h for nm, h in p.hours.items() if nm in staff_index}
+
+            rollover.setdefault(owner, []).append(p._replace(hours=hours))
+
+        return rollover
+
     def read_staff_file(self):
         """Read and process input staff file.  A labor planning workbook will be generated for each
         staff member in this file.
@@ -367,24 +643,491 @@ class BuildStaffWorkbooks:
 
         return df['full_name'].tolist()
 
-    def build(self):
-        """Method to build all staff worksheets."""
+    def read_teams(self, staff_list):
+        """Read the team column of the staff file.  Each value is the full name of the manager whose workbook
+        lists that staff member.
 
-        # make staff sheet directory if it does not exist
-        if not os.path.exists(self.out_staff_sheets_dir):
-            os.makedirs(self.out_staff_sheets_dir)
+        :param staff_list:                  List of staff full names
+
+        :return:                            Dictionary of {manager full name: [team member full name, ...]}
+
+        """
+        df = pd.read_csv(self.staffing_file)
+
+        if self.team_column not in df.columns:
+            raise KeyError("Team column '{}' is not in the staff file:  {}".format(self.team_column,
+                                                                                  self.staffing_file))
+
+        staff_names = set(staff_list)
+        teams = collections.OrderedDict()
+
+        for nm, manager in zip(staff_list, df[self.team_column].fillna('').astype(str).str.strip()):
+
+            if manager == '' or manager == nm:
+                continue
+
+            if manager not in staff_names:
+                warnings.warn("Team manager '{}' of '{}' is not in the staff file; '{}' is only listed on their "
+                              "own workbook.".format(manager, nm, nm))
+                continue
+
+            teams.setdefault(manager, []).append(nm)
+
+        return teams
+
+    def render_template(self, staff_list):
+        """Render the staff workbook template in memory.  Every staff member gets the same workbook.
+
+        :param staff_list:                  List of all staff
+
+        :return:                            Workbook as bytes
+
+        """
+        output = io.BytesIO()
+
+        with xlsxwriter.Workbook(output, {'in_memory': True}) as wbook:
+
+            # set workbook formatting
+            fmt = self.set_formatting(wbook)
+
+            # create blank worksheets
+            self.create_empty_worksheets(wbook, staff_list, fmt, self.target_fy, self.wkg_hrs_list,
+                                         self.num_blank_wksheets)
+
+        return output.getvalue()
+
+    @staticmethod
+    def write_file(content, wb_file):
+        """Write workbook bytes to a file.  An existing workbook is replaced rather than written through so
+        that workbooks hardlinked by an earlier build are not changed.
+
+        :param content:                     Workbook as bytes
+        :param wb_file:                     Full path with file name and extension of the workbook
+
+        """
+        if os.path.lexists(wb_file):
+            os.remove(wb_file)
+
+        with open(wb_file, 'wb') as out:
+            out.write(content)
+
+    @staticmethod
+    def clone_file(content, src_file, wb_file, link_mode):
+        """Create a workbook from the first one written; falls back to writing a copy when the filesystem
+        does not support the link.
+
+        :param content:                     Workbook as bytes
+        :param src_file:                    Full path to the first workbook written
+        :param wb_file:                     Full path with file name and extension of the workbook
+        :param link_mode:                   One of 'copy', 'hardlink', or 'reflink'
+
+        """
+        # an existing workbook is replaced rather than written through
+        if os.path.lexists(wb_file):
+            os.remove(wb_file)
 
-        staff_list = self.read_staff_file()
+        if link_mode == 'hardlink':
 
-        for pm_name in staff_list:
+            try:
+                os.link(src_file, wb_file)
+                return
 
-            # set out_file name
-            wb_file = os.path.join(self.out_staff_sheets_dir, "{}.xlsx".format(self.format_file_name(pm_name)))
+            except OSError:
+                pass
 
+        elif link_mode == 'reflink' and sys.platform.startswith('linux'):
+
+            import fcntl
+
+            try:
+                with open(src_file, 'rb') as src, open(wb_file, 'wb') as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return
+
+            except OSError:
+                pass
+
+        BuildStaffWorkbooks.write_file(content, wb_file)
+
+    def recipient_staff(self, pm_name):
+        """Staff listed on the worksheets of a staff member's workbook.
+
+        :param pm_name:                     Staff full name
+
+        :return:                            List of staff full names; the full roster or, for team
+                                            workbooks, the staff member and their team
+
+        """
+        if self.team_column is None:
+            return self.staff_list
+
+        return [pm_name] + self.teams.get(pm_name, [])
+
+    def write_recipient(self, pm_name, wb_file):
+        """Write the workbook of a single staff member.  Errors are returned rather than raised so that one
+        workbook that cannot be written does not stop the others.
+
+        :param pm_name:                     Staff full name
+        :param wb_file:                     Full path with file name and extension of the workbook
+
+        :return:                            BuildResult
+
+        """
+        try:
             with xlsxwriter.Workbook(wb_file) as wbook:
 
                 # set workbook formatting
                 fmt = self.set_formatting(wbook)
 
+                staff_list = self.recipient_staff(pm_name)
+
+                # create a worksheet for each project carried from this year
+                if pm_name in self.rollover:
+                    self.create_rollover_worksheets(wbook, self.rollover[pm_name], staff_list, fmt)
+
                 # create blank worksheets
-                self.create_empty_worksheets(wbook, staff_list, fmt, self.target_fy, self.wkg_hrs_list, self.num_blank_wksheets)
+                self.create_empty_worksheets(wbook, staff_list, fmt, self.target_fy, self.wkg_hrs_list,
+                                             self.num_blank_wksheets)
+
+        except (OSError, XlsxWriterException) as e:
+            return BuildResult(pm_name, wb_file, str(e))
+
+        return BuildResult(pm_name, wb_file, None)
+
+    def build_template(self, out_files):
+        """Render the template once and write it for each staff member.
+
+        :param out_files:                   List of (staff full name, workbook path) tuples
+
+        :return:                            List of BuildResult in the same order as `out_files`
+
+        """
+        content = self.render_template(self.staff_list)
+
+        src_file = None
+        results = []
+
+        for pm_name, wb_file in out_files:
+
+            try:
+                if src_file is None or wb_file == src_file:
+                    self.write_file(content, wb_file)
+                    src_file = wb_file
+
+                else:
+                    self.clone_file(content, src_file, wb_file, self.link_mode)
+
+            except OSError as e:
+                results.append(BuildResult(pm_name, wb_file, str(e)))
+
+            else:
+                results.append(BuildResult(pm_name, wb_file, None))
+
+            self.report(len(results), len(out_files), results[-1])
+
+        return results
+
+    def build_recipients(self, out_files):
+        """Write the workbook of each staff member either serially or across a pool of worker processes.  Each
+        worker keeps its own copy of the builder and reuses its cached header and roster content.
+
+        :param out_files:                   List of (staff full name, workbook path) tuples
+
+        :return:                            List of BuildResult in the same order as `out_files`
+
+        """
+        jobs = min(self.jobs, len(out_files))
+
+        if jobs <= 1:
+            results = []
+
+            for pm_name, wb_file in out_files:
+                results.append(self.write_recipient(pm_name, wb_file))
+                self.report(len(results), len(out_files), results[-1])
+
+            return results
+
+        results = [None] * len(out_files)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                                    initargs=(self,)) as executor:
+
+            futures = {executor.submit(build_recipient, pm_name, wb_file): idx
+                       for idx, (pm_name, wb_file) in enumerate(out_files)}
+
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+
+                idx = futures[future]
+
+                try:
+                    results[idx] = future.result()
+
+                except Exception as e:
+                    results[idx] = BuildResult(out_files[idx][0], out_files[idx][1], str(e))
+
+                self.report(done, len(out_files), results[idx])
+
+        return results
+
+    @staticmethod
+    def carried_value(value):
+        """Hours cell value as entered; whole numbers are kept as integers."""
+
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+
+        return value
+
+    @staticmethod
+    def add_hours(first, second):
+        """Add the hours of two rows of the same staff member cell by cell.  A cell that is not a number in both
+        rows keeps the entry of the first row unless the first is empty.
+
+        :param first:                       List of hours cell values of the first row
+        :param second:                      List of hours cell values of the later row
+
+        :return:                            [0] list of combined hours cell values
+                                            [1] False if any entry of the later row was dropped
+
+        """
+        combined = []
+        kept = True
+
+        for a, b in zip(first, second):
+
+            if b == '':
+                combined.append(a)
+
+            elif a == '':
+                combined.append(b)
+
+            elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (a, b)):
+                combined.append(a + b)
+
+            else:
+                combined.append(a)
+                kept = False
+
+        return combined, kept
+
+    def read_existing(self, wb_file, staff_index):
+        """Read the project headers and staff rows of an existing staff workbook.
+
+        :param wb_file:                     Full path with file name and extension of the workbook
+        :param staff_index:                 RosterIndex of the staff file
+
+        :return:                            List of CarriedSheet in worksheet order
+
+        """
+        sheets = []
+
+        with self.open_xlsx(wb_file) as wkbook:
+
+            for sheet_name, member in wkbook.sheets:
+
+                names, header, values, types = wkbook.read_sheet_blocks(member, (HEADER_ROWS + 1, HEADER_COLS),
+                                                                        HOURS_START_ROW,
+                                                                        (HOURS_START_COL, HOURS_END_COL))
+
+                rows = collections.OrderedDict()
+                unknown = []
+
+                # staff rows run from the first row under the header to the totals row
+                for idx, nm in enumerate(names[HOURS_START_ROW:]):
+
+                    if nm == 'Total':
+                        break
+
+                    hours = [self.carried_value(v) for v in values[idx].tolist()]
+
+                    roster_name = staff_index.match(nm)
+
+                    if roster_name is None:
+                        if nm != '' or any(h != '' for h in hours):
+                            unknown.append((nm, any(h != '' for h in hours)))
+
+                    # staff members listed more than once are combined, as the planner reads them
+                    elif roster_name in rows:
+                        rows[roster_name], kept = self.add_hours(rows[roster_name], hours)
+
+                        if not kept:
+                            warnings.warn("Hours of '{}' listed again on row {} of sheet '{}' in {} were dropped where "
+                                          "they are not numbers.".format(nm, HOURS_START_ROW + idx + 1, sheet_name,
+                                                                         wb_file))
+
+                    else:
+                        rows[roster_name] = hours
+
+                sheets.append(CarriedSheet(sheet_name, header, rows, unknown))
+
+        return sheets
+
+    @staticmethod
+    def is_current(sheets, staff_names):
+        """Check whether every worksheet of a workbook lists the staff and no one who is not in the staff file.
+
+        :param sheets:                      List of CarriedSheet
+        :param staff_names:                 Staff full names the workbook should list
+
+        :return:                            True if the workbook does not need to be rewritten
+
+        """
+        expected = set(staff_names)
+
+        return all(expected.issubset(sheet.rows) and not sheet.unknown for sheet in sheets)
+
+    def render_update(self, sheets, staff_names):
+        """Render a workbook with the project headers and entered hours of an existing one and staff rows for
+        the current roster.  Staff added by name who are still in the staff file are kept.
+
+        :param sheets:                      List of CarriedSheet
+        :param staff_names:                 Staff full names the workbook should list
+
+        :return:                            Workbook as bytes
+
+        """
+        output = io.BytesIO()
+
+        blank = [''] * len(self.wkg_hrs_list)
+
+        with xlsxwriter.Workbook(output, {'in_memory': True}) as wbook:
+
+            # set workbook formatting
+            fmt = self.set_formatting(wbook)
+            date_fmt = wbook.add_format(dict(FORMATS[2], num_format='yyyy-mm-dd'))
+
+            for sheet in sheets:
+
+                ws = wbook.add_worksheet(sheet.name)
+
+                # write static content
+                self.write_static_worksheet_content(ws, fmt, self.target_fy, self.wkg_hrs_list)
+
+                # write project cells as entered; Excel dates are numbers
+                for row, col in CARRIED_CELLS:
+                    value = sheet.header[row, col]
+                    cell_fmt = date_fmt if (row, col) in DATE_CELLS and isinstance(value, float) else fmt[2]
+
+                    ws.write(row, col, value, cell_fmt)
+
+                # write staff area with the entered hours
+                names = set(staff_names) | set(sheet.rows)
+                d = {nm: [sheet.rows.get(nm, blank), '', ''] for nm in names}
+
+                self.write_staff_area(ws, collections.OrderedDict(sorted(d.items())), fmt)
+
+        return output.getvalue()
+
+    def update(self, out_files):
+        """Bring existing workbooks up to date with the staff file.  Workbooks of new staff are created, only
+        workbooks missing staff or listing staff no longer in the staff file are rewritten, and all others are
+        not opened for writing so their modification times and ingest cache entries stay valid.
+
+        :param out_files:                   List of (staff full name, workbook path) tuples
+
+        :return:                            List of BuildResult; `out_files` first, then workbooks of staff no
+                                            longer in the staff file
+
+        """
+        staff_index = RosterIndex(self.staff_list)
+
+        # workbooks of staff no longer in the staff file are kept up to date as well
+        planned = set(os.path.normcase(wb_file) for pm_name, wb_file in out_files)
+
+        others = [(None, os.path.join(self.out_staff_sheets_dir, f))
+                  for f in sorted(os.listdir(self.out_staff_sheets_dir))
+                  if f.endswith('.xlsx') and f[0] not in ('~', '.')
+                  and os.path.normcase(os.path.join(self.out_staff_sheets_dir, f)) not in planned]
+
+        all_files = out_files + others
+
+        content = None
+        results = []
+
+        for pm_name, wb_file in all_files:
+
+            if pm_name is None:
+                staff_names = [] if self.team_column is not None else self.staff_list
+            else:
+                staff_names = self.recipient_staff(pm_name)
+
+            try:
+                if not os.path.exists(wb_file):
+
+                    if self.per_recipient:
+                        result = self.write_recipient(pm_name, wb_file)
+
+                    else:
+                        if content is None:
+                            content = self.render_template(self.staff_list)
+
+                        self.write_file(content, wb_file)
+                        result = BuildResult(pm_name, wb_file, None)
+
+                    if result.error is None:
+                        self.created.append(wb_file)
+
+                else:
+                    sheets = self.read_existing(wb_file, staff_index)
+
+                    if self.is_current(sheets, staff_names):
+                        self.unchanged.append(wb_file)
+
+                    else:
+                        for sheet in sheets:
+                            for nm, has_hours in sheet.unknown:
+                                if has_hours:
+                                    warnings.warn("Hours of '{}' on sheet '{}' in {} were dropped; the name is not "
+                                                  "in the staff file.".format(nm, sheet.name, wb_file))
+
+                        self.write_file(self.render_update(sheets, staff_names), wb_file)
+                        self.updated.append(wb_file)
+
+                    result = BuildResult(pm_name, wb_file, None)
+
+            except (OSError, XlsxWriterException, zipfile.BadZipFile) as e:
+                result = BuildResult(pm_name, wb_file, str(e))
+
+            results.append(result)
+            self.report(len(results), len(all_files), result)
+
+        return results
+
+    def report(self, done, total, result):
+        """Report the progress of a build when a progress function is set."""
+
+        if self.progress is not None:
+            self.progress(done, total, result)
+
+    def build(self):
+        """Method to build all staff worksheets.  The template is rendered once and written for each staff
+        member unless workbooks differ per staff member or existing workbooks are updated."""
+
+        # make staff sheet directory if it does not exist
+        if not os.path.exists(self.out_staff_sheets_dir):
+            os.makedirs(self.out_staff_sheets_dir)
+
+        self.staff_list = self.read_staff_file()
+
+        if self.team_column is not None:
+            self.teams = self.read_teams(self.staff_list)
+
+        if self.rollover_from is not None:
+            self.rollover = self.read_rollover()
+
+        # set out_file names
+        out_files = [(pm_name, os.path.join(self.out_staff_sheets_dir,
+                                            "{}.xlsx".format(self.format_file_name(pm_name))))
+                     for pm_name in self.staff_list]
+
+        if self.update_existing:
+            results = self.update(out_files)
+        elif self.per_recipient:
+            results = self.build_recipients(out_files)
+        else:
+            results = self.build_template(out_files)
+
+        self.failures = [r for r in results if r.error is not None]
+
+        for r in self.failures:
+            warnings.warn("Workbook for '{}' could not be written to {}:  {}".format(r.staff_name, r.file, r.error))
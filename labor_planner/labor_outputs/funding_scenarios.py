@@ -0,0 +1,123 @@
+"""funding_scenarios.py
+
+Build funding scenarios workbook of expected and percentile coverage.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import numpy as np
+import xlsxwriter
+
+import labor_planner.workbook_utils as util
+from labor_planner.funding_scenarios import FundingScenarios, PERCENTILES
+
+
+class Scenarios:
+
+    def __init__(self, config_obj, read_obj, data_obj):
+
+        self.config_obj = config_obj
+
+        self.data = data_obj
+
+        self.read_obj = read_obj
+
+        cube = self.read_obj.cube
+
+        # staff in the order of the overview chart
+        staff_codes = [cube.staff_index[nm] for nm in self.data.name_list]
+
+        self.scenarios = FundingScenarios(cube, self.config_obj.funding_scenarios, staff_codes,
+                                          self.config_obj.scenario_seed)
+
+        # available hours per month of the design and over the design term
+        month_hdr_list = util.implement_design(self.config_obj.design, self.read_obj.month_header)
+        wkg_hours = np.array(self.data.wkg_hours_hdr_list, dtype=np.float64)
+        avail_hours_sum = float(self.data.avail_hours_sum)
+
+        # available hours of all reported staff per month
+        team_hours = wkg_hours * max(len(staff_codes), 1)
+
+        percentile_hdr = ['P{}'.format(p) for p in PERCENTILES]
+
+        scenario_wkbook = xlsxwriter.Workbook(self.config_obj.out_scenario_file)
+
+        # Create formatting objects
+        big_bold = scenario_wkbook.add_format({'bold': 2, 'size': 22})
+        bold_1 = scenario_wkbook.add_format({'bold': 1})
+        bold_center = scenario_wkbook.add_format({'bold': 1, 'align': 'center'})
+        percent_format = scenario_wkbook.add_format({'num_format': '0%'})
+
+        # coverage of each staff member over the design term
+        staff_ws = scenario_wkbook.add_worksheet('staff')
+
+        staff_ws.set_column('A:A', 28)
+        staff_ws.set_column('B:E', 15)
+
+        staff_ws.write('A1', 'Funding Scenarios FY{}'.format(self.config_obj.fy), big_bold)
+        staff_ws.write('A3', 'Scenarios:', bold_1)
+        staff_ws.write('B3', self.scenarios.n_draws)
+        staff_ws.write('A4', 'Available Hours:', bold_1)
+        staff_ws.write('B4', self.data.avail_hours_sum)
+
+        staff_ws.write('A6', 'Staff Member', bold_1)
+        staff_ws.write_row('B6', ['Expected'] + percentile_hdr, bold_center)
+
+        staff_coverage = np.column_stack([self.scenarios.expected_staff,
+                                          self.scenarios.staff_percentiles()]) / avail_hours_sum
+
+        for idx, nm in enumerate(self.data.name_list):
+            staff_ws.write(6 + idx, 0, nm)
+            staff_ws.write_row(6 + idx, 1, np.round(staff_coverage[idx], 2).tolist(), percent_format)
+
+        # coverage of all reported staff per month
+        month_ws = scenario_wkbook.add_worksheet('months')
+
+        month_ws.set_column('A:A', 15)
+        month_ws.set_column('B:F', 15)
+
+        month_ws.write('A1', 'Month', bold_1)
+        month_ws.write_row('B1', ['Available Hours', 'Expected'] + percentile_hdr, bold_center)
+
+        month_coverage = np.column_stack([self.scenarios.expected_month,
+                                          self.scenarios.month_percentiles()]) / team_hours[:, None]
+
+        for idx, month in enumerate(month_hdr_list):
+            month_ws.write(1 + idx, 0, month)
+            month_ws.write(1 + idx, 1, int(team_hours[idx]))
+            month_ws.write_row(1 + idx, 2, np.round(month_coverage[idx], 2).tolist(), percent_format)
+
+        # probability weighted coverage of each staff member per month
+        expected_ws = scenario_wkbook.add_worksheet('expected_by_month')
+
+        expected_ws.set_column('A:A', 28)
+        expected_ws.set_column(1, len(month_hdr_list), 10)
+
+        expected_ws.write('A1', 'Staff Member', bold_1)
+        expected_ws.write_row('B1', month_hdr_list, bold_center)
+
+        expected_coverage = np.round(self.scenarios.expected_staff_month / wkg_hours, 2)
+
+        for idx, nm in enumerate(self.data.name_list):
+            expected_ws.write(1 + idx, 0, nm)
+            expected_ws.write_row(1 + idx, 1, expected_coverage[idx].tolist(), percent_format)
+
+        # percentile coverage of each staff member per month; one worksheet per percentile
+        staff_month_coverage = self.scenarios.staff_month_percentiles() / wkg_hours[None, :, None]
+
+        for p_idx, p_name in enumerate(percentile_hdr):
+            p_ws = scenario_wkbook.add_worksheet('{}_by_month'.format(p_name))
+
+            p_ws.set_column('A:A', 28)
+            p_ws.set_column(1, len(month_hdr_list), 10)
+
+            p_ws.write('A1', 'Staff Member', bold_1)
+            p_ws.write_row('B1', month_hdr_list, bold_center)
+
+            for idx, nm in enumerate(self.data.name_list):
+                p_ws.write(1 + idx, 0, nm)
+                p_ws.write_row(1 + idx, 1, np.round(staff_month_coverage[idx, :, p_idx], 2).tolist(), percent_format)
+
+        scenario_wkbook.close()
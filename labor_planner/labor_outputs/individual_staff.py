@@ -8,6 +8,10 @@ Build individual hours per staff workbook.
 """
 
 import xlsxwriter
+from xlsxwriter.utility import xl_cell_to_rowcol, xl_col_to_name
+
+import labor_planner.workbook_utils as util
+from labor_planner.period_index import design_period
 
 
 class IndividualHours:
@@ -33,11 +37,31 @@ class IndividualHours:
 
         # Set hover over information
         hyperlink_tip = 'Click name to open project workbook.'
+        source_tip = 'Click to open the staff workbook sheet these hours were read from.'
+
+        # entries of the hours cube with their total hours
+        cube = self.read_obj.cube
+        entry_totals = cube.entry_totals()
+
+        # months of the design on the fiscal year calendar
+        start, stop = design_period(self.config_obj.design)
+
+        # available hours and processing months of the design followed by their total
+        row_14_l = util.implement_design(self.config_obj.design, self.read_obj.wkg_hours_hdr)
+        row_14_l.append(self.read_obj.period_index.available_hours(start, stop))
+        row_15_l = util.implement_design(self.config_obj.design, self.read_obj.time_span_hdr)
+
+        # set full date range for coverage period
+        full_date_range = '{}-{}'.format(row_15_l[0].split('-')[0], row_15_l[-1].split('-')[1])
 
-        # Iterate through the individual hours dictionary and write content to file
-        for k in self.read_obj.ind_dict.keys():
+        # month columns start in column E and are followed by the total column
+        end_col = xl_col_to_name(stop - start + 3)
+        total_col = xl_col_to_name(stop - start + 4)
 
-            v = self.read_obj.ind_dict[k]
+        # Iterate through staff with hours in name order and write content to file
+        for code, rows in self.read_obj.staff_entries:
+
+            k = cube.staff_names[code]
 
             # format the worksheet name using modified staff name
             st_name = k.replace('*', '').strip()
@@ -47,54 +71,6 @@ class IndividualHours:
             # instantiate worksheet
             ws = indiv_plan_wkbook.add_worksheet(ws_name)
 
-            # set column E and total column by design
-            if self.config_obj.design == 'quarter_3_4':
-                row_13_l = self.read_obj.month_header_with_total[3:9]
-                row_13_l.append(self.read_obj.month_header_with_total[-1])
-                row_14_l = self.read_obj.work_hours_row[3:9]
-                row_14_l.append(sum(row_14_l))
-                row_15_l = self.read_obj.total_month_range_row[3:9]
-                row_15_l.append(self.read_obj.total_month_range_row[-1])
-                end_col = 'J'
-                total_col = 'K'
-
-            elif self.config_obj.design == 'quarter_3_4_1':
-                row_13_l = self.read_obj.month_header_with_total[-10:]
-                row_14_l = self.read_obj.work_hours_row[3:12]
-                row_14_l.append(sum(row_14_l))
-                row_15_l = self.read_obj.total_month_range_row[-10:]
-                end_col = 'M'
-                total_col = 'N'
-
-            elif self.config_obj.design == 'full_year':
-                row_13_l = self.read_obj.month_header_with_total[-1:]
-                row_14_l = self.read_obj.work_hours_row[0:12]
-                row_14_l.append(sum(row_14_l))
-                row_15_l = self.read_obj.total_month_range_row[0:12]
-                end_col = 'P'
-                total_col = 'Q'
-
-            elif self.config_obj.design == 'quarter_2_3':
-                row_13_l = self.read_obj.month_header_with_total[:6]
-                row_13_l.append(self.read_obj.month_header_with_total[-1])
-                row_14_l = self.read_obj.work_hours_row[:6]
-                row_14_l.append(sum(row_14_l))
-                row_15_l = self.read_obj.total_month_range_row[:6]
-                row_15_l.append(self.read_obj.total_month_range_row[-1])
-                end_col = 'J'
-                total_col = 'K'
-
-            elif self.config_obj.design == 'quarter_2_3_4':
-                row_13_l = self.read_obj.month_header_with_total[:9]
-                row_14_l = self.read_obj.work_hours_row[:9]
-                row_14_l.append(sum(row_14_l))
-                row_15_l = self.read_obj.total_month_range_row[:9]
-                end_col = 'M'
-                total_col = 'N'
-
-            # set full date range for coverage period
-            full_date_range = '{}-{}'.format(row_15_l[0].split('-')[0], row_15_l[-1].split('-')[1])
-
             # set column widths
             ws.set_column('A:A', 10)
             ws.set_column('B:B', 10)
@@ -129,62 +105,47 @@ class IndividualHours:
             ws.write_row('E8', row_15_l, center)
 
             # create merged range cell values
-            if self.config_obj.design == 'quarter_3_4':
-                ws.merge_range('E5:G5', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('H5:J5', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.write('K5', '{}'.format(row_13_l[0]), merge_format)
-                ws.write('K8', full_date_range, center)
-
-            elif self.config_obj.design == 'quarter_2_3':
-                ws.merge_range('E5:G5', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('H5:J5', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.write('K5', '{}'.format(row_13_l[0]), merge_format)
-                ws.write('K8', full_date_range, center)
-
-            elif self.config_obj.design == 'quarter_3_4_1':
-                ws.merge_range('E5:G5', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('H5:J5', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('K5:M5', 'Quarter 1 - FY{0}'.format(int(self.config_obj.fy) + 1), merge_format)
-                ws.write('P5', '{}'.format(row_13_l[0]), merge_format)
-                ws.write('P8', full_date_range, center)
-
-            elif self.config_obj.design == 'quarter_2_3_4':
-                ws.merge_range('E5:G5', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('H5:J5', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('K5:M5', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.write('P5', '{}'.format(row_13_l[0]), merge_format)
-                ws.write('P8', full_date_range, center)
-
-
-            elif self.config_obj.design == 'full_year':
-                ws.merge_range('E5:G5', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('H5:J5', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('K5:M5', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
-                ws.merge_range('N5:P5', 'Quarter 1 - FY{0}'.format(int(self.config_obj.fy) + 1), merge_format)
-                ws.write('Q5', '{}'.format(row_13_l[0]), merge_format)
-                ws.write('Q8', full_date_range, center)
+            util.write_quarter_headers(ws, self.config_obj.design, self.config_obj.fy, 4, 4, merge_format)
+            ws.write('{}5'.format(total_col), 'Total', merge_format)
+            ws.write('{}8'.format(total_col), full_date_range, center)
+
+            # optional column linking each row to its source worksheet
+            if self.config_obj.source_links:
+                source_col = xl_col_to_name(xl_cell_to_rowcol('{}1'.format(total_col))[1] + 1)
+                ws.set_column('{0}:{0}'.format(source_col), 30)
+                ws.write('{}5'.format(source_col), 'SOURCE', bold_1)
+                ws.write('{}6'.format(source_col), 'WORKSHEET', bold_1)
 
             # write content to worksheet
-            for iteration, i in enumerate(v):
+            for iteration, row in enumerate(rows):
+
+                prj = cube.entry_project[row]
+                prj_id = cube.project_ids[prj]
 
                 # create hyperlink if link location exists for project id
-                link_location = self.data.project_path_dict[i[0]]
-                ws.write_url('A{0}'.format(iteration + 9), link_location, url_format, i[0], hyperlink_tip)
+                link_location = self.data.project_path_dict[prj_id]
+                ws.write_url('A{0}'.format(iteration + 9), link_location, url_format, prj_id, hyperlink_tip)
 
                 # write project funding probability
-                ws.write('B{0}'.format(iteration + 9), i[4])
+                ws.write('B{0}'.format(iteration + 9), cube.project_probability[prj])
 
                 # write project name
-                ws.write('C{0}'.format(iteration + 9), i[3])
+                ws.write('C{0}'.format(iteration + 9), self.read_obj.project_title(prj))
 
                 # write project manager information
-                ws.write('D{0}'.format(iteration + 9), i[1])
+                ws.write('D{0}'.format(iteration + 9), cube.project_manager[prj])
 
                 # write hours for each project per month
-                ws.write_row('E{0}'.format(iteration + 9), i[2], center)
+                ws.write_row('E{0}'.format(iteration + 9), cube.entry_hours[row].tolist(), center)
 
                 # write total hours field
-                ws.write('{0}{1}'.format(total_col, iteration + 9), sum(i[2]), center)
+                ws.write('{0}{1}'.format(total_col, iteration + 9), int(entry_totals[row]), center)
+
+                # write link to the source worksheet row
+                if self.config_obj.source_links:
+                    file, sheet, source_row = cube.lineage(row)
+                    ws.write_url('{0}{1}'.format(source_col, iteration + 9), self.read_obj.source_url(row),
+                                 url_format, '{} - {}'.format(sheet, source_row), source_tip)
 
         # Close indiv_plan_wkbook
         indiv_plan_wkbook.close()
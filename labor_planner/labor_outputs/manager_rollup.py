@@ -0,0 +1,153 @@
+"""manager_rollup.py
+
+Build rollup workbook with a worksheet for every manager and their team.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import numpy as np
+import xlsxwriter
+
+import labor_planner.workbook_utils as util
+
+
+class ManagerRollup:
+
+    def __init__(self, config_obj, read_obj, data_obj):
+
+        self.config_obj = config_obj
+
+        self.data = data_obj
+
+        self.read_obj = read_obj
+
+        cube = self.read_obj.cube
+        tree = self.read_obj.org_tree
+
+        # rollup hours per staff member and month; all but the least likely funding probability tier
+        n_tiers = len(self.config_obj.tier_names)
+        tier_totals = cube.staff_class_month_totals(cube.entry_tiers(self.config_obj.tier_edges), n_tiers)
+        month_totals = tier_totals[:, :-1].sum(axis=1)
+
+        # subtree hours and head counts of every staff member in one pass; non-staff marked '**' are not counted
+        team_hours = tree.subtree_sums(month_totals)
+        team_size = tree.subtree_sums(self.data.is_staff.astype(np.int64))
+
+        month_hdr_list = util.implement_design(self.config_obj.design, self.read_obj.month_header)
+        wkg_hours_hdr_list = self.data.wkg_hours_hdr_list
+        avail_hours_sum = self.data.avail_hours_sum
+
+        manager_wkbook = xlsxwriter.Workbook(self.config_obj.out_manager_rollup_file)
+
+        # Create formatting objects
+        big_bold = manager_wkbook.add_format({'bold': 2, 'size': 22})
+        bold_1 = manager_wkbook.add_format({'bold': 1})
+        border_gray_center = manager_wkbook.add_format({'border': 1, 'bg_color': '#BDBDBD', 'align': 'center'})
+        percent_format = manager_wkbook.add_format({'num_format': '0%'})
+        bold_percent = manager_wkbook.add_format({'bold': 1, 'num_format': '0%'})
+        url_format = manager_wkbook.add_format({'font_color': 'blue', 'underline': 0})
+
+        # Set hover over information
+        hyperlink_tip = 'Click name to open the team rollup.'
+
+        managers = tree.managers
+        ws_names = self.sheet_names([cube.staff_names[code] for code in managers])
+
+        # summary of every manager's team
+        summary_ws = manager_wkbook.add_worksheet('managers')
+
+        summary_ws.set_column('A:A', 28)
+        summary_ws.set_column('B:D', 20)
+
+        summary_ws.write('A1', 'Staff Planning', big_bold)
+        summary_ws.write('A3', 'Team Rollups - Only includes projects that are > {:.0%} funding probability'.format(
+            self.config_obj.tier_edges[-1]), bold_1)
+        summary_ws.write_row('A5', ['Manager', 'Team Size', 'Team Hours', 'Percent Covered'], bold_1)
+
+        for idx, (code, ws_name) in enumerate(zip(managers, ws_names)):
+
+            row = 5 + idx
+            total_hours = int(team_hours[code].sum())
+
+            summary_ws.write_url(row, 0, "internal:'{}'!A1".format(ws_name), url_format, cube.staff_names[code],
+                                 hyperlink_tip)
+            summary_ws.write_row(row, 1, [int(team_size[code]), total_hours])
+            summary_ws.write(row, 3, self.percent(total_hours, avail_hours_sum * team_size[code]), percent_format)
+
+        # one worksheet per manager with each member of their team and the team totals
+        totals_column = len(month_hdr_list) + 2
+
+        for code, ws_name in zip(managers, ws_names):
+
+            ws = manager_wkbook.add_worksheet(ws_name)
+
+            ws.set_column('A:B', 28)
+            ws.set_column(2, totals_column + 1, 12)
+
+            ws.write('A1', 'Staff Planning', big_bold)
+            ws.write_row('A3', ['Manager:', cube.staff_names[code]], bold_1)
+
+            ws.write_row('A5', ['Staff Member', 'Supervisor'] + month_hdr_list + ['Total', 'Percent Covered'],
+                         border_gray_center)
+            ws.write_row('A6', ['Wkg Hrs Available =', ''] + list(wkg_hours_hdr_list) + [avail_hours_sum, ''],
+                         border_gray_center)
+
+            row = 6
+            for member in tree.members(code).tolist():
+
+                sup = tree.parent[member]
+                total_hours = int(month_totals[member].sum())
+
+                ws.write(row, 0, cube.staff_names[member])
+                ws.write(row, 1, cube.staff_names[sup] if sup >= 0 else '')
+                ws.write_row(row, 2, month_totals[member].tolist())
+                ws.write(row, totals_column, total_hours)
+                ws.write(row, totals_column + 1, self.percent(total_hours, avail_hours_sum), percent_format)
+
+                row += 1
+
+            # team totals from the precomputed subtree aggregates
+            total_hours = int(team_hours[code].sum())
+
+            ws.write(row + 1, 0, 'Team Total ({} staff)'.format(int(team_size[code])), bold_1)
+            ws.write_row(row + 1, 2, team_hours[code].tolist(), bold_1)
+            ws.write(row + 1, totals_column, total_hours, bold_1)
+            ws.write(row + 1, totals_column + 1, self.percent(total_hours, avail_hours_sum * team_size[code]),
+                     bold_percent)
+
+        manager_wkbook.close()
+
+    @staticmethod
+    def percent(hours, available):
+        """Proportion of available hours covered; 0 when no hours are available."""
+
+        if available == 0:
+            return 0.0
+
+        return float(hours) / available
+
+    @staticmethod
+    def sheet_names(names):
+        """Unique worksheet names of at most 31 characters from staff names."""
+
+        used = set(['managers'])
+        ws_names = []
+
+        for nm in names:
+
+            base = nm.replace('*', '').strip().replace(' ', '_').replace('(', '').replace(')', '').replace(',', '')
+            base = base[:31]
+
+            ws_name = base
+            idx = 1
+            while ws_name.lower() in used:
+                idx += 1
+                suffix = '_{}'.format(idx)
+                ws_name = base[:31 - len(suffix)] + suffix
+
+            used.add(ws_name.lower())
+            ws_names.append(ws_name)
+
+        return ws_names
@@ -10,6 +10,7 @@ Build staff and project overview workbook.
 
 import os
 import xlsxwriter
+from xlsxwriter.utility import xl_col_to_name
 
 import labor_planner.workbook_utils as util
 
@@ -35,25 +36,30 @@ class Overview:
 
         # List of headers
         merged_header_text = 'Proportion of FTE Covered in FY{0}'.format(self.config_obj.fy)
-        header_list = ['> 50% Funding Probability', '<= 50% Funded Probability', 'All Projects']
+        header_list = list(self.config_obj.tier_headers) + ['All Projects']
+
+        # one column per funding probability tier followed by all projects
+        last_column = xl_col_to_name(len(header_list))
 
         # Set hover over information
         hyperlink_tip = 'Click name to open source workbook.'
 
         # Set column widths
         graph_ws1.set_column('A:A', 20)
-        graph_ws1.set_column('B:D', 28)
+        graph_ws1.set_column('B:{}'.format(last_column), 28)
 
         # Write headers to worksheet
-        graph_ws1.merge_range('B1:D1', merged_header_text, header_merge_format)
+        graph_ws1.merge_range('B1:{}1'.format(last_column), merged_header_text, header_merge_format)
         graph_ws1.write('A2', 'Staff Member', bold_1)
         graph_ws1.write_row('B2', header_list, bold_center)
 
         # Write data to worksheet
         graph_ws1.write_column('A3', self.data.full_name_list)
-        graph_ws1.write_column('B3', self.data.full_high_list)
-        graph_ws1.write_column('C3', self.data.full_low_list)
-        graph_ws1.write_column('D3', self.data.percent_list)
+
+        for tier, tier_list in enumerate(self.data.full_tier_lists):
+            graph_ws1.write_column(2, tier + 1, tier_list)
+
+        graph_ws1.write_column('{}3'.format(last_column), self.data.percent_list)
 
         # Create hyperlinks
         # --create hyperlink for each staff member with an existing workbook
@@ -80,19 +86,13 @@ class Overview:
         # Create chart object
         chart = graph_workbook.add_chart({'type': 'column', 'subtype': 'stacked'})
 
-        # Add total percent covered series
-        chart.add_series({
-            'name':         'Prob > 50%',
-            'categories':   '=Sheet1!$A$3:$A${0}'.format(self.data.end_row+1),
-            'values':       '=Sheet1!$B$3:$B${0}'.format(self.data.end_row+1)
-            })
-
-        # Add probable (<= 50%) percent covered series
-        chart.add_series({
-            'name':         'Prob <= 50%',
-            'categories':   '=Sheet1!$A$3:$A${0}'.format(self.data.end_row+1),
-            'values':       '=Sheet1!$C$3:$C${0}'.format(self.data.end_row+1)
-            })
+        # Add a percent covered series for each funding probability tier
+        for tier, tier_name in enumerate(self.config_obj.tier_names):
+            chart.add_series({
+                'name':         tier_name,
+                'categories':   '=Sheet1!$A$3:$A${0}'.format(self.data.end_row+1),
+                'values':       '=Sheet1!${0}$3:${0}${1}'.format(xl_col_to_name(tier + 1), self.data.end_row+1)
+                })
 
         # Set chart style and size
         chart.set_style(18)
@@ -0,0 +1,79 @@
+"""pivots.py
+
+Build pivots workbook of hours and coverage grouped by client, manager, tier, quarter, staff, or project.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import xlsxwriter
+
+from labor_planner.period_index import design_period
+from labor_planner.pivot import PivotEngine, quarter_labels
+
+
+class Pivots:
+
+    def __init__(self, config_obj, read_obj, data_obj):
+
+        self.config_obj = config_obj
+
+        self.data = data_obj
+
+        self.read_obj = read_obj
+
+        start, stop = design_period(self.config_obj.design)
+
+        self.engine = PivotEngine(self.read_obj.cube, self.data.wkg_hours_hdr_list,
+                                  quarter_labels(self.config_obj.fy, start, stop), self.config_obj.tier_names,
+                                  self.config_obj.tier_edges)
+
+        pivot_wkbook = xlsxwriter.Workbook(self.config_obj.out_pivot_file)
+
+        # Create formatting objects
+        bold_1 = pivot_wkbook.add_format({'bold': 1})
+        percent_format = pivot_wkbook.add_format({'num_format': '0%'})
+
+        used = set()
+
+        for dimensions in self.config_obj.pivots:
+
+            table = self.engine.pivot(dimensions)
+
+            ws = pivot_wkbook.add_worksheet(self.sheet_name(dimensions, used))
+
+            n_dims = len(dimensions)
+
+            ws.set_column(0, n_dims - 1, 25)
+            ws.set_column(n_dims, n_dims + 3, 15)
+
+            ws.write_row('A1', [d.capitalize() for d in dimensions] + ['Hours', 'Staff Count', 'Available Hours',
+                                                                       'Percent Covered'], bold_1)
+
+            for idx, labels in enumerate(table.labels):
+                row = 1 + idx
+
+                ws.write_row(row, 0, list(labels))
+                ws.write_row(row, n_dims, [int(table.hours[idx]), int(table.staff_count[idx]),
+                                           int(table.available_hours[idx])])
+                ws.write(row, n_dims + 3, round(float(table.coverage[idx]), 2), percent_format)
+
+        pivot_wkbook.close()
+
+    @staticmethod
+    def sheet_name(dimensions, used):
+        """Unique worksheet name of at most 31 characters from the pivot dimensions."""
+
+        base = '_'.join(dimensions)[:31]
+
+        ws_name = base
+        idx = 1
+        while ws_name in used:
+            idx += 1
+            suffix = '_{}'.format(idx)
+            ws_name = base[:31 - len(suffix)] + suffix
+
+        used.add(ws_name)
+
+        return ws_name
@@ -9,6 +9,7 @@ Build project level workbook summary.
 
 
 import xlsxwriter
+from xlsxwriter.utility import xl_cell_to_rowcol, xl_col_to_name
 
 import labor_planner.workbook_utils as util
 
@@ -35,14 +36,18 @@ class Projects:
         border_gray_center = util.enable_formatting(project_wkbook)[9]
         percent_format = util.enable_formatting(project_wkbook)[10]
 
-        # Iterate through project dictionary
-        for ws_index, k in enumerate(self.read_obj.projects_dict.keys()):
+        # entries of the hours cube with their total hours
+        cube = self.read_obj.cube
+        entry_totals = cube.entry_totals()
 
-            v = self.read_obj.projects_dict[k]
+        # Iterate through projects with hours
+        for ws_index, (code, rows) in enumerate(self.read_obj.project_entries):
+
+            k = cube.project_ids[code]
 
             # get project manager name
-            pm = v[0][1]
-            pb = v[0][3]
+            pm = cube.project_manager[code]
+            pb = float(cube.project_probability[code])
 
             # instantiate worksheet
             set_ws_name = 'sheet_{0}'.format(ws_index)
@@ -91,16 +96,23 @@ class Projects:
             prj_ws.write('{0}11'.format(percent_column), 'Percent Covered', border_gray_center)
             prj_ws.write('{0}12'.format(percent_column), '', border_gray_center)
 
+            # optional column linking each row to its source worksheet
+            if self.config_obj.source_links:
+                source_column = xl_col_to_name(xl_cell_to_rowcol('{}1'.format(percent_column))[1] + 1)
+                prj_ws.write('{0}10'.format(source_column), '', border_gray_center)
+                prj_ws.write('{0}11'.format(source_column), 'Source', border_gray_center)
+                prj_ws.write('{0}12'.format(source_column), '', border_gray_center)
+
             # Set start cell position
             cell_position = 13
 
             # Iterate through each person working on a project
-            for i in v:
+            for row in rows:
 
                 # assign variables
-                staff_name = i[0]
-                staff_hours = i[2]
-                staff_hours_sum = sum(staff_hours)
+                staff_name = self.read_obj.format_sheet_name(cube.staff_names[cube.entry_staff[row]])
+                staff_hours = cube.entry_hours[row].tolist()
+                staff_hours_sum = int(entry_totals[row])
                 percent_covered = (float(staff_hours_sum) / avail_hours_sum)
 
                 # write variables to sheet
@@ -113,6 +125,12 @@ class Projects:
                 # write percent covered
                 prj_ws.write('{0}{1}'.format(percent_column, cell_position), percent_covered, percent_format)
 
+                # write link to the source worksheet row
+                if self.config_obj.source_links:
+                    file, sheet, source_row = cube.lineage(row)
+                    prj_ws.write_url('{0}{1}'.format(source_column, cell_position), self.read_obj.source_url(row),
+                                     string='{} - {}'.format(sheet, source_row))
+
                 # advance cell position
                 cell_position += 1
 
@@ -0,0 +1,65 @@
+"""rebalance.py
+
+Build rebalancing workbook of over allocated staff and proposed hour transfers.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import xlsxwriter
+
+import labor_planner.workbook_utils as util
+from labor_planner.rebalance import Rebalance, read_staff_caps
+
+
+class RebalanceProposals:
+
+    def __init__(self, config_obj, read_obj, data_obj):
+
+        self.config_obj = config_obj
+
+        self.data = data_obj
+
+        self.read_obj = read_obj
+
+        # optional per person caps and staff excluded from transfers
+        if self.config_obj.staff_caps_file is None:
+            staff_caps, excluded = {}, set()
+        else:
+            staff_caps, excluded = read_staff_caps(self.config_obj.staff_caps_file)
+
+        month_hdr_list = util.implement_design(self.config_obj.design, self.read_obj.month_header)
+
+        self.solver = Rebalance(self.read_obj.cube, self.data.wkg_hours_hdr_list, month_hdr_list,
+                                cap=self.config_obj.allocation_cap,
+                                target=self.config_obj.coverage_target,
+                                staff_caps=staff_caps,
+                                excluded=excluded,
+                                min_probability=self.config_obj.rebalance_min_probability)
+
+        rebalance_wkbook = xlsxwriter.Workbook(self.config_obj.out_rebalance_file)
+
+        # Create formatting objects
+        bold_1 = rebalance_wkbook.add_format({'bold': 1})
+
+        # worksheet name, column headers, and rows of each worksheet
+        sheets = [('proposals', ['Month', 'Project', 'From Staff', 'To Staff', 'Hours'], self.solver.transfers),
+                  ('over_allocated', ['Staff Member', 'Month', 'Hours', 'Cap Hours', 'Excess'],
+                   self.solver.over_allocated),
+                  ('unresolved', ['Staff Member', 'Month', 'Hours', 'Cap Hours', 'Excess'], self.solver.unresolved),
+                  ('under_target', ['Staff Member', 'Month', 'Hours', 'Target Hours', 'Deficit'],
+                   self.solver.under_target)]
+
+        for ws_name, header_list, rows in sheets:
+
+            ws = rebalance_wkbook.add_worksheet(ws_name)
+
+            ws.set_column('A:D', 20)
+            ws.set_column('E:E', 12)
+            ws.write_row('A1', header_list, bold_1)
+
+            for idx, row in enumerate(rows):
+                ws.write_row(idx + 1, 0, list(row))
+
+        rebalance_wkbook.close()
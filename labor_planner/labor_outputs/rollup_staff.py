@@ -8,8 +8,10 @@ Build rollup workbook for staff hours indicators of performance.
 """
 
 import xlsxwriter
+from xlsxwriter.utility import xl_cell_to_rowcol, xl_col_to_name
 
 import labor_planner.workbook_utils as util
+from labor_planner.period_index import design_period
 
 
 class Rollup:
@@ -50,116 +52,32 @@ class Rollup:
         wkg_hours_hdr_list = util.implement_design(self.config_obj.design, self.read_obj.wkg_hours_hdr)
         time_span_hdr_list = util.implement_design(self.config_obj.design, self.read_obj.time_span_hdr)
 
-        # Calculate available hours sum
-        avail_hours_sum = sum(wkg_hours_hdr_list)
-
-        # Set design specific criteria
-        if self.config_obj.design == 'full_year':
-
-            # set totals and percent column names
-            totals_column = 'N'
-            percent_column = 'O'
-
-            # define date range for design
-            ts_1 = self.read_obj.time_span_hdr[0].split('-')[0]
-            ts_2 = self.read_obj.time_span_hdr[-1].split('-')[1]
-            date_range = '{0} {1} - {2} {3}'.format(ts_1, self.config_obj.fiscal_year, ts_2, self.config_obj.fiscal_year+1)
-
-            # write merged headers
-            rollup_ws1.merge_range('B9:D9', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('E9:G9', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('H9:J9', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('K9:M9', 'Quarter 1 - FY{0}'.format(int(self.config_obj.fy)+1), merge_format)
-
-        elif self.config_obj.design == 'quarter_2_3_4':
-
-            # set totals column name
-            totals_column = 'K'
-            percent_column = 'L'
-
-            alt_time_span = self.read_obj.time_span_hdr[0:9]
-
-            # define date range for design
-            ts_1 = alt_time_span[0].split('-')[0]
-            ts_2 = alt_time_span[-1].split('-')[1]
-            date_range = '{0} {1} - {2} {3}'.format(ts_1, self.config_obj.fiscal_year, ts_2, self.config_obj.fiscal_year+1)
-
-            # write merged headers
-            rollup_ws1.merge_range('B9:D9', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('E9:G9', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('H9:J9', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
-
-        elif self.config_obj.design == 'quarter_2_3':
-
-            # set totals column name
-            totals_column = 'H'
-            percent_column = 'I'
-
-            alt_time_span = self.read_obj.time_span_hdr[0:6]
-
-            # define date range for design
-            ts_1 = alt_time_span[0].split('-')[0]
-            ts_2 = alt_time_span[-1].split('-')[1]
-            date_range = '{0} {1} - {2} {3}'.format(ts_1, self.config_obj.fiscal_year, ts_2, self.config_obj.fiscal_year+1)
-
-            # write merged headers
-            rollup_ws1.merge_range('B9:D9', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('E9:G9', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-
-        elif self.config_obj.design == 'quarter_2':
-
-            # set totals column name
-            totals_column = 'E'
-            percent_column = 'F'
-
-            alt_time_span = self.read_obj.time_span_hdr[0:3]
+        # months of the design on the fiscal year calendar
+        start, stop = design_period(self.config_obj.design)
 
-            # define date range for design
-            ts_1 = alt_time_span[0].split('-')[0]
-            ts_2 = alt_time_span[-1].split('-')[1]
-            date_range = '{0} {1} - {2} {3}'.format(ts_1, self.config_obj.fiscal_year, ts_2, self.config_obj.fiscal_year+1)
+        # prefix sums of the hours in the rollup; all but the least likely tier
+        cube = self.read_obj.cube
+        period_index = self.read_obj.build_period_index(cube.high_probability_mask(self.config_obj.tier_edges))
 
-            # write merged headers
-            rollup_ws1.merge_range('B9:D9', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-
-        elif self.config_obj.design == 'quarter_3_4_1':
-
-            # set totals column name
-            totals_column = 'K'
-            percent_column = 'L'
-
-            alt_time_span = self.read_obj.time_span_hdr[3:]
-
-            # define date range for design
-            ts_1 = alt_time_span[0].split('-')[0]
-            ts_2 = alt_time_span[-1].split('-')[1]
-            date_range = '{0} {1} - {2} {3}'.format(ts_1, self.config_obj.fiscal_year, ts_2, self.config_obj.fiscal_year+1)
-
-            # write merged headers
-            rollup_ws1.merge_range('B9:D9', 'Quarter 2 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('E9:G9', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('H9:J9', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
-
-        elif self.config_obj.design == 'quarter_3_4':
-
-            # set totals column name
-            totals_column = 'H'
-            percent_column = 'I'
+        # Calculate available hours sum
+        avail_hours_sum = period_index.available_hours(start, stop)
 
-            alt_time_span = self.read_obj.time_span_hdr[3:9]
+        # define date range for design
+        ts_1 = time_span_hdr_list[0].split('-')[0]
+        ts_2 = time_span_hdr_list[-1].split('-')[1]
+        date_range = '{0} {1} - {2} {3}'.format(ts_1, self.config_obj.fiscal_year, ts_2, self.config_obj.fiscal_year+1)
 
-            # define date range for design
-            ts_1 = alt_time_span[0].split('-')[0]
-            ts_2 = alt_time_span[-1].split('-')[1]
-            date_range = '{0} {1} - {2} {3}'.format(ts_1, self.config_obj.fiscal_year, ts_2, self.config_obj.fiscal_year+1)
+        # totals and percent columns follow the month columns
+        totals_column = xl_col_to_name(stop - start + 1)
+        percent_column = xl_col_to_name(stop - start + 2)
 
-            # write merged self.config_obj
-            rollup_ws1.merge_range('B9:D9', 'Quarter 3 - FY{0}'.format(self.config_obj.fy), merge_format)
-            rollup_ws1.merge_range('E9:G9', 'Quarter 4 - FY{0}'.format(self.config_obj.fy), merge_format)
+        # write merged headers
+        util.write_quarter_headers(rollup_ws1, self.config_obj.design, self.config_obj.fy, 8, 1, merge_format)
 
         # Write generic sheet content
         rollup_ws1.write('A1', 'Staff Planning', big_bold)
-        rollup_ws1.write('A3', 'Staff Rollup - Only includes projects that are > 50% funding probability', bold_1)
+        rollup_ws1.write('A3', 'Staff Rollup - Only includes projects that are > {:.0%} funding probability'.format(
+            self.config_obj.tier_edges[-1]), bold_1)
         rollup_ws1.write_row('A4', ['Manager:', 'TGM'])
         rollup_ws1.write('A6', 'Key:')
         rollup_ws1.write('A7', 'Key Explanation:')
@@ -185,40 +103,48 @@ class Rollup:
         rollup_ws1.write('{0}11'.format(percent_column), 'Percent Covered', border_gray_center)
         rollup_ws1.write('{0}12'.format(percent_column), '', border_gray_center)
 
-        # Create sorted staff name list from rollup dictionary
-        staff_column_list = [k for k in self.read_obj.rollup_dict.keys()]
+        # one percent covered column per funding probability tier after the percent column; with the default
+        #  50% split the most likely tier is the percent covered column itself
+        tier_start_column = xl_cell_to_rowcol('{}1'.format(percent_column))[1] + 1
+        tier_names = self.config_obj.tier_names if self.config_obj.custom_tiers else []
 
-        # Sort staff column list
-        staff_column_list.sort()
+        for tier, tier_name in enumerate(tier_names):
+            rollup_ws1.set_column(tier_start_column + tier, tier_start_column + tier, 25)
+            rollup_ws1.write(9, tier_start_column + tier, tier_name, border_gray_center)
+            rollup_ws1.write(10, tier_start_column + tier, 'Percent Covered', border_gray_center)
+            rollup_ws1.write(11, tier_start_column + tier, '', border_gray_center)
 
-        # Write staff to sheet
-        rollup_ws1.write_column('A13', staff_column_list)
+        # Sum hours per staff member, funding probability tier, and month from the hours cube in one pass
+        n_tiers = len(self.config_obj.tier_names)
+        tier_totals = cube.staff_class_month_totals(cube.entry_tiers(self.config_obj.tier_edges), n_tiers)
 
-        # Write the hours for each staff member
-        start_idx = 13
-        for staff in staff_column_list:
+        # the rollup months include all but the least likely tier
+        month_totals = tier_totals[:, :-1].sum(axis=1)
+        tier_percent = tier_totals.sum(axis=2) / float(avail_hours_sum)
 
-            # set staff hours list based on design
-            if self.config_obj.design == 'quarter_3_4':
-                staff_hours_list = self.read_obj.rollup_dict[staff][:6]
+        # total hours and percent covered of each staff member over the months of the design
+        staff_totals = period_index.staff_hours(start, stop)
+        staff_coverage = period_index.staff_coverage(start, stop)
 
-            elif self.config_obj.design == 'quarter_2_3':
-                staff_hours_list = self.read_obj.rollup_dict[staff][:6]
+        # Create sorted staff name list from staff with entries
+        staff_codes = sorted(cube.staff_seen(), key=lambda c: cube.staff_names[c])
+        staff_column_list = [cube.staff_names[c] for c in staff_codes]
 
-            elif self.config_obj.design == 'quarter_2_3_4':
-                staff_hours_list = self.read_obj.rollup_dict[staff][:9]
+        # Write staff to sheet
+        rollup_ws1.write_column('A13', staff_column_list)
 
-            elif self.config_obj.design == 'quarter_3_4_1':
-                staff_hours_list = self.read_obj.rollup_dict[staff][:9]
+        # Write the hours for each staff member
+        start_idx = 13
+        for code in staff_codes:
 
-            elif self.config_obj.design == 'full_year':
-                staff_hours_list = self.read_obj.rollup_dict[staff][:12]
+            # hours were read for the months in the design
+            staff_hours_list = month_totals[code].tolist()
 
             # calculate total hours
-            total_hours = sum(staff_hours_list)
+            total_hours = int(staff_totals[code])
 
             # calculate percent covered
-            percent_covered = (float(total_hours) / avail_hours_sum)
+            percent_covered = float(staff_coverage[code])
 
             # write hours for the appropriate cell range
             rollup_ws1.write_row('B{0}'.format(start_idx), staff_hours_list)
@@ -229,6 +155,10 @@ class Rollup:
             # write percent covered
             rollup_ws1.write('{0}{1}'.format(percent_column, start_idx), percent_covered, percent_format)
 
+            # write percent covered for each tier
+            if tier_names:
+                rollup_ws1.write_row(start_idx - 1, tier_start_column, tier_percent[code].tolist(), percent_format)
+
             # advance index
             start_idx += 1
 
@@ -21,15 +21,18 @@ class Summary:
 
         self.read_obj = read_obj
 
-        # Format data for charts
-        chart_data_list = []
-        for k in self.read_obj.projects_dict.keys():
+        # Format data for charts; counts and sums only include entries with hours
+        cube = self.read_obj.cube
+        has_hours = cube.entry_totals() != 0
+        staff_counts = cube.project_staff_counts(has_hours)
+        hours_sums = cube.project_totals(has_hours)
 
-            v = self.read_obj.projects_dict[k]
+        chart_data_list = []
+        for code, rows in self.read_obj.project_entries:
 
-            project = k
-            staff_number_per_project = len(v)
-            hours_sum_per_project = sum([sum(i[2]) for i in v])
+            project = cube.project_ids[code]
+            staff_number_per_project = int(staff_counts[code])
+            hours_sum_per_project = int(hours_sums[code])
 
             # append data variables to list
             chart_data_list.append([project, staff_number_per_project, hours_sum_per_project])
@@ -62,8 +65,8 @@ class Summary:
         summary_ws3.set_paper(8)
 
         # calculate metrics
-        all_staff = len(self.read_obj.ind_dict.keys())
-        all_projects = len(self.read_obj.projects_dict.keys())
+        all_staff = len(self.read_obj.staff_entries)
+        all_projects = len(self.read_obj.project_entries)
 
         # set column widths
         summary_ws1.set_column('A:A', 25)
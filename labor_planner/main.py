@@ -9,54 +9,101 @@ Execute labor planning code.
 import argparse
 
 from labor_planner.config_reader import ReadConfig
-from labor_planner.labor_builder.build_staff_workbooks import BuildStaffWorkbooks
+from labor_planner.labor_builder.build_staff_workbooks import BuildStaffWorkbooks, print_progress
 from labor_planner.workbook_reader import ReadWorkbooks
+from labor_planner.workbook_validator import ValidateWorkbooks
 from labor_planner.stage_data import Stage
 from labor_planner.labor_outputs.overview import Overview
 from labor_planner.labor_outputs.project_level import Projects
 from labor_planner.labor_outputs.individual_staff import IndividualHours
 from labor_planner.labor_outputs.rollup_staff import Rollup
 from labor_planner.labor_outputs.summary import Summary
+from labor_planner.labor_outputs.funding_scenarios import Scenarios
+from labor_planner.labor_outputs.rebalance import RebalanceProposals
+from labor_planner.labor_outputs.manager_rollup import ManagerRollup
+from labor_planner.labor_outputs.pivots import Pivots
 
 
 class LaborPlanner:
 
-    def __init__(self, config):
+    def __init__(self, config, validate=False):
 
-        self.config_obj = ReadConfig(config)
+        self.config_obj = ReadConfig(config, validate)
+
+        if self.config_obj.validate:
+
+            # check staff workbooks for data problems and write a report; nothing else is run
+            self.validate_obj = ValidateWorkbooks(self.config_obj)
+
+            return
 
         if self.config_obj.build:
 
-            BuildStaffWorkbooks(self.config_obj)
+            BuildStaffWorkbooks(self.config_obj, print_progress)
 
         if self.config_obj.plan:
 
-            # get information from staff workbooks
-            self.read_obj = ReadWorkbooks(self.config_obj)
+            # get information from staff workbooks; several designs are sliced from a single full year read
+            if len(self.config_obj.designs) == 1:
+                self.read_obj = ReadWorkbooks(self.config_obj)
+            else:
+                self.read_obj = ReadWorkbooks(self.config_obj.for_design('full_year', subdirectory=False))
+
+            for design_config in self.config_obj.design_configs():
+                self.run_design(design_config)
+
+    def run_design(self, design_config):
+        """Stage data and build the output workbooks for a single run design.
+
+        :param design_config:           Configuration object of the run design
+
+        """
+        if design_config.design == self.read_obj.my_settings.design:
+            read_obj = self.read_obj
+        else:
+            read_obj = self.read_obj.for_design(design_config)
+
+        # stage data for labor analysis
+        self.data = Stage(design_config, read_obj)
+
+        # build overview workbook
+        Overview(design_config, self.data)
+
+        # build projects workbook
+        Projects(design_config, read_obj, self.data)
+
+        # build individual hours workbook
+        IndividualHours(design_config, read_obj, self.data)
 
-            # stage data for labor analysis
-            self.data = Stage(self.config_obj, self.read_obj)
+        # build rollup workbook
+        Rollup(design_config, read_obj, self.data)
 
-            # build overview workbook
-            Overview(self.config_obj, self.data)
+        # build summary workbook
+        Summary(design_config, read_obj, self.data)
 
-            # build projects workbook
-            Projects(self.config_obj, self.read_obj, self.data)
+        # build funding scenarios workbook
+        if design_config.funding_scenarios > 0:
+            Scenarios(design_config, read_obj, self.data)
 
-            # build individual hours workbook
-            IndividualHours(self.config_obj, self.read_obj, self.data)
+        # build rebalancing workbook
+        if design_config.rebalance:
+            RebalanceProposals(design_config, read_obj, self.data)
 
-            # build rollup workbook
-            Rollup(self.config_obj, self.read_obj, self.data)
+        # build rollup workbook for every manager's team
+        if design_config.manager_rollups:
+            ManagerRollup(design_config, read_obj, self.data)
 
-            # build summary workbook
-            Summary(self.config_obj, self.read_obj, self.data)
+        # build pivots workbook
+        if design_config.pivots:
+            Pivots(design_config, read_obj, self.data)
 
 
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
     parser.add_argument('config_file', type=str, help='Full path with file name to YAML configuration file.')
+    parser.add_argument('--validate', action='store_true',
+                        help='Only check the staff workbooks for data problems and write a validation report.')
     args = parser.parse_args()
 
-    LaborPlanner(args.config_file)
+    LaborPlanner(args.config_file, args.validate)
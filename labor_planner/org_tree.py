@@ -0,0 +1,115 @@
+"""org_tree.py
+
+Staff to supervisor tree with subtree aggregates.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import warnings
+
+import numpy as np
+
+from labor_planner.period_index import prefix_sum
+
+
+class OrgTree:
+    """Tree of staff members built once from the supervisor of each staff member.
+
+    Staff are laid out in depth-first order so that the subtree of every staff member is a contiguous range of
+    that order.  Subtree aggregates of any per staff values are then a single prefix sum over the order and one
+    subtraction per staff member, so each manager's totals come without summing their team again.
+
+    :param staff_names:                 List of staff full names
+    :param supervisors:                 List of the supervisor full name of each staff member; empty for none
+
+    """
+
+    def __init__(self, staff_names, supervisors):
+
+        self.staff_names = list(staff_names)
+
+        n = len(self.staff_names)
+        index = {nm: idx for idx, nm in enumerate(self.staff_names)}
+
+        # supervisor of each staff member; -1 for staff at the top of the tree
+        self.parent = np.full(n, -1, dtype=np.int64)
+
+        for idx, sup in enumerate(supervisors):
+
+            sup = str(sup).strip()
+
+            if sup == '' or sup == self.staff_names[idx]:
+                continue
+
+            if sup not in index:
+                warnings.warn("Supervisor '{}' of '{}' is not in the staff file; '{}' is placed at the top of the "
+                              "tree.".format(sup, self.staff_names[idx], self.staff_names[idx]))
+                continue
+
+            self.parent[idx] = index[sup]
+
+        self.children = [[] for _ in range(n)]
+        for idx, sup in enumerate(self.parent.tolist()):
+            if sup >= 0:
+                self.children[sup].append(idx)
+
+        # depth-first order; the subtree of a staff member is order[start[idx]:stop[idx]]
+        self.order = np.empty(n, dtype=np.int64)
+        self.start = np.full(n, -1, dtype=np.int64)
+        self.stop = np.full(n, -1, dtype=np.int64)
+        self.depth = np.zeros(n, dtype=np.int64)
+
+        position = 0
+        for root in np.flatnonzero(self.parent < 0).tolist():
+
+            stack = [(root, False)]
+
+            while stack:
+                node, done = stack.pop()
+
+                if done:
+                    self.stop[node] = position
+                    continue
+
+                self.start[node] = position
+                self.order[position] = node
+                position += 1
+
+                stack.append((node, True))
+
+                for child in reversed(self.children[node]):
+                    self.depth[child] = self.depth[node] + 1
+                    stack.append((child, False))
+
+        # staff that cannot be reached from the top of the tree supervise each other
+        if position < n:
+            cycle = [self.staff_names[idx] for idx in np.flatnonzero(self.start < 0)]
+            raise ValueError("Supervisors form a cycle between: {}".format(', '.join(cycle)))
+
+    @property
+    def managers(self):
+        """Staff codes of everyone with at least one report, in tree order."""
+
+        return [idx for idx in self.order.tolist() if self.children[idx]]
+
+    def members(self, node):
+        """Staff codes of a staff member and everyone under them, in tree order."""
+
+        return self.order[self.start[node]:self.stop[node]]
+
+    def subtree_sums(self, values):
+        """Sum per staff values over the subtree of every staff member in a single pass.
+
+        :param values:                  Array with one row per staff member
+
+        :return:                        Array of the same shape with the subtree sum of each staff member
+
+        """
+        values = np.asarray(values)
+
+        # prefix sums along the tree order; the leading zero row is at position 0
+        cum = np.moveaxis(prefix_sum(np.moveaxis(values[self.order], 0, -1)), -1, 0)
+
+        return cum[self.stop] - cum[self.start]
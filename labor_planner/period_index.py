@@ -0,0 +1,134 @@
+"""period_index.py
+
+Prefix-sum index of available and planned hours over the months of the fiscal year.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import numpy as np
+
+
+# months of the fiscal year covered by each run design as slices of the 12 month calendar
+DESIGN_SLICES = {'full_year': slice(None),
+                 'quarter_2_3_4': slice(0, 9),
+                 'quarter_2_3': slice(0, 6),
+                 'quarter_2': slice(0, 3),
+                 'quarter_3_4_1': slice(-9, None),
+                 'quarter_3_4': slice(3, 9)}
+
+# number of months in the fiscal year calendar
+N_MONTHS = 12
+
+
+def design_period(design, n_months=N_MONTHS):
+    """Get the month range of a run design.
+
+    :param design:                      Run design name
+    :param n_months:                    Number of months in the calendar
+
+    :return:                            [0] zero-based first month
+                                        [1] month to stop before
+
+    """
+    start, stop, step = DESIGN_SLICES[design].indices(n_months)
+
+    return start, stop
+
+
+def prefix_sum(values):
+    """Cumulative sum along the last axis with a leading zero so that any range sums with one subtraction."""
+
+    values = np.asarray(values)
+
+    out = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.result_type(values, np.int64))
+    np.cumsum(values, axis=-1, out=out[..., 1:])
+
+    return out
+
+
+class PeriodIndex:
+    """Totals for any contiguous range of months from prefix sums built once.
+
+    Months are positions on the 12 month fiscal year calendar of the work hours file.  Range totals are a
+    single subtraction per staff member or project, and rolling windows are one vectorized subtraction.
+
+    :param available_hours:             List of available work hours for each month of the calendar
+    :param staff_hours:                 Optional array of hours per staff member and calendar month
+    :param project_hours:               Optional array of hours per project and calendar month
+
+    """
+
+    def __init__(self, available_hours, staff_hours=None, project_hours=None):
+
+        self.n_months = len(available_hours)
+
+        self.available_cum = prefix_sum(available_hours)
+
+        self.staff_cum = None if staff_hours is None else prefix_sum(staff_hours)
+        self.project_cum = None if project_hours is None else prefix_sum(project_hours)
+
+    @staticmethod
+    def range_sum(cum, start, stop):
+        """Sum of a prefix-summed array over months [start, stop)."""
+
+        return cum[..., stop] - cum[..., start]
+
+    @staticmethod
+    def rolling_sum(cum, window):
+        """Sums over every window of consecutive months; the last axis is the first month of each window."""
+
+        return cum[..., window:] - cum[..., :-window]
+
+    def design(self, design):
+        """Month range of a run design on this calendar.
+
+        :param design:                  Run design name
+
+        :return:                        (start, stop) months
+
+        """
+        return design_period(design, self.n_months)
+
+    def available_hours(self, start=0, stop=None):
+        """Available work hours over months [start, stop).
+
+        :return:                        int
+
+        """
+        return int(self.range_sum(self.available_cum, start, self.n_months if stop is None else stop))
+
+    def staff_hours(self, start=0, stop=None):
+        """Hours of each staff member over months [start, stop).
+
+        :return:                        Array with one value per staff member
+
+        """
+        return self.range_sum(self.staff_cum, start, self.n_months if stop is None else stop)
+
+    def project_hours(self, start=0, stop=None):
+        """Hours of each project over months [start, stop).
+
+        :return:                        Array with one value per project
+
+        """
+        return self.range_sum(self.project_cum, start, self.n_months if stop is None else stop)
+
+    def staff_coverage(self, start=0, stop=None):
+        """Proportion of available hours covered for each staff member over months [start, stop).
+
+        :return:                        Array with one value per staff member
+
+        """
+        return self.staff_hours(start, stop) / float(self.available_hours(start, stop))
+
+    def rolling_coverage(self, window=3):
+        """Proportion of available hours covered for each staff member over every window of consecutive months.
+
+        :param window:                  Number of months in each window
+
+        :return:                        Array with shape (staff, windows); window i starts at month i
+
+        """
+        return self.rolling_sum(self.staff_cum, window) / self.rolling_sum(self.available_cum, window)
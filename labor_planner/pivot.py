@@ -0,0 +1,163 @@
+"""pivot.py
+
+Grouped hours and coverage over any combination of client, manager, tier, quarter, staff, and project.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import collections
+
+import numpy as np
+
+
+# dimensions a pivot can group by
+DIMENSIONS = ('client', 'manager', 'tier', 'quarter', 'staff', 'project')
+
+# grouped hours and coverage; `labels` holds one tuple of dimension labels per group
+PivotTable = collections.namedtuple('PivotTable', ['dimensions', 'labels', 'hours', 'staff_count', 'available_hours',
+                                                   'coverage'])
+
+
+def quarter_labels(fy, start, stop):
+    """Quarter label of each month of a run design.  The fiscal year calendar starts in quarter 2.
+
+    :param fy:                          Two digit fiscal year as a string
+    :param start:                       Zero-based first month of the design on the 12 month calendar
+    :param stop:                        Month of the calendar to stop before
+
+    :return:                            List of quarter labels, one per month of the design
+
+    """
+    names = ['Quarter 2 - FY{}'.format(fy), 'Quarter 3 - FY{}'.format(fy), 'Quarter 4 - FY{}'.format(fy),
+             'Quarter 1 - FY{}'.format(int(fy) + 1)]
+
+    return [names[month // 3] for month in range(start, stop)]
+
+
+def factorize(values):
+    """Integer code of each value and the unique values in order of first appearance."""
+
+    index = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values))
+
+    return codes, list(index)
+
+
+class PivotEngine:
+    """Group hours over any combination of dimensions with a single vectorized group-by.
+
+    The code of every dimension is computed once per entry.  A pivot combines the codes of its dimensions into
+    one key per entry, or per entry and quarter when grouping by quarter, and sums hours and counts distinct
+    staff with hours per group with `np.unique` and `np.bincount`.  Coverage is the hours over the available
+    hours of the staff in the group for the months in the group.
+
+    :param cube:                        HoursCube of staff hours per project and month
+    :param available_hours:             List of available work hours for each month of the design
+    :param quarters:                    List of the quarter label of each month of the design
+    :param tier_names:                  Funding probability tier names
+    :param tier_edges:                  Descending funding probability tier edges
+
+    """
+
+    def __init__(self, cube, available_hours, quarters, tier_names, tier_edges):
+
+        self.cube = cube
+
+        self.available = np.asarray(available_hours, dtype=np.float64)
+
+        # quarter of each month of the design
+        self.quarter_codes, self.quarter_names = factorize(quarters)
+
+        # code and labels of each dimension per entry; quarter is per month
+        client_codes, clients = factorize([d.client for d in cube.project_details])
+        manager_codes, managers = factorize([str(m) for m in cube.project_manager])
+
+        self.codes = {'client': client_codes[cube.entry_project],
+                      'manager': manager_codes[cube.entry_project],
+                      'tier': cube.entry_tiers(tier_edges),
+                      'staff': cube.entry_staff.astype(np.int64),
+                      'project': cube.entry_project.astype(np.int64)}
+
+        self.labels = {'client': clients,
+                       'manager': managers,
+                       'tier': list(tier_names),
+                       'quarter': self.quarter_names,
+                       'staff': cube.staff_names,
+                       'project': cube.project_ids}
+
+    def pivot(self, dimensions):
+        """Group hours and coverage by a combination of dimensions.
+
+        :param dimensions:              List of dimension names from DIMENSIONS
+
+        :return:                        PivotTable with one row per group
+
+        """
+        for dim in dimensions:
+            if dim not in DIMENSIONS:
+                raise ValueError("Pivot dimension '{}' not valid. Must be one of {}.".format(dim, DIMENSIONS))
+
+        n_entries = self.cube.n_entries
+        n_quarters = len(self.quarter_names)
+
+        if 'quarter' in dimensions:
+
+            # hours of each entry per quarter; rows are entry-major
+            entry_hours = np.zeros((n_entries, n_quarters), dtype=np.int64)
+            np.add.at(entry_hours.T, self.quarter_codes, self.cube.entry_hours.T)
+
+            rows = {dim: np.repeat(codes, n_quarters) for dim, codes in self.codes.items()}
+            rows['quarter'] = np.tile(np.arange(n_quarters), n_entries)
+
+            hours = entry_hours.ravel()
+
+            # available hours of a single staff member per quarter
+            period_available = np.bincount(self.quarter_codes, weights=self.available, minlength=n_quarters)
+            row_available = period_available[rows['quarter']]
+
+        else:
+            rows = self.codes
+            hours = self.cube.entry_totals()
+            row_available = np.full(n_entries, self.available.sum())
+
+        # rows without hours do not count toward the staff of a group
+        keep = hours != 0
+        rows = {dim: codes[keep] for dim, codes in rows.items()}
+        hours = hours[keep]
+        row_available = row_available[keep]
+
+        # one combined key per row
+        sizes = [len(self.labels[dim]) for dim in dimensions]
+        key = np.ravel_multi_index([rows[dim] for dim in dimensions], sizes) if dimensions else np.zeros(len(hours),
+                                                                                                          np.int64)
+
+        groups, group_index = np.unique(key, return_inverse=True)
+        n_groups = len(groups)
+
+        group_hours = np.bincount(group_index, weights=hours, minlength=n_groups).astype(np.int64)
+
+        # distinct staff per group and their available hours over the months of the group
+        pairs, pair_index = np.unique(group_index * self.cube.n_staff + rows['staff'], return_index=True)
+        pair_group = pairs // self.cube.n_staff
+
+        staff_count = np.bincount(pair_group, minlength=n_groups)
+        available_hours = np.bincount(pair_group, weights=row_available[pair_index], minlength=n_groups)
+
+        coverage = np.divide(group_hours, available_hours, out=np.zeros(n_groups), where=available_hours > 0)
+
+        # labels of each group; groups are sorted by label, and tiers and quarters in their own order
+        label_codes = [codes.tolist() for codes in np.unravel_index(groups, sizes)] if dimensions else []
+        labels = list(zip(*[[self.labels[dim][c] for c in codes] for dim, codes in zip(dimensions, label_codes)]))
+
+        if not dimensions:
+            labels = [()] * n_groups
+
+        sort_keys = list(zip(*[codes if dim in ('tier', 'quarter') else [self.labels[dim][c] for c in codes]
+                               for dim, codes in zip(dimensions, label_codes)])) or labels
+
+        order = sorted(range(n_groups), key=lambda i: sort_keys[i])
+
+        return PivotTable(list(dimensions), [labels[i] for i in order], group_hours[order], staff_count[order],
+                          available_hours[order], coverage[order])
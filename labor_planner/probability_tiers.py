@@ -0,0 +1,33 @@
+"""probability_tiers.py
+
+Funding probability tiers used to split staff hours.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import numpy as np
+
+
+# default tiers split projects at a 50% funding probability
+DEFAULT_TIER_NAMES = ('Prob > 50%', 'Prob <= 50%')
+DEFAULT_TIER_EDGES = (0.5,)
+
+# column headers of the default tiers in the overview workbook
+DEFAULT_TIER_HEADERS = ('> 50% Funding Probability', '<= 50% Funded Probability')
+
+
+def assign_tiers(probability, edges):
+    """Assign each funding probability to a tier in a single binning pass.
+
+    :param probability:                 Array of funding probabilities
+    :param edges:                       Descending tier edges; tier 0 holds probabilities above edges[0], tier i
+                                        those above edges[i] and at most edges[i-1], and the last tier the rest
+
+    :return:                            int64 array of the tier of each probability; 0 is the most likely tier
+
+    """
+    ascending = np.asarray(edges, dtype=np.float64)[::-1]
+
+    return len(ascending) - np.digitize(probability, ascending, right=True)
@@ -0,0 +1,208 @@
+"""rebalance.py
+
+Detect over allocated and under covered staff and propose hour transfers between staff on the same project.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import collections
+
+import numpy as np
+import pandas as pd
+
+
+# staff hours above the cap in a month
+OverAllocation = collections.namedtuple('OverAllocation', ['staff_name', 'month', 'hours', 'cap_hours', 'excess'])
+
+# staff hours below the coverage target in a month
+UnderTarget = collections.namedtuple('UnderTarget', ['staff_name', 'month', 'hours', 'target_hours', 'deficit'])
+
+# proposed move of hours between two staff members on the same project in a month
+Transfer = collections.namedtuple('Transfer', ['month', 'prj_id', 'from_staff', 'to_staff', 'hours'])
+
+
+def read_staff_caps(f):
+    """Read the optional per person caps file.
+
+    :param f:                           Full path with file name and extension to a CSV file with the columns
+                                        `staff_name`, `cap`, and `eligible`; `cap` and `eligible` may be empty
+
+    :return:                            [0] {staff_name: cap}
+                                        [1] set of staff names excluded from transfers
+
+    """
+    df = pd.read_csv(f, dtype={'staff_name': str})
+
+    caps = {}
+    excluded = set()
+
+    for rec in df.to_dict('records'):
+
+        if 'cap' in rec and not pd.isna(rec['cap']):
+            caps[rec['staff_name']] = float(rec['cap'])
+
+        if 'eligible' in rec and not pd.isna(rec['eligible']) and str(rec['eligible']).strip().lower() in \
+                ('false', '0', 'no'):
+            excluded.add(rec['staff_name'])
+
+    return caps, excluded
+
+
+class Rebalance:
+    """Find staff over their cap in any month and staff below the coverage target, then greedily propose hour
+    transfers from over allocated staff to staff with room on the same project.
+
+    For each month, over allocated staff are handled from the largest excess; each of their projects is taken
+    from the most hours, and the hours go to the other staff on that project with the largest shortfall to the
+    coverage target first, never above their own cap.
+
+    :param cube:                        HoursCube of staff hours per project and month
+    :param available_hours:             List of available work hours for each month of the design
+    :param month_labels:                List of month labels of the design
+    :param cap:                         Default proportion of available hours a staff member can be allocated
+    :param target:                      Proportion of available hours below which a staff member is under target
+    :param staff_caps:                  Optional {staff_name: cap} overriding the default cap
+    :param excluded:                    Optional staff names that do not give or receive hours
+    :param min_probability:             Only move hours on projects with at least this funding probability
+
+    """
+
+    def __init__(self, cube, available_hours, month_labels, cap=1.0, target=0.8, staff_caps=None, excluded=(),
+                 min_probability=0.0):
+
+        self.cube = cube
+        self.month_labels = list(month_labels)
+
+        available = np.asarray(available_hours, dtype=np.float64)
+
+        # cap per staff member; non-staff marked with '**' and excluded staff do not take part in transfers
+        staff_cap = np.full(cube.n_staff, cap, dtype=np.float64)
+        for nm, staff_cap_value in (staff_caps or {}).items():
+            if nm in cube.staff_index:
+                staff_cap[cube.staff_index[nm]] = staff_cap_value
+
+        self.eligible = np.array(['**' not in nm and nm not in excluded for nm in cube.staff_names], dtype=bool)
+
+        # cap and target hours per staff member and month
+        self.cap_hours = np.floor(staff_cap[:, None] * available[None, :])
+        self.target_hours = target * available[None, :].repeat(cube.n_staff, axis=0)
+
+        # staff hours per month; kept up to date as transfers are proposed
+        self.staff_month = cube.staff_month_totals()
+
+        # hours per staff member and project pair over months; duplicate worksheets of a pair are combined
+        n_projects = max(cube.n_projects, 1)
+        pair_keys, pair_index = np.unique(cube.entry_staff.astype(np.int64) * n_projects + cube.entry_project,
+                                          return_inverse=True)
+
+        self.pair_staff = pair_keys // n_projects
+        self.pair_project = pair_keys % n_projects
+        self.pair_hours = np.zeros((len(pair_keys), cube.n_months), dtype=np.int64)
+        np.add.at(self.pair_hours, pair_index, cube.entry_hours)
+
+        # only pairs on projects that can be rebalanced
+        movable = cube.project_probability[self.pair_project] >= min_probability
+
+        # pairs of each staff member and each project
+        self.staff_pairs = collections.defaultdict(list)
+        self.project_pairs = collections.defaultdict(dict)
+
+        for pair in np.flatnonzero(movable).tolist():
+            staff = int(self.pair_staff[pair])
+            self.staff_pairs[staff].append(pair)
+            self.project_pairs[int(self.pair_project[pair])][staff] = pair
+
+        self.over_allocated = self.find_over_allocated()
+        self.under_target = self.find_under_target()
+
+        self.transfers = []
+        for month in range(cube.n_months):
+            self.transfers.extend(self.solve_month(month))
+
+        # over allocation left after the proposed transfers
+        self.unresolved = self.find_over_allocated()
+
+    def find_over_allocated(self):
+        """Staff with more hours than their cap in a month.
+
+        :return:                        List of OverAllocation
+
+        """
+        excess = self.staff_month - self.cap_hours
+
+        return [OverAllocation(self.cube.staff_names[s], self.month_labels[m], int(self.staff_month[s, m]),
+                               int(self.cap_hours[s, m]), int(excess[s, m]))
+                for s, m in zip(*np.nonzero((excess > 0) & self.eligible[:, None]))]
+
+    def find_under_target(self):
+        """Listed staff with fewer hours than the coverage target in a month.
+
+        :return:                        List of UnderTarget
+
+        """
+        listed = np.zeros(self.cube.n_staff, dtype=bool)
+        listed[self.cube.staff_seen()] = True
+
+        deficit = self.target_hours - self.staff_month
+
+        return [UnderTarget(self.cube.staff_names[s], self.month_labels[m], int(self.staff_month[s, m]),
+                            int(round(self.target_hours[s, m])), int(round(deficit[s, m])))
+                for s, m in zip(*np.nonzero((deficit > 0) & (self.eligible & listed)[:, None]))]
+
+    def solve_month(self, month):
+        """Greedily propose transfers that bring staff under their cap in a month.
+
+        :param month:                   Position of the month in the design
+
+        :return:                        List of Transfer
+
+        """
+        transfers = []
+
+        hours = self.staff_month[:, month]
+        cap = self.cap_hours[:, month]
+        target = self.target_hours[:, month]
+
+        excess = hours - cap
+        donors = [s for s in np.argsort(-excess, kind='stable').tolist() if excess[s] > 0 and self.eligible[s]]
+
+        for donor in donors:
+
+            # projects of the donor with the most hours in the month first
+            pairs = sorted(self.staff_pairs.get(donor, []), key=lambda p: -self.pair_hours[p, month])
+
+            for pair in pairs:
+
+                if hours[donor] <= cap[donor]:
+                    break
+
+                prj = int(self.pair_project[pair])
+
+                # other eligible staff on the project with room under their cap; largest shortfall to target first
+                receivers = [s for s in self.project_pairs[prj] if s != donor and self.eligible[s]
+                             and hours[s] < cap[s]]
+                receivers.sort(key=lambda s: (hours[s] - target[s], hours[s] - cap[s]))
+
+                for receiver in receivers:
+
+                    amount = int(min(hours[donor] - cap[donor], self.pair_hours[pair, month],
+                                     cap[receiver] - hours[receiver]))
+
+                    if amount <= 0:
+                        continue
+
+                    self.pair_hours[pair, month] -= amount
+                    self.pair_hours[self.project_pairs[prj][receiver], month] += amount
+
+                    hours[donor] -= amount
+                    hours[receiver] += amount
+
+                    transfers.append(Transfer(self.month_labels[month], self.cube.project_ids[prj],
+                                              self.cube.staff_names[donor], self.cube.staff_names[receiver], amount))
+
+                    if hours[donor] <= cap[donor] or self.pair_hours[pair, month] == 0:
+                        break
+
+        return transfers
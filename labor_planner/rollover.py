@@ -0,0 +1,144 @@
+"""rollover.py
+
+Carry the projects of this fiscal year's plan forward to next year's staff workbooks.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import collections
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+
+from labor_planner.probability_tiers import DEFAULT_TIER_EDGES
+from labor_planner.workbook_reader import ReadWorkbooks
+
+
+# project carried forward to next year
+#  owner is the file name, without extension, of the staff workbook the project was first read from
+#  hours holds {staff_name: [hours per carried month]} of the staff with hours in the carried months
+RolloverProject = collections.namedtuple('RolloverProject', ['owner', 'prj_id', 'title', 'manager', 'probability',
+                                                             'client', 'hours'])
+
+# columns of a rollover snapshot file before the hours of each carried month
+SNAPSHOT_COLUMNS = ['owner', 'prj_id', 'title', 'manager', 'probability', 'client', 'staff_name']
+
+
+def read_plan(config_obj, data_dir):
+    """Read a fiscal year of staff workbooks for a rollover.
+
+    :param config_obj:                  Builder configuration object
+    :param data_dir:                    Full path to the directory of this year's staff workbooks
+
+    :return:                            ReadWorkbooks object of the full year
+
+    """
+    read_config = copy.copy(config_obj)
+
+    read_config.data_dir = data_dir
+    read_config.design = 'full_year'
+    read_config.jobs = config_obj.build_jobs
+    # the streaming reader opens .xlsx files without depending on the installed xlrd version
+    read_config.reader = 'stream'
+    read_config.cache_dir = None
+    read_config.tier_edges = list(DEFAULT_TIER_EDGES)
+
+    return ReadWorkbooks(read_config)
+
+
+def collect_projects(cube, n_months=0):
+    """Get the projects of a parsed plan with the hours of its last months.
+
+    :param cube:                        HoursCube of staff hours per project and month
+    :param n_months:                    Number of trailing months of hours to carry; 0 for none
+
+    :return:                            List of RolloverProject in the order projects were read, including
+                                        projects listed with staff but no hours
+
+    """
+    hours = collections.defaultdict(dict)
+
+    if n_months > 0:
+        trailing = cube.entry_hours[:, cube.n_months - n_months:]
+
+        # staff members listed more than once on a project are combined
+        for entry in np.flatnonzero(trailing.any(axis=1)).tolist():
+            staff_name = cube.staff_names[cube.entry_staff[entry]]
+            prj_hours = hours[int(cube.entry_project[entry])]
+
+            prj_hours[staff_name] = (prj_hours.get(staff_name, 0) + trailing[entry]).tolist()
+
+    projects = []
+
+    # projects in the order they were listed, followed by any only added with hours
+    prj_ids = list(cube.listed_projects) + [p for p in cube.project_ids if p not in cube.listed_projects]
+
+    for prj_id in prj_ids:
+        code = cube.project_index.get(prj_id)
+
+        # continuing projects listed without hours yet are carried with their worksheet header; rows of sheets
+        #  without a project identifier are not projects of their own
+        if code is not None:
+            meta = cube.project_meta(code)
+        elif prj_id in cube.declared_projects:
+            meta = cube.listed_projects[prj_id]
+        else:
+            continue
+
+        owner = os.path.splitext(os.path.basename(meta.file))[0] if meta.file else ''
+
+        projects.append(RolloverProject(owner, meta.prj_id, meta.title, meta.manager, meta.probability, meta.client,
+                                        dict(sorted(hours[code].items())) if code is not None else {}))
+
+    return projects
+
+
+def write_snapshot(projects, n_months, f):
+    """Save rollover projects to a CSV file with one row per project and staff member with hours.
+
+    :param projects:                    List of RolloverProject
+    :param n_months:                    Number of carried months of hours
+    :param f:                           Full path with file name and extension to the CSV file
+
+    """
+    month_columns = ['month_{}'.format(i + 1) for i in range(n_months)]
+
+    rows = []
+    for p in projects:
+        for staff_name, month_hours in (p.hours.items() or [('', [''] * n_months)]):
+            rows.append([p.owner, p.prj_id, p.title, p.manager, p.probability, p.client, staff_name] + month_hours)
+
+    pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS + month_columns).to_csv(f, index=False)
+
+
+def read_snapshot(f):
+    """Read rollover projects saved by `write_snapshot`.
+
+    :param f:                           Full path with file name and extension to the CSV file
+
+    :return:                            [0] list of RolloverProject in file order
+                                        [1] number of carried months of hours
+
+    """
+    df = pd.read_csv(f, dtype={c: str for c in SNAPSHOT_COLUMNS if c != 'probability'}, keep_default_na=False)
+
+    month_columns = [c for c in df.columns if c.startswith('month_')]
+
+    projects = collections.OrderedDict()
+
+    for rec in df.to_dict('records'):
+
+        key = (rec['owner'], rec['prj_id'])
+
+        if key not in projects:
+            projects[key] = RolloverProject(rec['owner'], rec['prj_id'], rec['title'], rec['manager'],
+                                            float(rec['probability']), rec['client'], {})
+
+        if rec['staff_name'] != '':
+            projects[key].hours[rec['staff_name']] = [int(rec[c]) for c in month_columns]
+
+    return list(projects.values()), len(month_columns)
@@ -9,6 +9,11 @@ Stage data for use in LaborPlanner.
 
 import os
 
+import numpy as np
+
+import labor_planner.workbook_utils as util
+from labor_planner.period_index import design_period
+
 
 class Stage:
 
@@ -23,7 +28,7 @@ class Stage:
         self.wkg_hours_hdr_list = self.implement_design(self.read_obj.wkg_hours_hdr)
 
         # get the total available hours for the design term
-        self.avail_hours_sum = sum(self.wkg_hours_hdr_list)
+        self.avail_hours_sum = self.read_obj.period_index.available_hours(*design_period(self.config_obj.design))
 
         # list of post masters staff
         self.post_ma_list = []
@@ -52,6 +57,13 @@ class Stage:
         self.high_percent_list = []
         self.low_percent_list = []
 
+        # lists of formatted staff names and percent funded for each funding probability tier
+        self.tier_name_lists = []
+        self.tier_percent_lists = []
+
+        # total, high, and low probability hours and coverage per staff member
+        self.staff_coverage()
+
         # split post grad list and combined list
         self.process_non_staff()
 
@@ -59,8 +71,12 @@ class Stage:
         self.calc_high_probability()
         self.calc_low_probability()
 
+        # create lists for each funding probability tier
+        self.calc_tiers()
+
         self.look_up_list = []
         self.full_name_list = []
+        self.full_tier_lists = []
         self.full_high_list = []
         self.full_low_list = []
 
@@ -78,93 +94,103 @@ class Stage:
         :return:                    Truncated list based on the design type
 
         """
-        if self.config_obj.design == 'full_year':
-            out_list = in_list
+        return util.implement_design(self.config_obj.design, in_list)
 
-        elif self.config_obj.design == 'quarter_2_3_4':
-            out_list = in_list[0:9]
+    def staff_coverage(self):
+        """Reduce the hours cube to hours per funding probability tier and staff member in a single pass and
+        set the arrays the coverage lists are sliced from.  Columns are the tiers from most to least likely,
+        then high and low probability as split by `HoursCube.high_probability_mask`, then all hours.
 
-        elif self.config_obj.design == 'quarter_2_3':
-            out_list = in_list[0:6]
+        """
+        cube = self.read_obj.cube
 
-        elif self.config_obj.design == 'quarter_2':
-            out_list = in_list[0:3]
+        # entry class; the funding probability tier of the project
+        n_tiers = len(self.config_obj.tier_names)
+        classes = cube.entry_tiers(self.config_obj.tier_edges)
 
-        elif self.config_obj.design == 'quarter_3_4_1':
-            out_list = in_list[-9:]
+        hours, counts = cube.staff_class_totals(classes, n_tiers)
 
-        elif self.config_obj.design == 'quarter_3_4':
-            out_list = in_list[3:9]
+        # high and low probability; the same split as the rollup
+        is_low = (~cube.high_probability_mask(self.config_obj.tier_edges)).astype(np.int64)
+        split_hours, split_counts = cube.staff_class_totals(is_low, 2)
 
-        else:
-            out_list = []
+        # staff hours per tier, high and low probability, and in total
+        self.staff_hours = np.column_stack([hours, split_hours, hours.sum(axis=1)])
 
-        return out_list
+        # proportion of available hours covered
+        self.staff_percent = np.round(self.staff_hours / float(self.avail_hours_sum), 2)
 
-    def process_non_staff(self):
-        """Create new list removing **Post MA assessments, keep them in a separate list"""
+        # staff members that are not marked with '**' as non-staff
+        self.is_staff = np.array(['**' not in nm for nm in cube.staff_names], dtype=bool)
 
-        for k in self.read_obj.staff_dict.keys():
+        # staff codes in name order shared by all lists
+        self.staff_order = cube.staff_codes_by_name()
 
-            v = self.read_obj.staff_dict[k]
+        # staff listed on any worksheet and staff with entries in each class
+        listed = np.zeros(cube.n_staff, dtype=bool)
+        listed[cube.staff_seen()] = True
 
-            if '**' in k:
-                self.post_ma_list.append(sum(v))
-            else:
-                # calculate percent covered
-                total_percent_covered = round((float(sum(v)) / float(self.avail_hours_sum)), 2)
-                self.combine_list.append([k, total_percent_covered])
+        self.staff_present = np.column_stack([counts > 0, split_counts > 0, listed])
 
-        # Sort by last name ascending
-        self.combine_list.sort()
+        # columns of the high probability, low probability, and all hours coverage lists
+        self.high_column, self.low_column, self.total_column = n_tiers, n_tiers + 1, n_tiers + 2
 
-        # Create separate list for names and percent covered
-        self.name_list = [i[0] for i in self.combine_list]
-        self.percent_list = [i[1] for i in self.combine_list]
+    def coverage_list(self, column):
+        """Get [staff_name, percent covered] for staff in name order, skipping non-staff names marked with '**'.
 
-        # Return post masters list
-        self.post_masters_hours = sum(self.post_ma_list)
+        :param column:              Column of the staff coverage arrays; a tier, `high_column` or `low_column`
+                                    for high or low probability, or `total_column` for all hours
 
-    def calc_high_probability(self):
-        """Create lists of high-probability funding."""
+        :return:                    [0] list of staff names
+                                    [1] list of percent covered
 
-        for k in self.read_obj.staff_high_prob_dict.keys():
+        """
+        keep = self.staff_present[self.staff_order, column] & self.is_staff[self.staff_order]
+        codes = self.staff_order[keep]
 
-            v = self.read_obj.staff_high_prob_dict[k]
+        names = [self.read_obj.cube.staff_names[code] for code in codes]
 
-            if '**' in k:
-                pass
+        return names, self.staff_percent[codes, column].tolist()
 
-            else:
-                high_prob_percent = round((float(sum(v)) / float(self.avail_hours_sum)), 2)
-                self.high_prob_list.append([k, high_prob_percent])
+    def process_non_staff(self):
+        """Create new list removing **Post MA assessments, keep them in a separate list"""
+
+        totals = self.staff_hours[:, self.total_column]
 
-        # Sort by last name ascending
-        self.high_prob_list.sort()
+        self.post_ma_list = [int(totals[code]) for code in self.read_obj.cube.staff_seen() if not self.is_staff[code]]
+
+        # Create separate list for names and percent covered
+        self.name_list, self.percent_list = self.coverage_list(self.total_column)
+
+        self.combine_list = [list(i) for i in zip(self.name_list, self.percent_list)]
+
+        # Return post masters list
+        self.post_masters_hours = sum(self.post_ma_list)
+
+    def calc_high_probability(self):
+        """Create lists of high-probability funding; all but the least likely tier."""
 
         # Create separate lists for names and percent covered
-        self.high_name_list = [i[0] for i in self.high_prob_list]
-        self.high_percent_list = [i[1] for i in self.high_prob_list]
+        self.high_name_list, self.high_percent_list = self.coverage_list(self.high_column)
+
+        self.high_prob_list = [list(i) for i in zip(self.high_name_list, self.high_percent_list)]
 
     def calc_low_probability(self):
-        """Create lists of low-probability funding."""
+        """Create lists of low-probability funding; the least likely tier."""
 
-        for k in self.read_obj.staff_low_prob_dict.keys():
+        # Create separte list for names and percent covered
+        self.low_name_list, self.low_percent_list = self.coverage_list(self.low_column)
 
-            v = self.read_obj.staff_low_prob_dict[k]
+        self.low_prob_list = [list(i) for i in zip(self.low_name_list, self.low_percent_list)]
 
-            if '**' in k:
-                pass
-            else:
-                low_prob_percent = round((float(sum(v)) / float(self.avail_hours_sum)), 2)
-                self.low_prob_list.append([k, low_prob_percent])
+    def calc_tiers(self):
+        """Create lists of names and percent covered for each funding probability tier."""
 
-        # Sort by last name ascending
-        self.low_prob_list.sort()
+        for tier in range(len(self.config_obj.tier_names)):
+            names, percents = self.coverage_list(tier)
 
-        # Create separte list for names and percent covered
-        self.low_name_list = [i[0] for i in self.low_prob_list]
-        self.low_percent_list = [i[1] for i in self.low_prob_list]
+            self.tier_name_lists.append(names)
+            self.tier_percent_lists.append(percents)
 
     def prep_chart_info(self):
         """Create lists that will be used to populate chart values
@@ -173,27 +199,21 @@ class Stage:
 
         """
 
-        for i in self.name_list:
-
-            if (i in self.high_name_list) and (i in self.low_name_list):
-                self.look_up_list.append([i, self.high_percent_list[self.high_name_list.index(i)], self.low_percent_list[self.low_name_list.index(i)]])
-
-            elif (i in self.high_name_list) and (i not in self.low_name_list):
-                self.look_up_list.append([i, self.high_percent_list[self.high_name_list.index(i)], 0.0])
+        # hashed lookups so each name is joined in constant time
+        tier_lookups = [dict(zip(*i)) for i in zip(self.tier_name_lists, self.tier_percent_lists)]
+        high_lookup = dict(zip(self.high_name_list, self.high_percent_list))
+        low_lookup = dict(zip(self.low_name_list, self.low_percent_list))
 
-            elif (i in self.low_name_list) and (i not in self.high_name_list):
-                self.look_up_list.append([i, 0.0, self.low_percent_list[self.low_name_list.index(i)]])
-
-            else:
-                self.look_up_list.append([i, 0.0, 0.0])
+        self.look_up_list = [[i] + [lookup.get(i, 0.0) for lookup in tier_lookups] for i in self.name_list]
 
         # Sort look up list
         self.look_up_list.sort()
 
         # Create lists for outputs
         self.full_name_list = [i[0] for i in self.look_up_list]
-        self.full_high_list = [i[1] for i in self.look_up_list]
-        self.full_low_list = [i[2] for i in self.look_up_list]
+        self.full_tier_lists = [[i[tier + 1] for i in self.look_up_list] for tier in range(len(tier_lookups))]
+        self.full_high_list = [high_lookup.get(i, 0.0) for i in self.full_name_list]
+        self.full_low_list = [low_lookup.get(i, 0.0) for i in self.full_name_list]
 
         # Get value for the length of name column
         return len(self.full_name_list) + 1
@@ -206,7 +226,11 @@ class Stage:
 
         project_path_dict = {}
 
-        for idx, k in enumerate(self.read_obj.projects_dict.keys()):
+        project_ids = self.read_obj.cube.project_ids
+
+        for idx, (code, rows) in enumerate(self.read_obj.project_entries):
+
+            k = project_ids[code]
 
             ws = 'sheet_{}'.format(idx)
 
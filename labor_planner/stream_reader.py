@@ -0,0 +1,325 @@
+"""stream_reader.py
+
+Stream cell blocks from .xlsx staff workbooks without xlrd.
+
+The sheet XML is read directly from the .xlsx zip archive with an incremental parser.  Only the cells
+that the planner needs are decoded and each worksheet is released before the next one is read, so memory
+use per workbook stays flat regardless of how many worksheets it contains.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+
+# cell type codes; these match the xlrd cell type constants so blocks from either reader are interchangeable
+XL_CELL_EMPTY = 0
+XL_CELL_TEXT = 1
+XL_CELL_NUMBER = 2
+XL_CELL_DATE = 3
+XL_CELL_BOOLEAN = 4
+XL_CELL_ERROR = 5
+
+# internal error codes for error cell text, as reported by xlrd; other error text, such as '#SPILL!' from newer
+#  versions of Excel, is read as '#N/A'
+ERROR_CODES = {'#NULL!': 0x00, '#DIV/0!': 0x07, '#VALUE!': 0x0F, '#REF!': 0x17, '#NAME?': 0x1D, '#NUM!': 0x24,
+               '#N/A': 0x2A}
+
+# spreadsheetML namespaces
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+C_TAG = NS_MAIN + 'c'
+V_TAG = NS_MAIN + 'v'
+T_TAG = NS_MAIN + 't'
+R_TAG = NS_MAIN + 'r'
+IS_TAG = NS_MAIN + 'is'
+SI_TAG = NS_MAIN + 'si'
+ROW_TAG = NS_MAIN + 'row'
+
+# escaped characters in text, e.g. _x000D_
+ESCAPE_PATTERN = re.compile(r'_x[0-9A-Fa-f]{4}_')
+
+
+def unescape(s):
+    """Replace spreadsheetML escape sequences with their characters."""
+
+    if '_' in s:
+        return ESCAPE_PATTERN.sub(lambda m: chr(int(m.group(0)[2:6], 16)), s)
+
+    return s
+
+
+def cooked_text(elem):
+    """Get the text of a <t> or <v> element, stripping whitespace unless it is preserved."""
+
+    t = elem.text
+
+    if t is None:
+        return ''
+
+    if elem.get(XML_SPACE) != 'preserve':
+        t = t.strip('\t\n\r ')
+
+    return unescape(t)
+
+
+def rich_text(elem):
+    """Get the text of a shared string <si> or inline string <is> element including rich text runs."""
+
+    accum = []
+
+    for child in elem:
+
+        if child.tag == T_TAG:
+            accum.append(cooked_text(child))
+
+        elif child.tag == R_TAG:
+            accum.extend(cooked_text(t) for t in child if t.tag == T_TAG)
+
+    return ''.join(accum)
+
+
+def split_cell_name(cell_name):
+    """Convert a cell name such as 'B16' to zero-based row and column indices."""
+
+    col = 0
+
+    for idx, c in enumerate(cell_name):
+
+        if c.isdigit():
+            return int(cell_name[idx:]) - 1, col - 1
+
+        if c != '$':
+            col = col * 26 + (ord(c) - 64)
+
+    raise ValueError("Cell name '{}' has no row number.".format(cell_name))
+
+
+class StreamWorkbook:
+    """Read-only streaming view of an .xlsx workbook.
+
+    :param in_file:                     Full path with file name and extension to the .xlsx workbook
+
+    """
+
+    def __init__(self, in_file):
+
+        self.in_file = in_file
+
+        self.zip = zipfile.ZipFile(in_file)
+
+        try:
+            # [(sheet name, archive member), ...] in workbook order
+            self.sheets = self.read_sheet_list()
+
+            # shared string table; shared by all sheets so it does not grow with sheet count
+            self.sst = self.read_shared_strings()
+
+        except Exception:
+            self.zip.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the underlying zip archive."""
+
+        self.zip.close()
+
+    def sheet_names(self):
+        """List of worksheet names in workbook order."""
+
+        return [i[0] for i in self.sheets]
+
+    def read_sheet_list(self):
+        """Get the worksheet names and their archive members from the workbook part.
+
+        :return:                        List of (sheet name, archive member) tuples
+
+        """
+        targets = {}
+
+        with self.zip.open('xl/_rels/workbook.xml.rels') as rels:
+            for rel in ET.parse(rels).getroot().iter(NS_PKG_REL + 'Relationship'):
+
+                # only worksheets are read; chartsheets and other parts are skipped
+                if rel.get('Type', '').endswith('/worksheet'):
+                    target = rel.get('Target')
+
+                    if target.startswith('/'):
+                        targets[rel.get('Id')] = target.lstrip('/')
+                    else:
+                        targets[rel.get('Id')] = posixpath.normpath(posixpath.join('xl', target))
+
+        with self.zip.open('xl/workbook.xml') as wb:
+            sheets = ET.parse(wb).getroot().iter(NS_MAIN + 'sheet')
+
+            return [(s.get('name'), targets[s.get(NS_REL + 'id')]) for s in sheets if s.get(NS_REL + 'id') in targets]
+
+    def read_shared_strings(self):
+        """Read the shared string table incrementally.
+
+        :return:                        List of shared strings
+
+        """
+        sst = []
+
+        if 'xl/sharedStrings.xml' not in self.zip.namelist():
+            return sst
+
+        with self.zip.open('xl/sharedStrings.xml') as f:
+            for event, elem in ET.iterparse(f):
+                if elem.tag == SI_TAG:
+                    sst.append(rich_text(elem))
+                    elem.clear()
+
+        return sst
+
+    def decode_cell(self, elem):
+        """Decode the value of a cell element the same way xlrd does.
+
+        :return:                        [0] cell type code, [1] cell value
+
+        """
+        cell_type = elem.get('t', 'n')
+
+        if cell_type == 'inlineStr':
+            for child in elem:
+                if child.tag == IS_TAG:
+                    return XL_CELL_TEXT, rich_text(child)
+
+            return XL_CELL_TEXT, ''
+
+        v = elem.find(V_TAG)
+
+        if cell_type == 'n':
+            if v is None or not v.text:
+                return XL_CELL_EMPTY, ''
+
+            return XL_CELL_NUMBER, float(v.text)
+
+        elif cell_type == 's':
+            if v is None or not v.text:
+                return XL_CELL_EMPTY, ''
+
+            return XL_CELL_TEXT, self.sst[int(v.text)]
+
+        elif cell_type == 'str':
+            return XL_CELL_TEXT, '' if v is None else cooked_text(v)
+
+        elif cell_type == 'b':
+            return XL_CELL_BOOLEAN, 1 if (v is not None and v.text in ('1', 'true', 'on')) else 0
+
+        elif cell_type == 'e':
+            return XL_CELL_ERROR, ERROR_CODES['#N/A'] if v is None else ERROR_CODES.get(v.text, ERROR_CODES['#N/A'])
+
+        # ISO 8601 date cells are kept as text
+        return XL_CELL_TEXT, '' if v is None else cooked_text(v)
+
+    def iter_cells(self, member):
+        """Stream the cells of a worksheet one row at a time.
+
+        :param member:                  Archive member name of the worksheet
+
+        :return:                        Generator of (row index, column index, cell element)
+
+        """
+        row_idx = -1
+
+        with self.zip.open(member) as f:
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+
+                if elem.tag != ROW_TAG:
+                    continue
+
+                if event == 'start':
+                    r = elem.get('r')
+                    row_idx = row_idx + 1 if r is None else int(r) - 1
+                    continue
+
+                col_idx = -1
+                for c in elem:
+                    if c.tag != C_TAG:
+                        continue
+
+                    cell_name = c.get('r')
+                    if cell_name is None:
+                        col_idx += 1
+                    else:
+                        row_idx, col_idx = split_cell_name(cell_name)
+
+                    yield row_idx, col_idx, c
+
+                # release the row once its cells have been visited
+                elem.clear()
+
+    def read_sheet_blocks(self, member, header_shape, hours_start_row, hours_cols, keep_names=None):
+        """Decode the blocks of a worksheet that the planner uses.
+
+        :param member:                  Archive member name of the worksheet
+        :param header_shape:            (rows, columns) of the header block starting at A1
+        :param hours_start_row:         Zero-based first row of the hours block
+        :param hours_cols:              (first, stop) zero-based columns of the hours block
+        :param keep_names:              Optional container of column A values; hours are only decoded for
+                                        rows whose name is in it
+
+        :return:                        [0] list of column A values
+                                        [1] 2-D array of header cell values
+                                        [2] 2-D array of hours cell values
+                                        [3] 2-D array of hours cell types
+
+        """
+        header = np.full(header_shape, '', dtype=object)
+        names = []
+        hours = {}
+
+        first_col, stop_col = hours_cols
+        keep_row = True
+
+        for row, col, c in self.iter_cells(member):
+
+            if col == 0:
+                cell_type, value = self.decode_cell(c)
+
+                # pad column A up to this row
+                names.extend([''] * (row - len(names)))
+                names.append(value)
+
+                if row >= hours_start_row:
+                    keep_row = (keep_names is None) or (value in keep_names)
+
+            if row < header_shape[0] and col < header_shape[1]:
+                header[row, col] = self.decode_cell(c)[1]
+
+            elif row >= hours_start_row and first_col <= col < stop_col and keep_row:
+                hours.setdefault(row, {})[col] = self.decode_cell(c)
+
+            # a new row without a column A cell has no name to match
+            if col > 0 and row >= len(names):
+                keep_row = keep_names is None
+
+        n_rows = max(len(names) - hours_start_row, 0)
+        values = np.full((n_rows, stop_col - first_col), '', dtype=object)
+        types = np.full((n_rows, stop_col - first_col), XL_CELL_EMPTY, dtype=object)
+
+        for row, cells in hours.items():
+            if row - hours_start_row < n_rows:
+                for col, (cell_type, value) in cells.items():
+                    types[row - hours_start_row, col - first_col] = cell_type
+                    values[row - hours_start_row, col - first_col] = value
+
+        return names, header, values, types
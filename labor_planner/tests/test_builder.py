@@ -7,19 +7,39 @@ Tests for BuildStaffWorkbooks class.
 
 """
 
+import copy
+import filecmp
 import os
+import tempfile
 import unittest
+import warnings
+
+import xlrd
+import xlsxwriter
 
 from labor_planner.config_reader import ReadConfig
 from labor_planner.labor_builder.build_staff_workbooks import BuildStaffWorkbooks
 
 
+class RecipientBuilder(BuildStaffWorkbooks):
+    """Builder that writes every workbook separately."""
+
+    @property
+    def per_recipient(self):
+        return True
+
+
 class TestBuilder(unittest.TestCase):
     """Test BuildStaffWorkbooks attributes."""
 
     TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
     TEST_CONFIG_FILE = os.path.join(TEST_DATA_DIR, 'config_build.yml')
     TEST_CONFIG_OBJ = ReadConfig(TEST_CONFIG_FILE)
+
+    # build in a temporary directory so the staff workbooks the planner tests read are not overwritten
+    TEST_OUTPUT_DIR = tempfile.TemporaryDirectory()
+    TEST_CONFIG_OBJ.data_dir = os.path.join(TEST_OUTPUT_DIR.name, 'FY_2018')
+
     TEST_READ_OBJ = BuildStaffWorkbooks(TEST_CONFIG_OBJ)
 
     def test_num_months_wkg(self):
@@ -49,3 +69,217 @@ class TestBuilder(unittest.TestCase):
         for i in TestBuilder.TEST_READ_OBJ.wkg_hrs_list:
 
             self.assertIs(type(i), int)
+
+    @staticmethod
+    def workbook_values(wb_file=None, content=None):
+        """Sheet names and cell values of a workbook file or of workbook bytes."""
+
+        with xlrd.open_workbook(wb_file, file_contents=content) as wkbook:
+            return [(ws.name, [ws.row_values(r) for r in range(ws.nrows)]) for ws in wkbook.sheets()]
+
+    def test_workbooks_match_template(self):
+        """Ensure every staff workbook is the template rendered once."""
+
+        builder = TestBuilder.TEST_READ_OBJ
+
+        staff_list = builder.read_staff_file()
+        template = self.workbook_values(content=builder.render_template(staff_list))
+
+        # the compressed bytes vary with the creation time stored in the workbook, so compare the contents
+        for nm in staff_list:
+            wb_file = os.path.join(builder.out_staff_sheets_dir, '{}.xlsx'.format(builder.format_file_name(nm)))
+
+            self.assertEqual(self.workbook_values(wb_file), template)
+
+    def test_hardlink(self):
+        """Ensure hardlinked workbooks match the first workbook written."""
+
+        config_obj = copy.copy(TestBuilder.TEST_CONFIG_OBJ)
+        config_obj.link_mode = 'hardlink'
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = os.path.join(tmp, 'FY_2018')
+
+            builder = BuildStaffWorkbooks(config_obj)
+
+            files = sorted(os.path.join(config_obj.data_dir, i) for i in os.listdir(config_obj.data_dir))
+            self.assertEqual(len(files), len(builder.read_staff_file()))
+
+            # links fall back to copies on filesystems without them
+            for wb_file in files[1:]:
+                self.assertTrue(filecmp.cmp(files[0], wb_file, shallow=False))
+
+    def test_parallel_recipients(self):
+        """Ensure workbooks written by worker processes match the template and failures are isolated."""
+
+        config_obj = copy.copy(TestBuilder.TEST_CONFIG_OBJ)
+        config_obj.build_jobs = 2
+
+        progress = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = tmp
+
+            # a directory in place of one workbook cannot be written
+            os.mkdir(os.path.join(tmp, 'lennon_john.xlsx'))
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                builder = RecipientBuilder(config_obj, lambda done, total, result: progress.append((done, total)))
+
+            self.assertEqual([r.staff_name for r in builder.failures], ['Lennon, John'])
+            self.assertEqual(len([w for w in caught if 'Lennon, John' in str(w.message)]), 1)
+
+            self.assertEqual(sorted(progress), [(i, 4) for i in range(1, 5)])
+
+            template = self.workbook_values(content=builder.render_template(builder.staff_list))
+
+            for nm in ['harrison_george', 'mccartney_paul', 'starr_ringo']:
+                self.assertEqual(self.workbook_values(os.path.join(tmp, '{}.xlsx'.format(nm))), template)
+
+    def test_team_workbooks(self):
+        """Ensure team workbooks only list the owner and their team followed by free rows."""
+
+        config_obj = copy.copy(TestBuilder.TEST_CONFIG_OBJ)
+        config_obj.team_column = 'supervisor'
+        config_obj.free_staff_rows = 2
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = tmp
+
+            BuildStaffWorkbooks(config_obj)
+
+            expected = {'lennon_john': ['Harrison, George', 'Lennon, John', 'McCartney, Paul'],
+                        'harrison_george': ['Harrison, George', 'Starr, Ringo'],
+                        'starr_ringo': ['Starr, Ringo']}
+
+            for nm, team in expected.items():
+                with xlrd.open_workbook(os.path.join(tmp, '{}.xlsx'.format(nm))) as wkbook:
+                    ws = wkbook.sheet_by_index(0)
+
+                    self.assertEqual(ws.col_values(0, 15), team + ['', '', 'Total'])
+                    self.assertEqual(wkbook.nsheets, config_obj.num_blank_wksheets)
+
+    def test_update_unreadable(self):
+        """Ensure an existing workbook that is not a valid .xlsx file is reported instead of stopping the update."""
+
+        config_obj = copy.copy(TestBuilder.TEST_CONFIG_OBJ)
+        config_obj.update_existing = True
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = tmp
+
+            with open(os.path.join(tmp, 'lennon_john.xlsx'), 'w') as f:
+                f.write('not a workbook')
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                builder = BuildStaffWorkbooks(config_obj)
+
+            self.assertEqual([r.staff_name for r in builder.failures], ['Lennon, John'])
+            self.assertIn('cannot be opened', builder.failures[0].error)
+            self.assertEqual(len([w for w in caught if 'Lennon, John' in str(w.message)]), 1)
+            self.assertEqual(len(builder.created), 3)
+
+    def test_update_duplicate_rows(self):
+        """Ensure hours of a staff member listed on more than one row are added together when a workbook is updated."""
+
+        config_obj = copy.copy(TestBuilder.TEST_CONFIG_OBJ)
+        config_obj.update_existing = True
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = tmp
+
+            lennon_file = os.path.join(tmp, 'lennon_john.xlsx')
+
+            # Lennon is listed twice and the rest of the staff are missing
+            with xlsxwriter.Workbook(lennon_file) as wbook:
+                ws = wbook.add_worksheet('help')
+                ws.write('B3', '100')
+                ws.write_column('A16', ['Lennon, John', 'Lennon, John', 'Total'])
+                ws.write_row('B16', [8, '', 'TBD'])
+                ws.write_row('B17', [2, 4, 'later'])
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                builder = BuildStaffWorkbooks(config_obj)
+
+            self.assertIn(lennon_file, builder.updated)
+            self.assertEqual(len([w for w in caught if 'listed again on row 17' in str(w.message)]), 1)
+
+            with xlrd.open_workbook(lennon_file) as wkbook:
+                ws = wkbook.sheet_by_name('help')
+
+                self.assertEqual(ws.col_values(0, 15, 20), builder.staff_list + ['Total'])
+                self.assertEqual(ws.row_values(15 + builder.staff_list.index('Lennon, John'), 1, 5),
+                                 [10.0, 4.0, 'TBD', ''])
+
+    @staticmethod
+    def write_roster(f, rows):
+        """Write a staff file of (last name, first name, supervisor) rows."""
+
+        with open(f, 'w') as out:
+            out.write('last_name,first_name,middle_initial,supervisor\n')
+            out.writelines('{},{},,"{}"\n'.format(*r) for r in rows)
+
+    def test_update_existing(self):
+        """Ensure updates keep entered hours, create workbooks for new staff, and leave current workbooks alone."""
+
+        config_obj = copy.copy(TestBuilder.TEST_CONFIG_OBJ)
+        config_obj.team_column = 'supervisor'
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = os.path.join(tmp, 'FY_2018')
+            config_obj.in_staff_csv = os.path.join(tmp, 'all_staff.csv')
+
+            self.write_roster(config_obj.in_staff_csv, [('Harrison', 'George', 'Lennon, John'), ('Lennon', 'John', ''),
+                                                        ('McCartney', 'Paul', 'Lennon, John'), ('Starr', 'Ringo', '')])
+            BuildStaffWorkbooks(config_obj)
+
+            # hours entered in a renamed project sheet; McCartney is entered by hand
+            lennon_file = os.path.join(config_obj.data_dir, 'lennon_john.xlsx')
+
+            with xlsxwriter.Workbook(lennon_file) as wbook:
+                ws = wbook.add_worksheet('abbey_road')
+                ws.write('B3', '100')
+                ws.write('B4', 'Abbey Road')
+                ws.write_column('A16', ['Harrison, George', 'Lennon, John', 'paul mccartney', 'Total'])
+                ws.write_row('B16', [8, 8])
+                ws.write('D18', 4)
+
+            mtimes = {f: os.stat(os.path.join(config_obj.data_dir, f)).st_mtime_ns
+                      for f in os.listdir(config_obj.data_dir)}
+
+            # Starr joins Harrison's team
+            config_obj.update_existing = True
+            self.write_roster(config_obj.in_staff_csv, [('Harrison', 'George', 'Lennon, John'), ('Lennon', 'John', ''),
+                                                        ('McCartney', 'Paul', 'Lennon, John'),
+                                                        ('Starr', 'Ringo', 'Harrison, George')])
+            builder = BuildStaffWorkbooks(config_obj)
+
+            self.assertEqual([os.path.basename(f) for f in builder.updated], ['harrison_george.xlsx'])
+            self.assertEqual(builder.created, [])
+
+            for f in ['lennon_john.xlsx', 'mccartney_paul.xlsx', 'starr_ringo.xlsx']:
+                self.assertEqual(os.stat(os.path.join(config_obj.data_dir, f)).st_mtime_ns, mtimes[f])
+
+            # McCartney leaves and Best joins
+            self.write_roster(config_obj.in_staff_csv, [('Best', 'Pete', 'Lennon, John'),
+                                                        ('Harrison', 'George', 'Lennon, John'), ('Lennon', 'John', ''),
+                                                        ('Starr', 'Ringo', 'Harrison, George')])
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                builder = BuildStaffWorkbooks(config_obj)
+
+            self.assertEqual([os.path.basename(f) for f in builder.created], ['best_pete.xlsx'])
+            self.assertIn(lennon_file, builder.updated)
+            self.assertEqual(len([w for w in caught if 'paul mccartney' in str(w.message)]), 1)
+
+            with xlrd.open_workbook(lennon_file) as wkbook:
+                ws = wkbook.sheet_by_name('abbey_road')
+
+                self.assertEqual(ws.cell_value(2, 1), '100')
+                self.assertEqual(ws.cell_value(3, 1), 'Abbey Road')
+                self.assertEqual(ws.col_values(0, 15, 18), ['Best, Pete', 'Harrison, George', 'Lennon, John'])
+                self.assertEqual(ws.row_values(16, 1, 4), [8.0, 8.0, ''])
@@ -0,0 +1,109 @@
+"""test_funding_scenarios.py
+
+Tests for FundingScenarios class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import time
+import unittest
+
+import numpy as np
+
+from labor_planner.hours_cube import HoursCube
+from labor_planner.funding_scenarios import FundingScenarios
+
+
+class TestFundingScenarios(unittest.TestCase):
+    """Test expected hours and funding scenario percentiles."""
+
+    STAFF_LIST = ['Starr, Ringo', 'Lennon, John', 'Harrison, George']
+
+    @staticmethod
+    def build_cube():
+
+        cube = HoursCube(TestFundingScenarios.STAFF_LIST, 3)
+
+        cube.add('Lennon, John', '100', 'Help!', 'Epstein', 1.0, [10, 20, 30])
+        cube.add('Starr, Ringo', '200', '', 'Martin', 0.0, [1, 0, 0])
+        cube.add('Lennon, John', '200', '', 'Martin', 0.0, [0, 0, 5])
+        cube.add('Harrison, George', '300', '', 'Martin', 0.5, [4, 4, 0])
+
+        cube.finalize()
+
+        return cube
+
+    def test_expected_hours(self):
+        """Ensure expected hours weight each entry by the funding probability of its project."""
+
+        scenarios = FundingScenarios(TestFundingScenarios.build_cube(), 10, seed=0)
+
+        np.testing.assert_allclose(scenarios.expected_staff, [0, 60, 4])
+        np.testing.assert_allclose(scenarios.expected_month, [12, 22, 30])
+
+    def test_certain_projects(self):
+        """Ensure projects that are certain or never funded give the same hours in every draw."""
+
+        scenarios = FundingScenarios(TestFundingScenarios.build_cube(), 1000, staff_codes=[1, 0], seed=0)
+
+        percentiles = scenarios.staff_percentiles()
+
+        self.assertEqual(percentiles.shape, (2, 3))
+        np.testing.assert_array_equal(percentiles, [[60, 60, 60], [0, 0, 0]])
+
+        # only the reported staff are summed per month
+        np.testing.assert_array_equal(scenarios.month_percentiles()[:, 1], [10, 20, 30])
+
+    def test_staff_month_percentiles(self):
+        """Ensure percentiles per staff member and month match the draws of each staff member."""
+
+        scenarios = FundingScenarios(TestFundingScenarios.build_cube(), 1000, staff_codes=[2, 1], seed=0)
+
+        percentiles = scenarios.staff_month_percentiles()
+
+        self.assertEqual(percentiles.shape, (2, 3, 3))
+        np.testing.assert_array_equal(percentiles[1], [[10] * 3, [20] * 3, [30] * 3])
+        np.testing.assert_array_equal(percentiles[0, :, [0, 2]].T, [[0, 4], [0, 4], [0, 0]])
+
+        # month hours of each staff member sum to their term hours in every draw
+        np.testing.assert_allclose(percentiles[:, :, 1].sum(axis=1), scenarios.staff_percentiles()[:, 1])
+
+    def test_uncertain_projects(self):
+        """Ensure a project with a 50% probability is funded in about half the draws."""
+
+        scenarios = FundingScenarios(TestFundingScenarios.build_cube(), 10000, seed=0)
+
+        self.assertAlmostEqual(float((scenarios.staff_draws[:, 2] > 0).mean()), 0.5, delta=0.02)
+
+        p10, p50, p90 = scenarios.staff_percentiles()[2]
+        self.assertEqual((p10, p90), (0, 8))
+
+    def test_scenarios_2k_projects(self):
+        """Ensure 10,000 draws over 2,000 projects finish in seconds."""
+
+        n_staff, n_projects = 500, 2000
+        rng = np.random.default_rng(0)
+
+        cube = HoursCube(['Staff, {:04d}'.format(i) for i in range(n_staff)], 12)
+
+        for prj in range(n_projects):
+            for staff in rng.choice(n_staff, 3, replace=False):
+                cube.add(cube.staff_names[staff], str(prj), '', '', float(rng.random()), [8] * 12)
+
+        cube.finalize()
+
+        start = time.perf_counter()
+        scenarios = FundingScenarios(cube, 10000, seed=0)
+        scenarios.staff_percentiles()
+        scenarios.month_percentiles()
+        scenarios.staff_month_percentiles()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(scenarios.staff_draws.shape, (10000, n_staff))
+        self.assertLess(elapsed, 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
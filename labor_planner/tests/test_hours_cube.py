@@ -0,0 +1,128 @@
+"""test_hours_cube.py
+
+Tests for HoursCube class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import unittest
+
+import numpy as np
+
+from labor_planner.hours_cube import HoursCube, ProjectMeta, NO_DETAILS
+from labor_planner.probability_tiers import assign_tiers
+
+
+class TestHoursCube(unittest.TestCase):
+    """Test HoursCube aggregates."""
+
+    STAFF_LIST = ['Starr, Ringo', 'Lennon, John', 'Harrison, George']
+
+    @staticmethod
+    def build_cube():
+
+        cube = HoursCube(TestHoursCube.STAFF_LIST, 3)
+
+        cube.add('Lennon, John', '100', 'Help!', 'Epstein', 0.9, [10, 20, 30])
+        cube.add('Starr, Ringo', '200', '', 'Martin', 0.2, [1, 0, 0])
+        cube.add('Lennon, John', '200', '', 'Martin', 0.2, [0, 0, 5])
+        cube.add('Harrison, George', '100', 'Help!', 'Epstein', 0.9, [0, 0, 0])
+
+        cube.finalize()
+
+        return cube
+
+    def test_project_table(self):
+        """Ensure project metadata is stored once per project."""
+
+        cube = TestHoursCube.build_cube()
+
+        self.assertEqual(cube.project_ids, ['100', '200'])
+        self.assertEqual(cube.project_manager, ['Epstein', 'Martin'])
+        self.assertListEqual(cube.entry_project.tolist(), [0, 1, 1, 0])
+
+    def test_project_conflicts(self):
+        """Ensure a differing probability is reported once per worksheet and the first one is kept."""
+
+        cube = HoursCube(TestHoursCube.STAFF_LIST, 1)
+
+        cube.add('Lennon, John', '100', 'Help!', 'Epstein', 0.9, [1], 'a.xlsx', 'Help!')
+        cube.add('Starr, Ringo', '100', 'Help!', 'Epstein', 0.9, [1], 'b.xlsx', 'Help!')
+        cube.add('Lennon, John', '100', 'Help!', 'Epstein', 0.4, [1], 'c.xlsx', 'Help')
+        cube.add('Starr, Ringo', '100', 'Help!', 'Epstein', 0.4, [1], 'c.xlsx', 'Help')
+
+        cube.finalize()
+
+        self.assertEqual(len(cube.conflicts), 1)
+        self.assertEqual((cube.conflicts[0].file, cube.conflicts[0].sheet), ('c.xlsx', 'Help'))
+        self.assertEqual(cube.project_meta(0).probability, 0.9)
+        self.assertEqual((cube.project_meta(0).file, cube.project_meta(0).sheet), ('a.xlsx', 'Help!'))
+
+    def test_listed_project_conflicts(self):
+        """Ensure a project listed without hours is checked against its first declaration like entries are."""
+
+        cube = HoursCube(TestHoursCube.STAFF_LIST, 1)
+
+        cube.add_listed_projects([(ProjectMeta('100', 'Help!', 'Epstein', 0.9, 'a.xlsx', 'Help!', *NO_DETAILS), True),
+                                  (ProjectMeta('100', 'Help!', 'Epstein', 0.4, 'b.xlsx', 'Help!', *NO_DETAILS), True)])
+        cube.add_blank('Starr, Ringo', '100', 0.4)
+        cube.add('Lennon, John', '100', 'Help!', 'Epstein', 0.4, [1], 'b.xlsx', 'Help!')
+
+        cube.finalize()
+
+        self.assertEqual([(c.file, c.first_file) for c in cube.conflicts], [('b.xlsx', 'a.xlsx')])
+        self.assertEqual(cube.project_meta(0).probability, 0.9)
+        self.assertEqual(cube.blank_probability.tolist(), [0.9])
+
+    def test_staff_totals(self):
+        """Check staff totals with and without a probability mask."""
+
+        cube = TestHoursCube.build_cube()
+
+        self.assertListEqual(cube.staff_totals().tolist(), [1, 65, 0])
+        self.assertListEqual(cube.staff_totals(cube.high_probability_mask()).tolist(), [0, 60, 0])
+        self.assertListEqual(cube.staff_month_totals()[1].tolist(), [10, 20, 35])
+
+    def test_entry_tiers(self):
+        """Ensure tiers bin probabilities on their edges and tier totals match masked totals."""
+
+        np.testing.assert_array_equal(assign_tiers([1.0, 0.9, 0.75, 0.5, 0.2, 0.0], [0.9, 0.5, 0.2]),
+                                      [0, 1, 1, 2, 3, 3])
+
+        cube = TestHoursCube.build_cube()
+        tiers = cube.entry_tiers([0.5])
+
+        self.assertListEqual(tiers.tolist(), [0, 1, 1, 0])
+
+        totals = cube.staff_class_month_totals(tiers, 2)
+
+        self.assertEqual(totals.shape, (3, 2, 3))
+        np.testing.assert_array_equal(totals[:, 0], cube.staff_month_totals(cube.high_probability_mask()))
+        np.testing.assert_array_equal(totals[:, 1], cube.staff_month_totals(~cube.high_probability_mask()))
+
+    def test_project_totals(self):
+        """Check project totals and staff counts."""
+
+        cube = TestHoursCube.build_cube()
+
+        self.assertListEqual(cube.project_totals().tolist(), [60, 6])
+        self.assertListEqual(cube.project_staff_counts(cube.entry_totals() != 0).tolist(), [1, 2])
+
+    def test_group_entries(self):
+        """Ensure entries are grouped in order of first appearance."""
+
+        cube = TestHoursCube.build_cube()
+
+        groups = [(code, rows.tolist()) for code, rows in cube.group_entries(cube.entry_staff)]
+        self.assertEqual(groups, [(1, [0, 2]), (0, [1]), (2, [3])])
+
+        groups = [(code, rows.tolist()) for code, rows in cube.group_entries(cube.entry_project,
+                                                                               cube.staff_name_order())]
+        self.assertEqual(groups, [(0, [3, 0]), (1, [2, 1])])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,67 @@
+"""test_org_tree.py
+
+Tests for OrgTree class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import os
+import unittest
+
+import numpy as np
+
+from labor_planner.config_reader import ReadConfig
+from labor_planner.workbook_reader import ReadWorkbooks
+from labor_planner.org_tree import OrgTree
+
+
+class TestOrgTree(unittest.TestCase):
+    """Test the staff tree and subtree aggregates."""
+
+    TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+    TEST_CONFIG_FILE = os.path.join(TEST_DATA_DIR, 'config_plan.yml')
+
+    STAFF_LIST = ['Epstein, Brian', 'Lennon, John', 'Harrison, George', 'Starr, Ringo', 'Martin, George']
+    SUPERVISORS = ['', 'Epstein, Brian', 'Lennon, John', 'Harrison, George', '']
+
+    def test_subtrees(self):
+        """Ensure every subtree is a contiguous range and subtree sums match summing the members."""
+
+        tree = OrgTree(TestOrgTree.STAFF_LIST, TestOrgTree.SUPERVISORS)
+
+        self.assertEqual(tree.managers, [0, 1, 2])
+        self.assertEqual(tree.members(1).tolist(), [1, 2, 3])
+        self.assertEqual(tree.members(4).tolist(), [4])
+        self.assertEqual(tree.depth.tolist(), [0, 1, 2, 3, 0])
+
+        values = np.arange(10).reshape(5, 2)
+        sums = tree.subtree_sums(values)
+
+        for node in range(5):
+            np.testing.assert_array_equal(sums[node], values[tree.members(node)].sum(axis=0))
+
+    def test_invalid_supervisors(self):
+        """Ensure unknown supervisors warn and cycles raise an error."""
+
+        with self.assertWarns(UserWarning):
+            tree = OrgTree(['Lennon, John', 'Starr, Ringo'], ['Epstein, Brian', 'Lennon, John'])
+
+        self.assertEqual(tree.parent.tolist(), [-1, 0])
+
+        with self.assertRaises(ValueError):
+            OrgTree(['Lennon, John', 'Starr, Ringo'], ['Starr, Ringo', 'Lennon, John'])
+
+    def test_staff_file(self):
+        """Ensure the tree is built from the supervisor column of the staff file."""
+
+        read_obj = ReadWorkbooks(ReadConfig(TestOrgTree.TEST_CONFIG_FILE))
+        tree = read_obj.org_tree
+
+        self.assertEqual([read_obj.staff_list[i] for i in tree.managers], ['Lennon, John', 'Harrison, George'])
+        self.assertEqual(len(tree.members(read_obj.staff_index['Lennon, John'])), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""test_period_index.py
+
+Test for PeriodIndex class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import xlrd
+
+from labor_planner.config_reader import ReadConfig
+from labor_planner.labor_outputs.individual_staff import IndividualHours
+from labor_planner.labor_outputs.rollup_staff import Rollup
+from labor_planner.stage_data import Stage
+from labor_planner.workbook_reader import ReadWorkbooks
+from labor_planner.period_index import PeriodIndex, DESIGN_SLICES, design_period
+
+
+class TestPeriodIndex(unittest.TestCase):
+    """Test range sums of the period index."""
+
+    TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+    TEST_CONFIG_FILE = os.path.join(TEST_DATA_DIR, 'config_plan.yml')
+    TEST_CONFIG_OBJ = ReadConfig(TEST_CONFIG_FILE)
+    TEST_READ_OBJ = ReadWorkbooks(TEST_CONFIG_OBJ)
+
+    AVAILABLE = list(range(100, 112))
+    STAFF = np.arange(36).reshape(3, 12)
+
+    def test_range_sums(self):
+        """Ensure every month range matches a direct sum."""
+
+        index = PeriodIndex(TestPeriodIndex.AVAILABLE, TestPeriodIndex.STAFF, TestPeriodIndex.STAFF[:2])
+
+        for start in range(12):
+            for stop in range(start, 13):
+                self.assertEqual(index.available_hours(start, stop), sum(TestPeriodIndex.AVAILABLE[start:stop]))
+                np.testing.assert_array_equal(index.staff_hours(start, stop), TestPeriodIndex.STAFF[:, start:stop].sum(axis=1))
+                np.testing.assert_array_equal(index.project_hours(start, stop), TestPeriodIndex.STAFF[:2, start:stop].sum(axis=1))
+
+    def test_design_presets(self):
+        """Ensure the design presets cover the same months as slicing the calendar."""
+
+        months = list(range(12))
+
+        for design, period in DESIGN_SLICES.items():
+            start, stop = design_period(design)
+            self.assertEqual(list(range(start, stop)), months[period])
+
+    def test_rolling_coverage(self):
+        """Ensure each rolling window holds the coverage of its three months."""
+
+        index = PeriodIndex(TestPeriodIndex.AVAILABLE, TestPeriodIndex.STAFF)
+        rolling = index.rolling_coverage(3)
+
+        self.assertEqual(rolling.shape, (3, 10))
+
+        for start in range(10):
+            np.testing.assert_allclose(rolling[:, start], index.staff_coverage(start, start + 3))
+
+    def test_reader_index(self):
+        """Ensure the index built from the workbooks matches the hours cube totals."""
+
+        read_obj = TestPeriodIndex.TEST_READ_OBJ
+        index = read_obj.period_index
+
+        self.assertEqual(index.available_hours(), sum(read_obj.wkg_hours_hdr))
+        np.testing.assert_array_equal(index.staff_hours(), read_obj.cube.staff_totals())
+
+    def test_design_outputs(self):
+        """Ensure the individual hours and rollup workbooks are written for every design with the total column
+        after the months of the design."""
+
+        read_obj = ReadWorkbooks(TestPeriodIndex.TEST_CONFIG_OBJ.for_design('full_year', subdirectory=False))
+
+        for design in ReadConfig.DESIGNS:
+            start, stop = design_period(design)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                design_config = TestPeriodIndex.TEST_CONFIG_OBJ.for_design(design, subdirectory=False)
+                design_config.set_output_files(tmp)
+
+                design_read_obj = read_obj.for_design(design_config)
+                data = Stage(design_config, design_read_obj)
+
+                IndividualHours(design_config, design_read_obj, data)
+                Rollup(design_config, design_read_obj, data)
+
+                with xlrd.open_workbook(design_config.out_individ_file) as wkbook:
+                    ws = wkbook.sheet_by_index(0)
+
+                    self.assertEqual(ws.cell_value(4, 4 + stop - start), 'Total')
+                    self.assertEqual(ws.cell_value(6, 4 + stop - start),
+                                     design_read_obj.period_index.available_hours(start, stop))
+
+                with xlrd.open_workbook(design_config.out_rollup_file) as wkbook:
+                    ws = wkbook.sheet_by_index(0)
+
+                    self.assertEqual(ws.cell_value(9, 1 + stop - start), 'Total')
+                    self.assertEqual(ws.cell_value(8, 1), 'Quarter {} - FY18'.format(2 if start == 0 else 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
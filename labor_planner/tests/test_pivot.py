@@ -0,0 +1,91 @@
+"""test_pivot.py
+
+Tests for PivotEngine class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import unittest
+
+import numpy as np
+
+from labor_planner.hours_cube import HoursCube, ProjectDetails
+from labor_planner.pivot import PivotEngine, quarter_labels
+
+
+class TestPivot(unittest.TestCase):
+    """Test grouped hours and coverage."""
+
+    STAFF_LIST = ['Lennon, John', 'Starr, Ringo']
+    AVAILABLE = [100, 100, 100, 120, 120, 120]
+
+    @staticmethod
+    def build_engine():
+
+        cube = HoursCube(TestPivot.STAFF_LIST, 6)
+
+        capitol = ProjectDetails('Capitol', '', '', 0.0)
+        vee_jay = ProjectDetails('Vee-Jay', '', '', 0.0)
+
+        cube.add('Lennon, John', '100', '', 'Martin, George', 0.9, [10, 10, 10, 20, 20, 20], details=capitol)
+        cube.add('Starr, Ringo', '100', '', 'Martin, George', 0.9, [5, 5, 5, 5, 5, 5], details=capitol)
+        cube.add('Lennon, John', '200', '', 'Epstein, Brian', 0.2, [0, 0, 0, 50, 0, 0], details=vee_jay)
+
+        cube.finalize()
+
+        quarters = quarter_labels('18', 0, 6)
+
+        return cube, PivotEngine(cube, TestPivot.AVAILABLE, quarters, ['High', 'Low'], [0.5])
+
+    def test_quarter_labels(self):
+        """Ensure months map to fiscal quarters starting in quarter 2."""
+
+        self.assertEqual(quarter_labels('18', 8, 11), ['Quarter 4 - FY18', 'Quarter 1 - FY19', 'Quarter 1 - FY19'])
+
+    def test_group_sums(self):
+        """Ensure every pivot sums to the cube total."""
+
+        cube, engine = TestPivot.build_engine()
+
+        for dimensions in (['client'], ['manager', 'tier'], ['quarter'], ['client', 'quarter', 'staff'], []):
+            self.assertEqual(int(engine.pivot(dimensions).hours.sum()), int(cube.entry_hours.sum()))
+
+    def test_client_quarter(self):
+        """Ensure hours, distinct staff, and coverage per client and quarter."""
+
+        cube, engine = TestPivot.build_engine()
+
+        table = engine.pivot(['client', 'quarter'])
+
+        self.assertEqual(table.labels, [('Capitol', 'Quarter 2 - FY18'), ('Capitol', 'Quarter 3 - FY18'),
+                                        ('Vee-Jay', 'Quarter 3 - FY18')])
+        self.assertEqual(table.hours.tolist(), [45, 75, 50])
+        self.assertEqual(table.staff_count.tolist(), [2, 2, 1])
+
+        # two staff members with 300 and 360 available hours per quarter
+        np.testing.assert_allclose(table.coverage, [45 / 600., 75 / 720., 50 / 360.])
+
+    def test_tier_order(self):
+        """Ensure tiers are in order from most likely and staff are counted once per group."""
+
+        cube, engine = TestPivot.build_engine()
+
+        table = engine.pivot(['tier'])
+
+        self.assertEqual(table.labels, [('High',), ('Low',)])
+        self.assertEqual(table.staff_count.tolist(), [2, 1])
+        self.assertEqual(table.available_hours.tolist(), [1320, 660])
+
+    def test_invalid_dimension(self):
+        """Ensure unknown dimensions raise an error."""
+
+        cube, engine = TestPivot.build_engine()
+
+        with self.assertRaises(ValueError):
+            engine.pivot(['region'])
+
+
+if __name__ == '__main__':
+    unittest.main()
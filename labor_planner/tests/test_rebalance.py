@@ -0,0 +1,95 @@
+"""test_rebalance.py
+
+Tests for Rebalance class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import time
+import unittest
+
+import numpy as np
+
+from labor_planner.hours_cube import HoursCube
+from labor_planner.rebalance import Rebalance
+
+
+class TestRebalance(unittest.TestCase):
+    """Test over allocation detection and proposed transfers."""
+
+    STAFF_LIST = ['Starr, Ringo', 'Lennon, John', 'Harrison, George', '**Epstein, Brian']
+    MONTHS = ['Jan', 'Feb']
+
+    @staticmethod
+    def build_cube():
+
+        cube = HoursCube(TestRebalance.STAFF_LIST, 2)
+
+        cube.add('Lennon, John', '100', '', '', 0.9, [150, 100])
+        cube.add('Lennon, John', '200', '', '', 0.9, [50, 0])
+        cube.add('Starr, Ringo', '100', '', '', 0.9, [20, 100])
+        cube.add('Harrison, George', '200', '', '', 0.9, [60, 50])
+        cube.add('**Epstein, Brian', '100', '', '', 0.9, [0, 0])
+
+        cube.finalize()
+
+        return cube
+
+    def test_transfers(self):
+        """Ensure excess hours go to staff on the same project with the largest shortfall first."""
+
+        solver = Rebalance(TestRebalance.build_cube(), [160, 160], TestRebalance.MONTHS)
+
+        self.assertEqual([(i.staff_name, i.month, i.excess) for i in solver.over_allocated],
+                         [('Lennon, John', 'Jan', 40)])
+
+        self.assertEqual([tuple(i) for i in solver.transfers], [('Jan', '100', 'Lennon, John', 'Starr, Ringo', 40)])
+        self.assertEqual(solver.unresolved, [])
+
+        # non-staff marked with '**' are never under target or given hours
+        self.assertNotIn('**Epstein, Brian', [i.staff_name for i in solver.under_target])
+
+    def test_caps_and_eligibility(self):
+        """Ensure per person caps and excluded staff limit the transfers."""
+
+        solver = Rebalance(TestRebalance.build_cube(), [160, 160], TestRebalance.MONTHS,
+                           staff_caps={'Starr, Ringo': 0.2}, excluded={'Harrison, George'})
+
+        # Starr can take 12 hours up to a 20% cap and Harrison takes none
+        self.assertEqual([(i.month, i.from_staff, i.to_staff, i.hours) for i in solver.transfers],
+                         [('Jan', 'Lennon, John', 'Starr, Ringo', 12), ('Feb', 'Starr, Ringo', 'Lennon, John', 60)])
+        self.assertEqual([(i.staff_name, i.month, i.excess) for i in solver.unresolved],
+                         [('Starr, Ringo', 'Feb', 8), ('Lennon, John', 'Jan', 28)])
+
+        solver = Rebalance(TestRebalance.build_cube(), [160, 160], TestRebalance.MONTHS, min_probability=0.95)
+
+        self.assertEqual(solver.transfers, [])
+
+    def test_scale(self):
+        """Ensure thousands of staff and projects solve well within a minute."""
+
+        n_staff, n_projects = 3000, 3000
+        rng = np.random.default_rng(0)
+
+        cube = HoursCube(['Staff, {:04d}'.format(i) for i in range(n_staff)], 12)
+
+        for prj in range(n_projects):
+            for staff in rng.choice(n_staff, 4, replace=False):
+                cube.add(cube.staff_names[staff], str(prj), '', '', 1.0, rng.integers(0, 80, 12).tolist())
+
+        cube.finalize()
+
+        start = time.perf_counter()
+        solver = Rebalance(cube, [160] * 12, ['m{}'.format(i) for i in range(12)])
+        elapsed = time.perf_counter() - start
+
+        self.assertGreater(len(solver.over_allocated), 0)
+        self.assertLess(len(solver.unresolved), len(solver.over_allocated))
+        self.assertTrue((solver.staff_month >= 0).all())
+        self.assertLess(elapsed, 30.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
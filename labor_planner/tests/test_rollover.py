@@ -0,0 +1,154 @@
+"""test_rollover.py
+
+Tests for carrying this year's projects into next year's staff workbooks.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import xlrd
+import xlsxwriter
+
+from labor_planner.config_reader import ReadConfig
+from labor_planner.hours_cube import HoursCube, ProjectDetails
+from labor_planner.labor_builder.build_staff_workbooks import BuildStaffWorkbooks
+from labor_planner.rollover import RolloverProject, collect_projects, read_plan, read_snapshot, write_snapshot
+
+
+class TestRollover(unittest.TestCase):
+    """Test rollover projects, snapshots, and workbooks."""
+
+    TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+    TEST_CONFIG_FILE = os.path.join(TEST_DATA_DIR, 'config_build.yml')
+    TEST_CONFIG_OBJ = ReadConfig(TEST_CONFIG_FILE)
+
+    STAFF_LIST = ['Harrison, George', 'Lennon, John', 'McCartney, Paul', 'Starr, Ringo']
+
+    @staticmethod
+    def build_cube():
+
+        cube = HoursCube(TestRollover.STAFF_LIST, 12)
+
+        capitol = ProjectDetails('Capitol', '', '', 0.0)
+
+        cube.add('Lennon, John', 'A/100', 'Help!', 'Martin, George', 0.9, [10] * 10 + [20, 30],
+                 file='/fy18/lennon_john.xlsx', sheet='help', details=capitol)
+        cube.add('Starr, Ringo', 'A/100', 'Help!', 'Martin, George', 0.9, [5] * 11 + [0],
+                 file='/fy18/lennon_john.xlsx', sheet='help', details=capitol)
+        cube.add('Starr, Ringo', 'A/100', 'Help!', 'Martin, George', 0.9, [0] * 11 + [1],
+                 file='/fy18/lennon_john.xlsx', sheet='help', details=capitol)
+        cube.add('Starr, Ringo', '200', 'Revolver', 'Lennon, John', 0.5, [8] * 10 + [0, 0],
+                 file='/fy18/best_pete.xlsx', sheet='revolver')
+
+        cube.finalize()
+
+        return cube
+
+    def test_collect_projects(self):
+        """Ensure projects keep their header and the trailing hours of each staff member are combined."""
+
+        projects = collect_projects(TestRollover.build_cube(), 2)
+
+        self.assertEqual([(p.owner, p.prj_id, p.client) for p in projects],
+                         [('lennon_john', 'A/100', 'Capitol'), ('best_pete', '200', '')])
+
+        self.assertEqual(projects[0].hours, {'Lennon, John': [20, 30], 'Starr, Ringo': [5, 1]})
+        self.assertEqual(projects[1].hours, {})
+
+    def test_read_plan(self):
+        """Ensure this year's workbooks are read with the streaming reader in file name order."""
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = os.path.join(tmp, 'FY_2018')
+            shutil.copytree(os.path.join(TestRollover.TEST_DATA_DIR, 'inputs', 'FY_2018'), data_dir)
+
+            # xlrd 2 and later cannot open .xlsx files
+            with mock.patch('labor_planner.workbook_reader.xlrd.open_workbook', side_effect=AssertionError):
+                read_obj = read_plan(TestRollover.TEST_CONFIG_OBJ, data_dir)
+
+        owners = [p.owner for p in collect_projects(read_obj.cube)]
+
+        self.assertEqual(read_obj.file_list, sorted(read_obj.file_list))
+        self.assertEqual(owners, sorted(owners))
+        self.assertGreater(len(owners), 0)
+
+    def test_collect_listed_projects(self):
+        """Ensure a continuing project listed with staff but no hours yet is carried with its header."""
+
+        with tempfile.TemporaryDirectory() as tmp:
+            in_file = os.path.join(tmp, 'lennon_john.xlsx')
+
+            with xlsxwriter.Workbook(in_file) as wbook:
+                ws = wbook.add_worksheet('help')
+                ws.write('B3', 'A/100')
+                ws.write('B4', 'Help!')
+                ws.write('B5', 'Capitol')
+                ws.write('B8', 0.9)
+                ws.write('B9', 'Martin, George')
+                ws.write_column('A16', TestRollover.STAFF_LIST)
+
+                # blank template sheet
+                ws = wbook.add_worksheet('new_project_1')
+                ws.write_column('A16', TestRollover.STAFF_LIST)
+
+            read_obj = read_plan(TestRollover.TEST_CONFIG_OBJ, tmp)
+
+        projects = collect_projects(read_obj.cube, 2)
+
+        self.assertEqual(projects, [RolloverProject('lennon_john', 'A/100', 'Help!', 'Martin, George', 0.9, 'Capitol',
+                                                    {})])
+
+    def test_snapshot(self):
+        """Ensure a snapshot reads back the projects it saved."""
+
+        projects = collect_projects(TestRollover.build_cube(), 2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            f = os.path.join(tmp, 'rollover.csv')
+
+            write_snapshot(projects, 2, f)
+
+            self.assertEqual(read_snapshot(f), (projects, 2))
+
+    def test_rollover_workbooks(self):
+        """Ensure projects are carried into their owner's workbook, or their manager's, on sheets named by project."""
+
+        config_obj = copy.copy(TestRollover.TEST_CONFIG_OBJ)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = os.path.join(tmp, 'FY_2019')
+            config_obj.rollover_from = os.path.join(tmp, 'rollover.csv')
+            config_obj.rollover_months = 0
+
+            write_snapshot(collect_projects(TestRollover.build_cube(), 2), 2, config_obj.rollover_from)
+
+            BuildStaffWorkbooks(config_obj)
+
+            with xlrd.open_workbook(os.path.join(config_obj.data_dir, 'lennon_john.xlsx')) as wkbook:
+
+                self.assertEqual(wkbook.sheet_names()[:3], ['A_100', '200', 'new_project_1'])
+                self.assertEqual(wkbook.nsheets, 2 + config_obj.num_blank_wksheets)
+
+                ws = wkbook.sheet_by_index(0)
+
+                self.assertEqual(ws.col_values(1, 2, 5), ['A/100', 'Help!', 'Capitol'])
+                self.assertEqual(ws.cell_value(7, 1), 0.9)
+
+                # carried hours fill the first months
+                self.assertEqual(ws.row_values(16, 0, 4), ['Lennon, John', 20, 30, ''])
+                self.assertEqual(ws.row_values(18, 0, 4), ['Starr, Ringo', 5, 1, ''])
+
+            with xlrd.open_workbook(os.path.join(config_obj.data_dir, 'starr_ringo.xlsx')) as wkbook:
+                self.assertEqual(wkbook.sheet_names()[0], 'new_project_1')
+
+
+if __name__ == '__main__':
+    unittest.main()
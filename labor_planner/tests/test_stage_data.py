@@ -7,10 +7,16 @@ Test for Stage class.
 
 """
 
+import copy
 import os
+import tempfile
+import time
 import unittest
 
+import xlrd
+
 from labor_planner.config_reader import ReadConfig
+from labor_planner.labor_outputs.rollup_staff import Rollup
 from labor_planner.workbook_reader import ReadWorkbooks
 from labor_planner.stage_data import Stage
 
@@ -43,3 +49,85 @@ class TestStageData(unittest.TestCase):
 
         self.assertIs(type(TestStageData.TEST_DATA.avail_hours_sum), int)
         self.assertIs(type(TestStageData.TEST_DATA.end_row), int)
+
+    def test_coverage_lists(self):
+        """Ensure coverage lists share the name order and match the hours per staff member."""
+
+        data = TestStageData.TEST_DATA
+        cube = TestStageData.TEST_READ_OBJ.cube
+
+        self.assertEqual(data.name_list, sorted(data.name_list))
+        self.assertTrue(set(data.high_name_list) <= set(data.name_list))
+        self.assertTrue(set(data.low_name_list) <= set(data.name_list))
+
+        totals = cube.staff_totals()
+        for name, pct in data.combine_list:
+            self.assertEqual(pct, round(float(totals[cube.staff_index[name]]) / data.avail_hours_sum, 2))
+
+    def test_high_probability_matches_rollup(self):
+        """Ensure the high probability coverage and the rollup use the same split with more than two tiers."""
+
+        config_obj = ReadConfig(TestStageData.TEST_CONFIG_FILE)
+        config_obj.tier_names = ['Funded', 'Likely', 'Speculative']
+        config_obj.tier_edges = [0.9, 0.5]
+
+        read_obj = ReadWorkbooks(config_obj)
+        data = Stage(config_obj, read_obj)
+
+        rollup = read_obj.rollup_dict
+
+        for name, pct in data.high_prob_list:
+            self.assertEqual(pct, round(sum(rollup[name]) / data.avail_hours_sum, 2))
+
+        # tiers above the lowest edge are high probability
+        self.assertTrue(any(pct > tier_pct for pct, tier_pct in zip(data.full_high_list, data.full_tier_lists[0])))
+
+    def test_rollup_tier_columns(self):
+        """Ensure the rollup only adds a percent covered column per tier when custom tiers are set."""
+
+        config_obj = copy.copy(TestStageData.TEST_CONFIG_OBJ)
+
+        self.assertFalse(config_obj.custom_tiers)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.set_output_files(tmp)
+
+            Rollup(config_obj, TestStageData.TEST_READ_OBJ, TestStageData.TEST_DATA)
+
+            with xlrd.open_workbook(config_obj.out_rollup_file) as wkbook:
+                self.assertEqual(wkbook.sheet_by_index(0).row_values(10)[-1], 'Percent Covered')
+                self.assertEqual(wkbook.sheet_by_index(0).row_values(9)[-1], '')
+
+            config_obj.tier_names = ['Funded', 'Likely', 'Speculative']
+            config_obj.tier_edges = [0.9, 0.5]
+            config_obj.custom_tiers = True
+
+            Rollup(config_obj, TestStageData.TEST_READ_OBJ, TestStageData.TEST_DATA)
+
+            with xlrd.open_workbook(config_obj.out_rollup_file) as wkbook:
+                self.assertEqual(wkbook.sheet_by_index(0).row_values(9)[-3:], config_obj.tier_names)
+
+    def test_prep_chart_info_10k_staff(self):
+        """Ensure the chart join stays linear for a 10,000 person roster."""
+
+        n = 10000
+        data = Stage.__new__(Stage)
+
+        data.name_list = ['Staff, {:05d}'.format(i) for i in range(n)]
+        data.high_name_list = data.name_list[::2]
+        data.high_percent_list = [0.5] * len(data.high_name_list)
+        data.low_name_list = data.name_list[::3]
+        data.low_percent_list = [0.25] * len(data.low_name_list)
+        data.tier_name_lists = [data.high_name_list, data.low_name_list]
+        data.tier_percent_lists = [data.high_percent_list, data.low_percent_list]
+
+        start = time.perf_counter()
+        end_row = data.prep_chart_info()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(end_row, n + 1)
+        self.assertEqual(data.full_high_list[:4], [0.5, 0.0, 0.5, 0.0])
+        self.assertEqual(data.full_low_list[:4], [0.25, 0.0, 0.0, 0.25])
+
+        # the former list scanning join took about 2 s at this size; the hashed join takes a few ms
+        self.assertLess(elapsed, 1.0)
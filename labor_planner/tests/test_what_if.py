@@ -0,0 +1,121 @@
+"""test_what_if.py
+
+Tests for WhatIf class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import types
+import unittest
+
+import numpy as np
+
+from labor_planner.config_reader import ReadConfig
+from labor_planner.hours_cube import HoursCube
+from labor_planner.period_index import PeriodIndex
+from labor_planner.workbook_reader import ReadWorkbooks
+from labor_planner.what_if import WhatIf, Delta
+
+
+class TestWhatIf(unittest.TestCase):
+    """Test what-if hour reassignments."""
+
+    TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+    TEST_CONFIG_FILE = os.path.join(TEST_DATA_DIR, 'config_plan.yml')
+    TEST_CONFIG_OBJ = ReadConfig(TEST_CONFIG_FILE)
+
+    # the baseline is read from a copy of the staff workbooks so the exact hours checked cannot be changed by
+    #  other tests
+    TEST_INPUT_DIR = tempfile.TemporaryDirectory()
+    shutil.copytree(TEST_CONFIG_OBJ.data_dir, os.path.join(TEST_INPUT_DIR.name, 'FY_2018'))
+    TEST_CONFIG_OBJ.data_dir = os.path.join(TEST_INPUT_DIR.name, 'FY_2018')
+
+    TEST_READ_OBJ = ReadWorkbooks(TEST_CONFIG_OBJ)
+
+    def test_move(self):
+        """Ensure moving hours to a more likely project changes only the affected aggregates."""
+
+        what_if = WhatIf(TestWhatIf.TEST_CONFIG_OBJ, TestWhatIf.TEST_READ_OBJ)
+
+        deltas = what_if.move('Starr, Ringo', '74589', '84392', 30, ['Jul', 'Aug', 'Sep'])
+        changes = what_if.apply(deltas)
+
+        coverage = [(c.column, round(c.after - c.before, 4)) for c in changes if c.kind == 'staff_coverage']
+        self.assertEqual(coverage, [('Prob > 50%', round(30 / what_if.avail_hours_sum, 4)),
+                                    ('Prob <= 50%', round(-30 / what_if.avail_hours_sum, 4))])
+
+        projects = [(c.key, c.column, c.after - c.before) for c in changes if c.kind == 'project_hours']
+        self.assertEqual(projects, [('74589', 'Jul-18', -10), ('74589', 'Aug-18', -10), ('74589', 'Sep-18', -10),
+                                    ('74589', 'Total', -30), ('84392', 'Jul-18', 10), ('84392', 'Aug-18', 10),
+                                    ('84392', 'Sep-18', 10), ('84392', 'Total', 30)])
+
+        rollup = [(c.key, c.column, c.after) for c in changes if c.kind == 'rollup_hours']
+        self.assertEqual([i[:2] for i in rollup], [('Starr, Ringo', 'Jul-18'), ('Starr, Ringo', 'Aug-18'),
+                                                   ('Starr, Ringo', 'Sep-18'), ('Starr, Ringo', 'Total')])
+
+        # the baseline is unchanged unless kept
+        self.assertEqual(what_if.apply(deltas), changes)
+
+    def test_keep(self):
+        """Ensure kept what-ifs stack and hours cannot be removed below zero."""
+
+        what_if = WhatIf(TestWhatIf.TEST_CONFIG_OBJ, TestWhatIf.TEST_READ_OBJ)
+
+        what_if.apply([Delta('Lennon, John', '74589', 'Jan-18', -2)], keep=True)
+
+        with self.assertRaises(ValueError):
+            what_if.apply([Delta('Lennon, John', '74589', 0, -1)])
+
+        with self.assertRaises(KeyError):
+            what_if.apply([Delta('Lennon, John', 'missing', 0, 1)])
+
+    def test_comparison_workbook(self):
+        """Ensure the comparison workbook is written."""
+
+        what_if = WhatIf(TestWhatIf.TEST_CONFIG_OBJ, TestWhatIf.TEST_READ_OBJ)
+        changes = what_if.apply(what_if.move('Starr, Ringo', '74589', '84392', 30, ['Jul']))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            out_file = os.path.join(tmp, 'what_if.xlsx')
+            what_if.write_comparison(changes, out_file)
+
+            self.assertTrue(os.path.isfile(out_file))
+
+    def test_full_roster_speed(self):
+        """Ensure a what-if evaluates in milliseconds on a large roster."""
+
+        n_staff, n_projects = 2000, 2000
+        rng = np.random.default_rng(0)
+
+        cube = HoursCube(['Staff, {:04d}'.format(i) for i in range(n_staff)], 12)
+
+        for prj in range(n_projects):
+            for staff in rng.choice(n_staff, 5, replace=False):
+                cube.add(cube.staff_names[staff], str(prj), '', '', float(rng.random()), [80] * 12)
+
+        cube.finalize()
+
+        read_obj = types.SimpleNamespace(cube=cube, month_header=TestWhatIf.TEST_READ_OBJ.month_header,
+                                         period_index=PeriodIndex([160] * 12))
+
+        what_if = WhatIf(TestWhatIf.TEST_CONFIG_OBJ, read_obj)
+
+        staff = cube.staff_names[cube.entry_staff[0]]
+        prj = cube.project_ids[cube.entry_project[0]]
+
+        start = time.perf_counter()
+        changes = what_if.apply(what_if.move(staff, prj, '1', 200, ['Jul', 'Aug', 'Sep']))
+        elapsed = time.perf_counter() - start
+
+        self.assertTrue(len(changes) > 0)
+        self.assertLess(elapsed, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""test_workbook_validator.py
+
+Tests for ValidateWorkbooks class.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+import xlsxwriter
+
+from labor_planner.config_reader import ReadConfig
+from labor_planner.workbook_reader import ReadWorkbooks
+from labor_planner.workbook_validator import ValidateWorkbooks, REPORT_FIELDS
+
+
+class TestWorkbookValidator(unittest.TestCase):
+    """Test validation of staff workbooks."""
+
+    TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+    TEST_CONFIG_FILE = os.path.join(TEST_DATA_DIR, 'config_plan.yml')
+
+    @staticmethod
+    def write_workbook(out_file):
+        """Write a staff workbook with one of each problem."""
+
+        wbook = xlsxwriter.Workbook(out_file)
+
+        ws = wbook.add_worksheet('first')
+        ws.write('B3', 100)
+        ws.write('B8', 'high')
+        ws.write_row('A16', ['Lennon, John', 8.5, 'abc', 4])
+        ws.write_number('E16', 2.5, wbook.add_format({'num_format': 'mm/dd/yy'}))
+        ws.write_row('A17', ['Not, Staff', 'xyz'])
+
+        ws = wbook.add_worksheet('second')
+        ws.write('B3', 100)
+        ws.write('B8', 0.5)
+        ws.write_row('A12', ['McCartney, Paul', 8])
+        ws.write_row('A16', ['Starr, Ringo', 8])
+
+        ws = wbook.add_worksheet('third')
+        ws.write('B8', 1)
+        ws.write_row('A16', ['Starr, Ringo', 8])
+
+        # blank template sheet
+        ws = wbook.add_worksheet('new_project_1')
+        ws.write('A16', 'Starr, Ringo')
+
+        # template sheet without a project ID whose only hours are not numbers
+        ws = wbook.add_worksheet('new_project_2')
+        ws.write_row('A16', ['Starr, Ringo', 'TBD'])
+
+        wbook.close()
+
+    def test_validate(self):
+        """Ensure each problem is reported with its cell and the report is written."""
+
+        config_obj = ReadConfig(TestWorkbookValidator.TEST_CONFIG_FILE, validate=True)
+
+        self.assertTrue(config_obj.validate)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+
+            config_obj.data_dir = tmp_dir
+            config_obj.out_validation_file = os.path.join(tmp_dir, 'validation_report.csv')
+
+            TestWorkbookValidator.write_workbook(os.path.join(tmp_dir, 'lennon_john.xlsx'))
+
+            problems = ValidateWorkbooks(config_obj).problems
+
+            found = [(p.sheet, p.cell, p.code) for p in problems]
+
+            self.assertEqual(found, [('first', 'B8', 'string_probability'),
+                                     ('first', 'B16', 'fractional_hours'),
+                                     ('first', 'C16', 'non_numeric_hours'),
+                                     ('first', 'E16', 'fractional_hours'),
+                                     ('second', 'A12', 'staff_above_hours'),
+                                     ('third', 'B3', 'missing_project_id'),
+                                     ('new_project_2', 'B16', 'non_numeric_hours'),
+                                     ('second', 'B3', 'duplicate_project_id')])
+
+            with open(config_obj.out_validation_file) as src:
+                rows = list(csv.reader(src))
+
+            self.assertEqual(rows[0], REPORT_FIELDS)
+            self.assertEqual(len(rows), len(problems) + 1)
+
+    def test_workbooks_not_read(self):
+        """Ensure the validator sets up the roster without reading the staff workbooks into the hours cube."""
+
+        config_obj = ReadConfig(TestWorkbookValidator.TEST_CONFIG_FILE, validate=True)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_obj.out_validation_file = os.path.join(tmp_dir, 'validation_report.csv')
+
+            validate_obj = ValidateWorkbooks(config_obj)
+
+        self.assertEqual(validate_obj.staff_list, ReadWorkbooks(config_obj, ingest=False).staff_list)
+        self.assertEqual(len(validate_obj.cube.entry_hours), 0)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
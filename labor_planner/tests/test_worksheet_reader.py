@@ -8,10 +8,20 @@ Test for ReadWorkbooks class.
 """
 
 import os
+import shutil
+import tempfile
 import unittest
+import warnings
+import xml.etree.ElementTree as ET
+from unittest import mock
 
+import numpy as np
+import xlsxwriter
+
+from labor_planner import stream_reader
 from labor_planner.config_reader import ReadConfig
-from labor_planner.workbook_reader import ReadWorkbooks
+from labor_planner.workbook_reader import (ReadWorkbooks, index_staff_rows, parse_workbook, parse_worksheet,
+                                           HOURS_START_ROW)
 
 
 class TestWorksheetReader(unittest.TestCase):
@@ -22,6 +32,17 @@ class TestWorksheetReader(unittest.TestCase):
     TEST_CONFIG_OBJ = ReadConfig(TEST_CONFIG_FILE)
     TEST_READ_OBJ = ReadWorkbooks(TEST_CONFIG_OBJ)
 
+    @staticmethod
+    def read_isolated_copy(tmp):
+        """Read a copy of the test staff workbooks made in a temporary directory."""
+
+        config_obj = ReadConfig(TestWorksheetReader.TEST_CONFIG_FILE)
+        config_obj.data_dir = os.path.join(tmp, 'FY_2018')
+
+        shutil.copytree(TestWorksheetReader.TEST_CONFIG_OBJ.data_dir, config_obj.data_dir)
+
+        return ReadWorkbooks(config_obj)
+
     def test_num_months_total(self):
         """Check the number of months in the working hours file derived list."""
 
@@ -91,6 +112,269 @@ class TestWorksheetReader(unittest.TestCase):
 
         self.assertGreater(len(TestWorksheetReader.TEST_READ_OBJ.projects_dict), 0)
 
+    def test_parallel_matches_serial(self):
+        """Ensure reading workbooks across a process pool gives the same result as a serial run."""
+
+        config_obj = ReadConfig(TestWorksheetReader.TEST_CONFIG_FILE)
+        config_obj.jobs = 2
+
+        parallel_obj = ReadWorkbooks(config_obj)
+        serial_obj = TestWorksheetReader.TEST_READ_OBJ
+
+        self.assertEqual(list(parallel_obj.staff_dict.items()), list(serial_obj.staff_dict.items()))
+        self.assertEqual(list(parallel_obj.rollup_dict.items()), list(serial_obj.rollup_dict.items()))
+        self.assertEqual(list(parallel_obj.ind_dict.items()), list(serial_obj.ind_dict.items()))
+        self.assertEqual(list(parallel_obj.prj_title_dict.items()), list(serial_obj.prj_title_dict.items()))
+        self.assertEqual(list(parallel_obj.prj_prob_dict.items()), list(serial_obj.prj_prob_dict.items()))
+        self.assertEqual(list(parallel_obj.projects_dict.items()), list(serial_obj.projects_dict.items()))
+
+    def test_stream_reader_matches_xlrd(self):
+        """Ensure the streaming reader gives the same result as the xlrd reader."""
+
+        config_obj = ReadConfig(TestWorksheetReader.TEST_CONFIG_FILE)
+        config_obj.reader = 'stream'
+
+        stream_obj = ReadWorkbooks(config_obj)
+        xlrd_obj = TestWorksheetReader.TEST_READ_OBJ
+
+        self.assertEqual(list(stream_obj.staff_dict.items()), list(xlrd_obj.staff_dict.items()))
+        self.assertEqual(list(stream_obj.rollup_dict.items()), list(xlrd_obj.rollup_dict.items()))
+        self.assertEqual(list(stream_obj.ind_dict.items()), list(xlrd_obj.ind_dict.items()))
+        self.assertEqual(list(stream_obj.prj_title_dict.items()), list(xlrd_obj.prj_title_dict.items()))
+        self.assertEqual(list(stream_obj.projects_dict.items()), list(xlrd_obj.projects_dict.items()))
+
+    def test_stream_error_cells(self):
+        """Ensure error cells the reader has no code for are read as '#N/A' instead of failing."""
+
+        in_file = os.path.join(TestWorksheetReader.TEST_CONFIG_OBJ.data_dir, sorted(os.listdir(
+            TestWorksheetReader.TEST_CONFIG_OBJ.data_dir))[0])
+
+        with stream_reader.StreamWorkbook(in_file) as wkbook:
+            decoded = [wkbook.decode_cell(ET.fromstring('<c xmlns="{}" t="e"><v>{}</v></c>'.format(
+                stream_reader.NS_MAIN[1:-1], text))) for text in ['#DIV/0!', '#SPILL!', '#GETTING_DATA']]
+
+        self.assertEqual(decoded, [(stream_reader.XL_CELL_ERROR, 0x07), (stream_reader.XL_CELL_ERROR, 0x2A),
+                                   (stream_reader.XL_CELL_ERROR, 0x2A)])
+
+    def test_date_formatted_hours(self):
+        """Ensure hours in a cell with a date format are read the same by both readers."""
+
+        staff_index = ReadWorkbooks.build_staff_index(['Lennon, John', 'Starr, Ringo'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            in_file = os.path.join(tmp, 'lennon_john.xlsx')
+
+            with xlsxwriter.Workbook(in_file) as wbook:
+                ws = wbook.add_worksheet('abbey_road')
+                ws.write('B3', '100')
+                ws.write('A16', 'Lennon, John')
+                ws.write_number('B16', 40, wbook.add_format({'num_format': 'mm/dd/yy'}))
+                ws.write('C16', 8)
+
+            for reader in ('xlrd', 'stream'):
+                parsed = parse_workbook(in_file, staff_index, range(1, 4), reader)
+
+                self.assertEqual([r.hours for r in parsed.records], [[40, 8, 0]])
+
+    def test_index_staff_rows(self):
+        """Ensure roster names are indexed by row and duplicate rows are kept."""
+
+        staff_index = ReadWorkbooks.build_staff_index(['Lennon, John', 'Starr, Ringo'])
+        names = ['Group Staff', 'Lennon, John', 'Total', 'Starr, Ringo', 'Lennon, John']
+
+        rows = index_staff_rows(names, staff_index)
+
+        self.assertEqual(list(rows.items()), [('Lennon, John', [1, 4]), ('Starr, Ringo', [3])])
+
+    def test_match_entered_names(self):
+        """Ensure names entered by hand match the roster regardless of case, spacing, and name order."""
+
+        staff_index = ReadWorkbooks.build_staff_index(['Lennon, John', 'Starr, Ringo'])
+        names = ['ringo starr', '  LENNON ,john', 'Total', 'Best, Pete', '', 1.0]
+
+        rows = index_staff_rows(names, staff_index)
+
+        self.assertEqual(list(rows.items()), [('Starr, Ringo', [0]), ('Lennon, John', [1])])
+
+    def test_parse_worksheet_skips_empty(self):
+        """Ensure blank sheets and rows without hours produce no records but staff are still listed."""
+
+        staff_index = ReadWorkbooks.build_staff_index(['Lennon, John', 'Starr, Ringo'])
+        names = [''] * HOURS_START_ROW + ['Lennon, John', 'Starr, Ringo']
+        header = np.full((9, 10), '', dtype=object)
+        hours = np.zeros((2, 12), dtype=np.int64)
+
+        records, duplicates, listed, blanks = parse_worksheet(names, header, hours, staff_index, range(1, 13), 0)
+        self.assertEqual((records, listed), ([], ['Lennon, John', 'Starr, Ringo']))
+        self.assertEqual([b.prj_id for b in blanks], ['Lennon_John_0', 'Starr_Ringo_0'])
+
+        header[2, 1] = '100'
+        hours[1, 0] = 8
+
+        records, duplicates, listed, blanks = parse_worksheet(names, header, hours, staff_index, range(1, 13), 0)
+        self.assertEqual([(r.staff_name, r.prj_id, r.hours[0]) for r in records], [('Starr, Ringo', '100', 8)])
+        self.assertEqual(listed, ['Lennon, John', 'Starr, Ringo'])
+        self.assertEqual([(b.staff_name, b.prj_id, b.row) for b in blanks], [('Lennon, John', '100', 16)])
+
+    def test_misplaced_staff(self):
+        """Ensure roster names above the staff rows are reported by both readers and their hours are not read."""
+
+        staff_index = ReadWorkbooks.build_staff_index(['Lennon, John', 'Starr, Ringo'])
+
+        self.assertEqual(TestWorksheetReader.TEST_READ_OBJ.misplaced_staff, [])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            in_file = os.path.join(tmp, 'lennon_john.xlsx')
+
+            with xlsxwriter.Workbook(in_file) as wbook:
+                ws = wbook.add_worksheet('abbey_road')
+                ws.write('B3', '100')
+                ws.write_row('A12', ['Lennon, John', 8])
+                ws.write_row('A16', ['Starr, Ringo', 4])
+
+            for reader in ('xlrd', 'stream'):
+                parsed = parse_workbook(in_file, staff_index, range(1, 13), reader)
+
+                self.assertEqual([(m.sheet, m.staff_name, m.rows) for m in parsed.misplaced],
+                                 [('abbey_road', 'Lennon, John', [12])])
+                self.assertEqual([r.staff_name for r in parsed.records], ['Starr, Ringo'])
+
+    def test_conflict_without_hours(self):
+        """Ensure a worksheet that lists staff without hours is checked for a conflicting funding probability and its
+        rows take the probability of the first declaration."""
+
+        config_obj = ReadConfig(TestWorksheetReader.TEST_CONFIG_FILE)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_obj.data_dir = tmp
+
+            with xlsxwriter.Workbook(os.path.join(tmp, 'lennon_john.xlsx')) as wbook:
+                ws = wbook.add_worksheet('help')
+                ws.write('B3', '100')
+                ws.write('B8', 0.9)
+                ws.write_row('A16', ['Lennon, John', 8])
+
+                ws = wbook.add_worksheet('help_again')
+                ws.write('B3', '100')
+                ws.write('B8', 0.4)
+                ws.write('A16', 'Starr, Ringo')
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                read_obj = ReadWorkbooks(config_obj)
+
+        self.assertEqual([(c.sheet, c.probability, c.first_sheet, c.first_probability)
+                          for c in read_obj.project_conflicts], [('help_again', 0.4, 'help', 0.9)])
+        self.assertEqual(len([w for w in caught if "Project '100'" in str(w.message)]), 1)
+
+        self.assertEqual(read_obj.cube.blank_probability.tolist(), [0.9])
+        self.assertEqual(set(read_obj.prj_prob_dict['100']), {0.9})
+
+    def test_views_keep_listed_rows(self):
+        """Ensure staff and projects listed without hours stay in the dictionary views with zero hours."""
+
+        read_obj = TestWorksheetReader.TEST_READ_OBJ
+        cube = read_obj.cube
+
+        staff_dict = read_obj.staff_dict
+        self.assertEqual(set(staff_dict), set(cube.staff_names[code] for code in cube.staff_listed))
+
+        # every listed row contributes a month list
+        n_rows = cube.n_entries + len(cube.blank_staff)
+        self.assertEqual(sum(len(v) for v in staff_dict.values()), n_rows * cube.n_months)
+        self.assertEqual(sum(len(v) for v in read_obj.prj_prob_dict.values()), n_rows * cube.n_months)
+        self.assertEqual(sum(sum(v) for v in staff_dict.values()), int(cube.entry_hours.sum()))
+
+        self.assertEqual(list(read_obj.prj_title_dict), list(cube.listed_projects))
+        self.assertTrue(set(cube.project_ids).issubset(read_obj.prj_title_dict))
+
+    def test_lineage(self):
+        """Ensure each entry traces back to the staff row and month cell it was read from."""
+
+        with tempfile.TemporaryDirectory() as tmp:
+            read_obj = self.read_isolated_copy(tmp)
+
+        cube = read_obj.cube
+
+        staff_name = cube.staff_names[cube.entry_staff[0]]
+        prj_id = cube.project_ids[cube.entry_project[0]]
+
+        cells = read_obj.lineage(staff_name, prj_id)
+        self.assertEqual(len(cells), 1)
+        self.assertEqual(cells[0].cell, 'A{}'.format(HOURS_START_ROW + 1))
+        self.assertEqual(cube.lineage(0).sheet, cells[0].sheet)
+
+        # month cells only include entries with hours in that month
+        cells = read_obj.lineage(staff_name, month=0)
+        self.assertEqual(len(cells), int((cube.entry_hours[cube.entry_mask(staff_name), 0] != 0).sum()))
+        self.assertTrue(all(c.cell.startswith('B') for c in cells))
+
+    def test_project_details(self):
+        """Ensure client, dates, and funding are read into the project metadata."""
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cube = self.read_isolated_copy(tmp).cube
+
+        clients = set(cube.project_meta(code).client for code in range(cube.n_projects))
+        self.assertTrue({'Capitol', 'Parlophone'}.issubset(clients))
+
+        self.assertEqual(ReadWorkbooks.set_date(43282.0), '2018-07-01')
+        self.assertEqual(ReadWorkbooks.set_date(''), '')
+        self.assertEqual(ReadWorkbooks.set_funding('$1,250.50'), 1250.5)
+        self.assertEqual(ReadWorkbooks.set_funding(''), 0.0)
+
+    def test_for_design(self):
+        """Ensure a design sliced from a full year read matches reading that design directly."""
+
+        full_obj = TestWorksheetReader.TEST_READ_OBJ
+
+        config_obj = ReadConfig(TestWorksheetReader.TEST_CONFIG_FILE).for_design('quarter_3_4', subdirectory=False)
+
+        design_obj = ReadWorkbooks(config_obj)
+        sliced_obj = full_obj.for_design(config_obj)
+
+        self.assertEqual(sliced_obj.month_list, design_obj.month_list)
+        self.assertEqual(list(sliced_obj.rollup_dict.items()), list(design_obj.rollup_dict.items()))
+        self.assertEqual(list(sliced_obj.ind_dict.items()), list(design_obj.ind_dict.items()))
+        self.assertEqual(list(sliced_obj.projects_dict.items()), list(design_obj.projects_dict.items()))
+
+        # the full year reader is not changed
+        self.assertEqual(full_obj.cube.n_months, 12)
+
+    def test_no_duplicate_staff(self):
+        """Ensure no staff are listed twice in the test workbooks."""
+
+        self.assertEqual(TestWorksheetReader.TEST_READ_OBJ.duplicate_staff, [])
+
+    def test_ingest_cache(self):
+        """Ensure cached results match a fresh parse and unchanged workbooks are not parsed again."""
+
+        config_obj = ReadConfig(TestWorksheetReader.TEST_CONFIG_FILE)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config_obj.cache_dir = cache_dir
+
+            first_obj = ReadWorkbooks(config_obj)
+
+            # no workbook should need parsing on the second run
+            with mock.patch('labor_planner.workbook_reader.parse_workbook', side_effect=AssertionError):
+                cached_obj = ReadWorkbooks(config_obj)
+
+            # results of another reader backend are not reused
+            config_obj.reader = 'stream'
+
+            with mock.patch('labor_planner.workbook_reader.parse_workbook', wraps=parse_workbook) as parse:
+                stream_obj = ReadWorkbooks(config_obj)
+
+            self.assertEqual(parse.call_count, len(first_obj.file_list))
+
+        serial_obj = TestWorksheetReader.TEST_READ_OBJ
+
+        for obj in (first_obj, cached_obj, stream_obj):
+            self.assertEqual(list(obj.staff_dict.items()), list(serial_obj.staff_dict.items()))
+            self.assertEqual(list(obj.ind_dict.items()), list(serial_obj.ind_dict.items()))
+            self.assertEqual(list(obj.rollup_dict.items()), list(serial_obj.rollup_dict.items()))
+
 
 if __name__ == '__main__':
 
@@ -0,0 +1,262 @@
+"""what_if.py
+
+Incremental what-if analysis of hour reassignments.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import collections
+
+import numpy as np
+import xlsxwriter
+
+import labor_planner.workbook_utils as util
+from labor_planner.period_index import design_period
+from labor_planner.probability_tiers import assign_tiers
+
+
+# change of hours for a staff member on a project in one month of the run design
+Delta = collections.namedtuple('Delta', ['staff_name', 'prj_id', 'month', 'hours'])
+
+# a single aggregate changed by a what-if; `kind` is one of CHANGE_KINDS
+Change = collections.namedtuple('Change', ['kind', 'key', 'column', 'before', 'after'])
+
+# proportion of available hours covered per staff member and tier, project hours per month, and rollup hours
+CHANGE_KINDS = ('staff_coverage', 'project_hours', 'rollup_hours')
+
+
+class WhatIf:
+    """Apply batches of hour changes to the parsed staff workbooks and recompute only the aggregates they touch.
+
+    Staff hours per funding probability tier and month and project hours per month are reduced once from the
+    hours cube; a what-if only updates the rows of the staff members and projects named in its deltas.
+
+    :param config_obj:                  Configuration object of the run design
+    :param read_obj:                    ReadWorkbooks object
+
+    """
+
+    def __init__(self, config_obj, read_obj):
+
+        self.config_obj = config_obj
+        self.read_obj = read_obj
+
+        cube = self.read_obj.cube
+        self.cube = cube
+
+        # month labels of the run design
+        self.month_labels = util.implement_design(self.config_obj.design, self.read_obj.month_header)
+        self.month_index = {label: idx for idx, label in enumerate(self.month_labels)}
+        self.month_index.update((label.split('-')[0], idx) for idx, label in enumerate(self.month_labels))
+
+        # available hours over the design term
+        self.avail_hours_sum = self.read_obj.period_index.available_hours(*design_period(self.config_obj.design))
+
+        # funding probability tier of each project
+        self.tier_names = list(self.config_obj.tier_names)
+        self.project_tiers = assign_tiers(cube.project_probability, self.config_obj.tier_edges)
+
+        # baseline aggregates
+        self.staff_tier_month = cube.staff_class_month_totals(cube.entry_tiers(self.config_obj.tier_edges),
+                                                              len(self.tier_names))
+        self.project_month = cube.project_month_totals()
+
+        # {(staff code, project code, month): hours} of what-ifs kept in the baseline
+        self.kept = collections.defaultdict(int)
+
+    def month_code(self, month):
+        """Position of a month in the run design.
+
+        :param month:                   Position, month header such as 'Jul-18', or month abbreviation such as 'Jul'
+
+        :return:                        int
+
+        """
+        if isinstance(month, (int, np.integer)):
+            if not 0 <= month < len(self.month_labels):
+                raise IndexError("Month {} is not in the {} run design.".format(month, self.config_obj.design))
+
+            return int(month)
+
+        if month not in self.month_index:
+            raise KeyError("Month '{}' is not in the {} run design.".format(month, self.config_obj.design))
+
+        return self.month_index[month]
+
+    def move(self, staff_name, from_prj, to_prj, hours, months):
+        """Deltas that move hours of a staff member from one project to another, split evenly over months.
+
+        :param staff_name:              Staff name as listed in the staff file
+        :param from_prj:                Project the hours are taken from
+        :param to_prj:                  Project the hours are given to
+        :param hours:                   Total hours to move
+        :param months:                  List of months, see `month_code`
+
+        :return:                        List of Delta
+
+        """
+        split = np.full(len(months), hours // len(months), dtype=np.int64)
+        split[:hours % len(months)] += 1
+
+        deltas = []
+        for month, month_hours in zip(months, split.tolist()):
+            deltas.append(Delta(staff_name, from_prj, month, -month_hours))
+            deltas.append(Delta(staff_name, to_prj, month, month_hours))
+
+        return deltas
+
+    def apply(self, deltas, keep=False):
+        """Apply a batch of hour changes and get the aggregates that changed.
+
+        :param deltas:                  List of Delta
+        :param keep:                    True to keep the changes as the baseline of the next what-if
+
+        :return:                        List of Change
+
+        """
+        cube = self.cube
+
+        # combine deltas by staff member, project, and month
+        combined = collections.defaultdict(int)
+
+        for d in deltas:
+            if d.staff_name not in cube.staff_index:
+                raise KeyError("Staff member '{}' is not in the staff file.".format(d.staff_name))
+
+            if d.prj_id not in cube.project_index:
+                raise KeyError("Project '{}' is not in the staff workbooks.".format(d.prj_id))
+
+            combined[(cube.staff_index[d.staff_name], cube.project_index[d.prj_id], self.month_code(d.month))] += \
+                int(d.hours)
+
+        # copies of the rows of the affected staff members and projects
+        staff_rows = {}
+        project_rows = {}
+
+        for (staff, prj, month), hours in combined.items():
+
+            if staff not in staff_rows:
+                staff_rows[staff] = self.staff_tier_month[staff].copy()
+
+            if prj not in project_rows:
+                project_rows[prj] = self.project_month[prj].copy()
+
+            if hours < 0 and self.staff_project_hours(staff, prj, month) + hours < 0:
+                raise ValueError("Removing {} hours leaves {} with negative hours on project '{}' in {}.".format(
+                    -hours, cube.staff_names[staff], cube.project_ids[prj], self.month_labels[month]))
+
+            staff_rows[staff][self.project_tiers[prj], month] += hours
+            project_rows[prj][month] += hours
+
+        changes = self.staff_changes(staff_rows) + self.project_changes(project_rows) + self.rollup_changes(staff_rows)
+
+        if keep:
+            for staff, row in staff_rows.items():
+                self.staff_tier_month[staff] = row
+
+            for prj, row in project_rows.items():
+                self.project_month[prj] = row
+
+            for key, hours in combined.items():
+                self.kept[key] += hours
+
+        return changes
+
+    def staff_project_hours(self, staff, prj, month):
+        """Baseline hours of a staff member on a project in a month, including kept what-ifs."""
+
+        mask = (self.cube.entry_staff == staff) & (self.cube.entry_project == prj)
+
+        return int(self.cube.entry_hours[mask, month].sum()) + self.kept.get((staff, prj, month), 0)
+
+    def staff_changes(self, staff_rows):
+        """Changes of the proportion of available hours covered per tier and in total."""
+
+        changes = []
+
+        for staff, row in sorted(staff_rows.items(), key=lambda i: self.cube.staff_names[i[0]]):
+
+            before = self.staff_tier_month[staff].sum(axis=1).tolist()
+            after = row.sum(axis=1).tolist()
+
+            for column, b, a in zip(self.tier_names + ['Total'], before + [sum(before)], after + [sum(after)]):
+                if b != a:
+                    changes.append(Change('staff_coverage', self.cube.staff_names[staff], column,
+                                          b / float(self.avail_hours_sum), a / float(self.avail_hours_sum)))
+
+        return changes
+
+    def project_changes(self, project_rows):
+        """Changes of project hours per month and in total."""
+
+        changes = []
+
+        for prj, row in sorted(project_rows.items(), key=lambda i: self.cube.project_ids[i[0]]):
+
+            before = self.project_month[prj].tolist()
+            after = row.tolist()
+
+            for column, b, a in zip(self.month_labels + ['Total'], before + [sum(before)], after + [sum(after)]):
+                if b != a:
+                    changes.append(Change('project_hours', self.cube.project_ids[prj], column, b, a))
+
+        return changes
+
+    def rollup_changes(self, staff_rows):
+        """Changes of the rollup hours per month and in total; all but the least likely tier."""
+
+        changes = []
+
+        for staff, row in sorted(staff_rows.items(), key=lambda i: self.cube.staff_names[i[0]]):
+
+            before = self.staff_tier_month[staff][:-1].sum(axis=0).tolist()
+            after = row[:-1].sum(axis=0).tolist()
+
+            for column, b, a in zip(self.month_labels + ['Total'], before + [sum(before)], after + [sum(after)]):
+                if b != a:
+                    changes.append(Change('rollup_hours', self.cube.staff_names[staff], column, b, a))
+
+        return changes
+
+    def write_comparison(self, changes, out_file=None):
+        """Write a workbook with the values before and after a what-if side by side.
+
+        :param changes:                 List of Change from `apply`
+        :param out_file:                Full path with file name and extension of the workbook; defaults to
+                                        `out_what_if_file` of the configuration
+
+        """
+        if out_file is None:
+            out_file = self.config_obj.out_what_if_file
+
+        wkbook = xlsxwriter.Workbook(out_file)
+
+        bold_1 = wkbook.add_format({'bold': 1})
+        percent_format = wkbook.add_format({'num_format': '0%'})
+
+        headers = {'staff_coverage': ['Staff Member', 'Tier', 'Before', 'After', 'Change'],
+                   'project_hours': ['Project', 'Month', 'Before', 'After', 'Change'],
+                   'rollup_hours': ['Staff Member', 'Month', 'Before', 'After', 'Change']}
+
+        for kind in CHANGE_KINDS:
+
+            ws = wkbook.add_worksheet(kind)
+            ws.set_column('A:B', 25)
+            ws.set_column('C:E', 12)
+            ws.write_row('A1', headers[kind], bold_1)
+
+            value_format = percent_format if kind == 'staff_coverage' else None
+
+            row = 1
+            for c in changes:
+                if c.kind != kind:
+                    continue
+
+                ws.write_row(row, 0, [c.key, c.column])
+                ws.write_row(row, 2, [c.before, c.after, c.after - c.before], value_format)
+
+                row += 1
+
+        wkbook.close()
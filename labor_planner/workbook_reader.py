@@ -9,10 +9,407 @@ Read and format staff labor planning workbooks.
 
 import os
 import collections
+import concurrent.futures
+import copy
+import functools
+import warnings
 
 import numpy as np
 import pandas as pd
 import xlrd
+from xlsxwriter.utility import xl_rowcol_to_cell
+
+from labor_planner import stream_reader
+from labor_planner.ingest_cache import IngestCache
+from labor_planner.hours_cube import HoursCube, ProjectDetails, ProjectMeta
+from labor_planner.org_tree import OrgTree
+from labor_planner.period_index import PeriodIndex, design_period
+
+
+# staff hours parsed from a single row of a project worksheet
+#  title is as entered on the worksheet and may be empty
+#  row is one-based as shown in Excel
+#  details is the ProjectDetails of the worksheet
+StaffRecord = collections.namedtuple('StaffRecord', ['staff_name', 'prj_id', 'manager', 'hours', 'title',
+                                                     'probability', 'sheet', 'row', 'details'])
+
+# staff name listed on more than one row of a worksheet; rows are one-based as shown in Excel
+DuplicateStaff = collections.namedtuple('DuplicateStaff', ['file', 'sheet', 'staff_name', 'rows'])
+
+# staff name listed in column A above the staff rows, where its hours are not read; rows are one-based as shown
+#  in Excel
+MisplacedStaff = collections.namedtuple('MisplacedStaff', ['file', 'sheet', 'staff_name', 'rows'])
+
+# source cell of hours in a staff workbook; cell is an Excel reference such as 'E16'
+SourceCell = collections.namedtuple('SourceCell', ['file', 'sheet', 'cell'])
+
+# listed staff row without hours in the months read; only counted, its hours are not stored
+#  row is one-based as shown in Excel; before is the number of records of the workbook read ahead of it
+BlankRow = collections.namedtuple('BlankRow', ['staff_name', 'prj_id', 'title', 'probability', 'row', 'before',
+                                               'manager', 'sheet', 'details'])
+
+# partial result of parsing a single staff workbook
+#  listed holds every roster name found in column A, including staff without hours, in order of first appearance
+#  projects holds (ProjectMeta, declared) of every project with listed staff on each worksheet in order of first
+#  appearance; declared is False when the worksheet has no project, proposal, or work package number
+ParsedWorkbook = collections.namedtuple('ParsedWorkbook', ['records', 'duplicates', 'listed', 'blanks', 'projects',
+                                                           'misplaced'])
+
+# worksheet template layout; header cells are in rows 1-9 and columns A-J, staff hours start on row 16 in
+#  columns B-M
+HEADER_ROWS = 9
+HEADER_COLS = 10
+HOURS_START_ROW = 15
+HOURS_START_COL = 1
+HOURS_END_COL = 13
+
+
+def lazy_view(method):
+    """Decorator for a read-only property that is derived on first access and then cached in `self._views`."""
+
+    name = method.__name__
+
+    @functools.wraps(method)
+    def view(self):
+        if name not in self._views:
+            self._views[name] = method(self)
+
+        return self._views[name]
+
+    return property(view)
+
+
+def read_block(s, start_row, end_row, start_col, end_col, types=False):
+    """Read a rectangular block of cells from an xlrd worksheet in one pass per row.
+
+    :param s:                           xlrd worksheet object
+    :param start_row:                   Zero-based first row index
+    :param end_row:                     Zero-based row index to stop before
+    :param start_col:                   Zero-based first column index
+    :param end_col:                     Zero-based column index to stop before
+    :param types:                       True to return xlrd cell types instead of cell values
+
+    :return:                            2-D object array padded with empty values where the sheet is ragged
+
+    """
+    n_cols = end_col - start_col
+    end_row = min(end_row, s.nrows)
+    fill = xlrd.XL_CELL_EMPTY if types else ''
+    reader = s.row_types if types else s.row_values
+
+    block = np.full((max(end_row - start_row, 0), n_cols), fill, dtype=object)
+
+    for idx, row in enumerate(range(start_row, end_row)):
+        values = reader(row, start_col, end_col)
+        block[idx, :len(values)] = values
+
+    return block
+
+
+def hours_to_int(values, types):
+    """Convert a block of hour cell values to integers following the rules of `ReadWorkbooks.check_int`.
+
+    :param values:                      2-D object array of cell values
+    :param types:                       2-D object array of cell type codes
+
+    :return:                            2-D integer array of hours
+
+    """
+    hours = np.zeros(values.shape, dtype=np.int64)
+
+    # empty and blank cells remain 0; text cells go through the scalar check.  xlrd reports numbers with a date
+    #  format as dates while the streaming reader does not read cell formats, so both are counted as numbers
+    numeric = np.isin(types, (stream_reader.XL_CELL_NUMBER, stream_reader.XL_CELL_DATE,
+                              stream_reader.XL_CELL_BOOLEAN, stream_reader.XL_CELL_ERROR))
+    text = types == stream_reader.XL_CELL_TEXT
+
+    hours[numeric] = np.trunc(values[numeric].astype(np.float64))
+
+    for row, col in zip(*np.nonzero(text)):
+        hours[row, col] = ReadWorkbooks.check_int(values[row, col])
+
+    return hours
+
+
+def read_sheet_blocks(s):
+    """Pull the staff names, header block, and hours block from an xlrd worksheet.
+
+    :param s:                           xlrd worksheet object
+
+    :return:                            [0] list of column A values
+                                        [1] 2-D array of header cell values
+                                        [2] 2-D array of hours cell values from row 16 down for columns B-M
+                                        [3] 2-D array of hours cell types
+
+    """
+    names = s.col_values(0)
+
+    header = read_block(s, 0, HEADER_ROWS, 0, HEADER_COLS)
+
+    values = read_block(s, HOURS_START_ROW, s.nrows, HOURS_START_COL, HOURS_END_COL)
+    types = read_block(s, HOURS_START_ROW, s.nrows, HOURS_START_COL, HOURS_END_COL, types=True)
+
+    return names, header, values, types
+
+
+def iter_workbook_blocks(in_file, reader='xlrd', keep_names=None):
+    """Generate the cell blocks of each worksheet in a staff workbook.
+
+    :param in_file:                     Full path with file name and extension to the staff workbook
+    :param reader:                      Reader backend; either 'xlrd' or 'stream'.  The streaming reader only
+                                        supports .xlsx files so .xls files always use xlrd.
+    :param keep_names:                  Optional container of staff names used by the streaming reader to skip
+                                        decoding hours for rows that will not be matched
+
+    :return:                            Generator of (sheet name, worksheet blocks as returned by
+                                        `read_sheet_blocks`)
+
+    """
+    if reader == 'stream' and os.path.splitext(in_file)[-1] == '.xlsx':
+
+        # names entered by hand are kept when they match the roster
+        if isinstance(keep_names, RosterIndex):
+            keep_names = RosterNames(keep_names)
+
+        with stream_reader.StreamWorkbook(in_file) as wkbook:
+            for sheet_name, member in wkbook.sheets:
+                yield sheet_name, wkbook.read_sheet_blocks(member, (HEADER_ROWS, HEADER_COLS), HOURS_START_ROW,
+                                                           (HOURS_START_COL, HOURS_END_COL), keep_names)
+
+    else:
+
+        with xlrd.open_workbook(in_file) as wkbook:
+            for s in wkbook.sheets():
+                yield s.name, read_sheet_blocks(s)
+
+
+def normalize_name(nm):
+    """Lower case a staff name with single spaces and no space before a comma."""
+
+    return ' '.join(nm.replace(',', ' , ').split()).replace(' ,', ',').casefold()
+
+
+class RosterIndex(dict):
+    """Hash index of {staff_name: roster position} that also matches names entered by hand, such as in the free
+    rows of a team workbook.  Names match regardless of case and spacing and in either 'Last, First' or
+    'First Last' order.
+
+    :param staff_list:                  List of staff full names
+
+    """
+
+    def __init__(self, staff_list):
+
+        super().__init__()
+
+        # {normalized name: staff name}
+        self.aliases = {}
+
+        for idx, nm in enumerate(staff_list):
+            self.setdefault(nm, idx)
+
+            self.aliases.setdefault(normalize_name(nm), nm)
+
+            if ',' in nm:
+                last, first = nm.split(',', 1)
+                self.aliases.setdefault(normalize_name('{} {}'.format(first, last)), nm)
+
+    def match(self, nm):
+        """Roster name of a column A value or None."""
+
+        if nm in self:
+            return nm
+
+        if isinstance(nm, str) and nm.strip():
+            return self.aliases.get(normalize_name(nm))
+
+        return None
+
+
+class RosterNames:
+    """Container of the column A values that match a RosterIndex; used to filter rows while streaming."""
+
+    def __init__(self, staff_index):
+
+        self.staff_index = staff_index
+
+    def __contains__(self, nm):
+
+        return self.staff_index.match(nm) is not None
+
+
+def index_staff_rows(names, staff_index):
+    """Find the rows of roster staff in column A with a single pass.  Names entered by hand are matched
+    through the aliases of a RosterIndex.
+
+    :param names:                       List of column A values
+    :param staff_index:                 Dictionary of {staff_name: roster position} or RosterIndex
+
+    :return:                            Ordered dictionary of {staff_name: [zero-based row, ...]} in order of
+                                        first appearance
+
+    """
+    rows = collections.OrderedDict()
+
+    match = getattr(staff_index, 'match', None)
+
+    for row, nm in enumerate(names):
+        if nm in staff_index:
+            rows.setdefault(nm, []).append(row)
+
+        elif match is not None:
+            roster_name = match(nm)
+
+            if roster_name is not None:
+                rows.setdefault(roster_name, []).append(row)
+
+    return rows
+
+
+def is_blank_sheet(header, hours):
+    """Check whether a worksheet is an unused template sheet; one with no project, proposal, or work package
+    number and no hours.
+
+    :param header:                      2-D array of header cell values
+    :param hours:                       2-D integer array of hours
+
+    :return:                            True if the worksheet is blank
+
+    """
+    return (header[2, [1, 5, 9]] == '').all() and not hours.any()
+
+
+def parse_worksheet(names, header, hours, staff_index, month_list, sheet_index, sheet_name=None):
+    """Create staff records from the blocks of a single project worksheet.  Only rows with hours in the
+    months read are materialized as records; other listed rows are returned as blank rows.
+
+    :param names:                       List of column A values
+    :param header:                      2-D array of header cell values
+    :param hours:                       2-D integer array of hours from row 16 down for columns B-M
+    :param staff_index:                 Dictionary of {staff_name: roster position}
+    :param month_list:                  List of month column positions to read
+    :param sheet_index:                 Index of the worksheet in the workbook
+    :param sheet_name:                  Name of the worksheet
+
+    :return:                            [0] list of StaffRecord in row order
+                                        [1] dictionary of {staff_name: [zero-based row, ...]} for names listed
+                                        more than once
+                                        [2] list of roster names listed in the staff rows
+                                        [3] list of BlankRow in row order
+
+    """
+    records = []
+
+    # get project number, proposal number, or work package number
+    prj_num = header[2, 1]
+    prop_num = header[2, 5]
+    wp_num = header[2, 9]
+    mng_name = header[8, 1]
+
+    # get project title from worksheet
+    title = header[3, 1]
+
+    # convert funding probability to decimal
+    fund_prob = ReadWorkbooks.set_probability(header[7, 1])
+
+    # client, start and end dates, and funding amount
+    details = ProjectDetails(str(header[4, 1]).strip(), ReadWorkbooks.set_date(header[5, 1]),
+                             ReadWorkbooks.set_date(header[5, 3]), ReadWorkbooks.set_funding(header[6, 1]))
+
+    # unused template sheets are rejected without reading their hours row by row
+    if is_blank_sheet(header, hours):
+        staff_rows = index_staff_rows(names[HOURS_START_ROW:], staff_index)
+
+        blanks = [BlankRow(nm, ReadWorkbooks.get_prj_id(prj_num, prop_num, wp_num, nm, sheet_index), title, fund_prob,
+                           row + HOURS_START_ROW + 1, 0, mng_name, sheet_name, details)
+                  for row, nm in sorted((row, nm) for nm, rows in staff_rows.items() for row in rows)]
+
+        return records, {}, sorted(staff_rows, key=staff_index.get), blanks
+
+    # columns of the hours block to keep based on design
+    month_cols = np.array(month_list) - HOURS_START_COL
+
+    # rows of each roster name in column A; staff rows sit below the header of the template
+    staff_rows = index_staff_rows(names[HOURS_START_ROW:], staff_index)
+
+    duplicates = collections.OrderedDict((nm, [r + HOURS_START_ROW for r in rows])
+                                         for nm, rows in staff_rows.items() if len(rows) > 1)
+
+    # rows of the hours block with any hours in the months read
+    has_hours = hours[:, month_cols].any(axis=1)
+
+    blanks = []
+
+    # each listed row with hours contributes its own hours, in row order; the others are only counted
+    for row, nm in sorted((row, nm) for nm, rows in staff_rows.items() for row in rows):
+
+        # determine which project identifier to report
+        prj_id = ReadWorkbooks.get_prj_id(prj_num, prop_num, wp_num, nm, sheet_index)
+
+        if not has_hours[row]:
+            blanks.append(BlankRow(nm, prj_id, title, fund_prob, row + HOURS_START_ROW + 1, len(records), mng_name,
+                                   sheet_name, details))
+            continue
+
+        hrs_list = hours[row, month_cols].tolist()
+
+        records.append(StaffRecord(nm, prj_id, mng_name, hrs_list, title, fund_prob, sheet_name,
+                                   row + HOURS_START_ROW + 1, details))
+
+    return records, duplicates, list(staff_rows), blanks
+
+
+def parse_workbook(in_file, staff_index, month_list, reader='xlrd'):
+    """Parse a single staff workbook without modifying any shared state.  Used directly for serial runs
+    and as the worker function when workbooks are parsed in parallel.
+
+    :param in_file:                     Full path with file name and extension to the staff workbook.
+    :param staff_index:                 Dictionary of {staff_name: roster position}.
+    :param month_list:                  List of month column positions to read.
+    :param reader:                      Reader backend; either 'xlrd' or 'stream'.
+
+    :return:                            ParsedWorkbook of staff records in worksheet and row order, the
+                                        staff names listed more than once in a worksheet, all roster names
+                                        listed, and roster names listed above the staff rows.
+
+    """
+    records = []
+    duplicates = []
+    listed = collections.OrderedDict()
+    blanks = []
+    projects = collections.OrderedDict()
+    misplaced = []
+
+    # Iterate through worksheets
+    for index, (sheet_name, blocks) in enumerate(iter_workbook_blocks(in_file, reader, staff_index)):
+
+        names, header, values, types = blocks
+
+        hours = hours_to_int(values, types)
+
+        sheet_records, sheet_duplicates, sheet_listed, sheet_blanks = parse_worksheet(names, header, hours,
+                                                                                      staff_index, month_list,
+                                                                                      index, sheet_name)
+
+        blanks.extend(b._replace(before=b.before + len(records)) for b in sheet_blanks)
+        records.extend(sheet_records)
+        listed.update(dict.fromkeys(sheet_listed))
+
+        # a sheet declares one project unless it has no identifier; then each staff row has its own
+        declared = bool((header[2, [1, 5, 9]] != '').any())
+
+        for r in sorted(sheet_records + sheet_blanks, key=lambda r: r.row):
+            meta = ProjectMeta(r.prj_id, r.title, r.manager, r.probability, in_file, r.sheet, *r.details)
+            projects.setdefault((r.prj_id, sheet_name), (meta, declared))
+
+        duplicates.extend(DuplicateStaff(in_file, sheet_name, nm, [r + 1 for r in rows])
+                          for nm, rows in sheet_duplicates.items())
+
+        # roster names in column A above the staff rows are not read, only reported
+        misplaced.extend(MisplacedStaff(in_file, sheet_name, nm, [r + 1 for r in rows])
+                         for nm, rows in index_staff_rows(names[:HOURS_START_ROW], staff_index).items())
+
+    return ParsedWorkbook(records, duplicates, list(listed), blanks, list(projects.values()), misplaced)
 
 
 class ReadWorkbooks:
@@ -20,10 +417,12 @@ class ReadWorkbooks:
      for all listed individuals.
 
     :param config_obj:                  YAML configuration object
+    :param ingest:                      If False, only the roster, files, and months are set up and the staff
+                                        workbooks are not read
 
     """
 
-    def __init__(self, config_obj):
+    def __init__(self, config_obj, ingest=True):
 
         self.my_settings = config_obj
 
@@ -46,140 +445,381 @@ class ReadWorkbooks:
         # Create list of staff
         self.staff_list = self.get_staff_list()
 
+        # {staff_name: roster position} used to match names in column A
+        self.staff_index = self.build_staff_index(self.staff_list)
+
         # Create list of months based on design
         self.month_list = self.create_time_span_list()
 
-        # {staff_name: [hours per month, ...]}
-        self.rollup_dict = {}
+        # staff x project x month hours; the output dictionaries below are derived from it on first use
+        self.cube = HoursCube(self.staff_list, len(self.month_list))
+
+        # cache of derived dictionary views
+        self._views = {}
+
+        if ingest:
+            self.ingest()
+
+    def ingest(self):
+        """Read the staff workbooks into the hours cube."""
 
-        # {project_number: project_title}
-        self.prj_title_dict = {}
+        # parse each workbook into a list of staff records; uses a process pool when `jobs` > 1
+        in_files = [os.path.join(self.my_settings.data_dir, f) for f in self.file_list if f[0] not in ("~", ".")]
 
-        # {staff_name: [hours per month for all projects, ...]}
-        self.staff_dict = {}
+        # [DuplicateStaff, ...] for staff names listed on more than one row of a worksheet
+        self.duplicate_staff = []
 
-        # {project: [project probability for all staff months, ...]}
-        self.prj_prob_dict = {}
+        # [MisplacedStaff, ...] for staff names listed above the staff rows of a worksheet
+        self.misplaced_staff = []
 
-        # {staff_name: [hours associated with low probability funding, ...]}
-        self.staff_low_prob_dict = {}
+        # merge partial results in file order so the outputs match a serial run
+        for in_file, parsed in zip(in_files, self.read_cached_workbooks(in_files)):
+            self.cube.add_listed(parsed.listed)
+            self.cube.add_listed_projects(parsed.projects)
 
-        # {staff_name: [hours associated with high probability funding, ...]}
-        self.staff_high_prob_dict = {}
+            # rows without hours are counted where they were read among the records
+            blanks = iter(parsed.blanks)
+            blank = next(blanks, None)
 
-        # ordered dictionary of {staff_name: [[project_number, project_manager,
-        #     total_hrs_per_mth, project_title, probability], ...}
-        self.ind_dict = {}
+            for idx, record in enumerate(parsed.records + [None]):
+                while blank is not None and blank.before == idx:
+                    self.cube.add_blank(blank.staff_name, blank.prj_id, blank.probability)
+                    blank = next(blanks, None)
 
-        # {project_number:[[staff_name, project_manager, total_hrs_per_mth, probability], [...]], ...}
-        self.projects_dict = {}
+                if record is not None:
+                    self.add_record(record, in_file)
 
-        # Iterate through directory xlsx files
-        for f in self.file_list:
-            # Ignore hidden files
-            if f[0] in ("~", "."):
-                continue
+            self.duplicate_staff.extend(parsed.duplicates)
+            self.misplaced_staff.extend(parsed.misplaced)
 
-            # Get full path to workbook
-            in_file = os.path.join(self.my_settings.data_dir, f)
+        for dup in self.duplicate_staff:
+            warnings.warn("'{}' is listed on rows {} of sheet '{}' in {}; hours from each row are included.".format(
+                dup.staff_name, dup.rows, dup.sheet, dup.file))
 
-            with xlrd.open_workbook(in_file) as wkbook:
+        for m in self.misplaced_staff:
+            warnings.warn("'{}' is listed on rows {} of sheet '{}' in {} above the staff rows that start on row {}; "
+                          "hours from these rows are not included.".format(m.staff_name, m.rows, m.sheet, m.file,
+                                                                           HOURS_START_ROW + 1))
 
-                # create a list of worksheet names
-                wksheets = wkbook.sheet_names()
+        # [ProjectConflict, ...] for worksheets that disagree on the funding probability of a project
+        self.project_conflicts = self.cube.conflicts
 
-                # See how many sheets there are
-                wksheet_num = len(wksheets)
+        for c in self.project_conflicts:
+            warnings.warn("Project '{}' has probability {} on sheet '{}' in {} but {} on sheet '{}' in {}; "
+                          "using {}.".format(c.prj_id, c.probability, c.sheet, c.file, c.first_probability,
+                                             c.first_sheet, c.first_file, c.first_probability))
 
-                # Create a list of index values to iterate through for sheets
-                wksheet_idx_list = range(0, wksheet_num, 1)
+        self.cube.finalize()
 
-                # Iterate through worksheets
-                for index, i in enumerate(wksheet_idx_list):
+    def for_design(self, config_obj):
+        """Create a reader for another run design from the hours already read, without reading the staff
+        workbooks again.  The months of the design must have been read by this reader, e.g. a 'full_year' reader.
 
-                    # instantiate a worksheet
-                    s = wkbook.sheet_by_name(wksheets[i])
+        :param config_obj:              Configuration object of the run design
 
-                    # get all values in the column A
-                    get_names = s.col_values(0)
+        :return:                        ReadWorkbooks object
 
-                    # iterate through names in worksheet
-                    for nm in get_names:
+        """
+        read_obj = copy.copy(self)
+
+        read_obj.my_settings = config_obj
+        read_obj.month_list = read_obj.create_time_span_list()
+
+        read_obj.cube = self.cube.slice_months([self.month_list.index(m) for m in read_obj.month_list])
+        read_obj._views = {}
+
+        return read_obj
+
+    def parse_workbooks(self, in_files):
+        """Parse staff workbooks either serially or across a pool of worker processes.
+
+        :param in_files:                List of full paths to the staff workbooks.
+
+        :return:                        List of ParsedWorkbook in the same order as `in_files`.
+
+        """
+        if len(in_files) == 0:
+            return []
+
+        jobs = min(self.my_settings.jobs, len(in_files))
+
+        reader = self.my_settings.reader
+
+        if jobs <= 1:
+            return [parse_workbook(f, self.staff_index, self.month_list, reader) for f in in_files]
+
+        n_files = len(in_files)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(parse_workbook, in_files, [self.staff_index] * n_files,
+                                     [self.month_list] * n_files, [reader] * n_files))
+
+    def read_cached_workbooks(self, in_files):
+        """Parse staff workbooks, reusing results from the ingest cache for files that have not changed.
+
+        :param in_files:                List of full paths to the staff workbooks.
+
+        :return:                        List of ParsedWorkbook in the same order as `in_files`.
+
+        """
+        if self.my_settings.cache_dir is None:
+            return self.parse_workbooks(in_files)
+
+        # parsed results depend on the roster, the work hours, the months read, and the reader backend
+        cache = IngestCache(self.my_settings.cache_dir,
+                            [self.my_settings.in_staff_csv, self.my_settings.in_work_hours],
+                            (tuple(self.month_list), self.my_settings.reader))
+
+        results = [cache.get(f) for f in in_files]
+
+        # only parse new or modified workbooks
+        stale_files = [f for f, parsed in zip(in_files, results) if parsed is None]
+
+        for f, parsed in zip(stale_files, self.parse_workbooks(stale_files)):
+            cache.put(f, parsed)
+
+        cache.evict(in_files)
+        cache.save()
+
+        return [cache.entries[f][3] for f in in_files]
+
+    def add_record(self, record, in_file=None):
+        """Add a single staff record to the hours cube.
+
+        :param record:                  StaffRecord parsed from a project worksheet.
+        :param in_file:                 Workbook the record was parsed from.
+
+        """
+        self.cube.add(record.staff_name, record.prj_id, record.title, record.manager, record.probability,
+                      record.hours, in_file, record.sheet, record.row, record.details)
+
+    @staticmethod
+    def format_title(title, fill):
+        """Replace an empty project title with a fill value."""
+
+        if len(title) == 0:
+            return fill
+
+        return title
+
+    @lazy_view
+    def rollup_dict(self):
+        """{staff_name: [hours per month, ...]} for high probability projects, those above the lowest funding
+        probability tier edge; padded to 12 months.
+
+        """
+        totals = self.cube.staff_month_totals(self.cube.high_probability_mask(self.my_settings.tier_edges))
+
+        d = collections.OrderedDict()
+
+        for code in self.cube.staff_seen():
+            d[self.cube.staff_names[code]] = totals[code].tolist() + [0] * (12 - self.cube.n_months)
+
+        return d
+
+    def listed_project_meta(self, prj_id):
+        """Title and probability of a listed project; from the project table when it has hours."""
+
+        code = self.cube.project_index.get(prj_id)
+
+        if code is None:
+            meta = self.cube.listed_projects[prj_id]
+            return meta.title, meta.probability
+
+        return self.cube.project_title[code], float(self.cube.project_probability[code])
+
+    @lazy_view
+    def prj_title_dict(self):
+        """{project_number: project_title} of every listed project, with or without hours"""
+
+        return collections.OrderedDict((prj_id, self.format_title(self.listed_project_meta(prj_id)[0], 'none'))
+                                       for prj_id in self.cube.listed_projects)
+
+    @lazy_view
+    def staff_dict(self):
+        """{staff_name: [hours per month for all projects, ...]}; listed rows without hours are zero-filled"""
+
+        return self.cube.staff_hours_dict()
+
+    @lazy_view
+    def prj_prob_dict(self):
+        """{project: [project probability for all staff months, ...]}; kept for compatibility, use
+        `project_meta` for the single probability of a project.
+
+        """
+
+        return collections.OrderedDict((prj_id, [self.listed_project_meta(prj_id)[1]] * (rows * self.cube.n_months))
+                                       for prj_id, rows in self.cube.listed_project_rows().items())
+
+    @lazy_view
+    def staff_low_prob_dict(self):
+        """{staff_name: [hours associated with low probability funding, ...]}"""
+
+        edges = self.my_settings.tier_edges
+
+        return self.cube.staff_hours_dict(~self.cube.high_probability_mask(edges),
+                                          ~self.cube.is_high_probability(self.cube.blank_probability, edges))
+
+    @lazy_view
+    def staff_high_prob_dict(self):
+        """{staff_name: [hours associated with high probability funding, ...]}"""
+
+        edges = self.my_settings.tier_edges
+
+        return self.cube.staff_hours_dict(self.cube.high_probability_mask(edges),
+                                          self.cube.is_high_probability(self.cube.blank_probability, edges))
+
+    @lazy_view
+    def staff_entries(self):
+        """List of (staff code, entry indices) for entries with hours, sorted by staff name."""
+
+        cube = self.cube
+
+        return cube.group_entries(cube.entry_staff, cube.staff_name_order(cube.entry_totals() != 0))
+
+    @lazy_view
+    def project_entries(self):
+        """List of (project code, entry indices) for entries with hours.  Projects are in order of first
+        appearance when staff are taken in name order.
+
+        """
+        cube = self.cube
+
+        return cube.group_entries(cube.entry_project, cube.staff_name_order(cube.entry_totals() != 0))
+
+    def lineage(self, staff_name=None, prj_id=None, month=None):
+        """Find the staff workbook cells that an aggregate was summed from.
+
+        :param staff_name:              Optional staff full name
+        :param prj_id:                  Optional project identifier
+        :param month:                   Optional position on the month axis; only cells with hours in this
+                                        month are returned
+
+        :return:                        List of SourceCell in entry order; without a month the cell is the
+                                        staff name in column A
+
+        """
+        cube = self.cube
 
-                        # if the name is not in the staff list, pass it
-                        if nm in self.staff_list:
+        mask = cube.entry_mask(staff_name, prj_id)
 
-                            # add name to dict for monthly hour sum with placeholders
-                            if nm not in self.rollup_dict:
-                                self.rollup_dict[nm] = [0]*12
+        if month is None:
+            col = 0
+        else:
+            col = self.month_list[month]
+            mask &= cube.entry_hours[:, month] != 0
+
+        cells = []
+        for entry in np.flatnonzero(mask):
+            file, sheet, row = cube.lineage(entry)
+            cells.append(SourceCell(file, sheet, xl_rowcol_to_cell(row - 1, col)))
+
+        return cells
+
+    def source_url(self, entry):
+        """Create an external hyperlink to the staff row an entry was read from.
+
+        :param entry:                   Entry index in the hours cube
+
+        :return:                        URL string for xlsxwriter `write_url`
+
+        """
+        file, sheet, row = self.cube.lineage(entry)
+
+        # absolute path so the link resolves from wherever the output workbook is saved
+        return "external:{}#'{}'!A{}".format(os.path.abspath(file), sheet.replace("'", "''"), row)
 
-                            # get project number, proposal number, or work package number
-                            prj_num = s.cell_value(rowx=2,colx=1)
-                            prop_num = s.cell_value(rowx=2,colx=5)
-                            wp_num = s.cell_value(rowx=2,colx=9)
-                            mng_name = s.cell_value(rowx=8,colx=1)
+    def build_period_index(self, mask=None):
+        """Build a prefix-sum index of hours per staff member and project over the fiscal year calendar.  Months
+        that were not read for the run design hold no hours.
 
-                            # get project title - make no title if none listed
-                            title = s.cell_value(rowx=3,colx=1)
-                            if len(title) == 0:
-                                title = 'No Title Listed'
+        :param mask:                    Optional boolean mask of hours cube entries to include
 
-                            # convert funding probability to decimal
-                            fund_prob = self.set_probability(s.cell_value(rowx=7, colx=1))
+        :return:                        PeriodIndex
 
-                            # determine which project identifier to report
-                            prj_id = self.get_prj_id(prj_num, prop_num, wp_num, nm, index)
+        """
+        months = [m - HOURS_START_COL for m in self.month_list]
+
+        staff_hours = np.zeros((self.cube.n_staff, len(self.wkg_hours_hdr)), dtype=np.int64)
+        staff_hours[:, months] = self.cube.staff_month_totals(mask)
+
+        project_hours = np.zeros((self.cube.n_projects, len(self.wkg_hours_hdr)), dtype=np.int64)
+        project_hours[:, months] = self.cube.project_month_totals(mask)
 
-                            # get project title from worksheet
-                            if len(s.cell_value(3, 1)) == 0:
-                                prj_title = 'none'
-                            else:
-                                prj_title = s.cell_value(3, 1)
+        return PeriodIndex(self.wkg_hours_hdr, staff_hours, project_hours)
 
-                            # add project id and title to dictionary
-                            if prj_id not in self.prj_title_dict:
-                                self.prj_title_dict[prj_id] = prj_title
+    @lazy_view
+    def period_index(self):
+        """PeriodIndex of all hours."""
 
-                            # get position of name in list by index
-                            name_idx = get_names.index(nm)
+        return self.build_period_index()
 
-                            # iterate through the hours estimate for each month
-                            hrs_list = []
-                            for m in self.month_list:
-                                hrs = s.cell_value(rowx=name_idx,colx=m)
+    @lazy_view
+    def org_tree(self):
+        """OrgTree of staff from the supervisor column of the staff file."""
 
-                                # only capture numeric values for hours, else 0
-                                hr = self.check_int(hrs)
+        return OrgTree(self.staff_list, self.get_supervisor_list())
 
-                                # create list of formatted hours for all probs
-                                hrs_list.append(hr)
+    def project_meta(self, prj_id):
+        """Get the metadata record of a project.
 
-                                # add numeric hour values to a yearly hour list
-                                self.staff_dict.setdefault(nm, []).append(hr)
+        :param prj_id:                  Project identifier
 
-                                # add project funding probability to dictionary
-                                self.prj_prob_dict.setdefault(prj_id, []).append(fund_prob)
+        :return:                        ProjectMeta of probability, title, manager, and source worksheet
+
+        """
+        return self.cube.project_meta(self.cube.project_index[prj_id])
 
-                                # differentiate between low and high funding probability
-                                if fund_prob <= 0.5:
-                                    self.staff_low_prob_dict.setdefault(nm, []).append(hr)
-                                else:
-                                    self.staff_high_prob_dict.setdefault(nm, []).append(hr)
+    def project_title(self, code):
+        """Project title for display; 'No Title Listed' if none was entered."""
+
+        return self.format_title(self.cube.project_title[code], 'No Title Listed')
+
+    @lazy_view
+    def ind_dict(self):
+        """Ordered dictionary of {staff_name: [[project_number, project_manager, total_hrs_per_mth,
+        project_title, probability], ...]} sorted by staff name; only includes projects with hours.
+
+        """
+        cube = self.cube
 
-                            # if hrs sum != 0 then add to project code to dict
-                            if sum(hrs_list) != 0:
-                                if nm not in self.ind_dict:
-                                    self.ind_dict[nm] = [[prj_id, mng_name, hrs_list, title, fund_prob]]
-                                else:
-                                    self.ind_dict[nm].append([prj_id, mng_name, hrs_list, title, fund_prob])
+        d = collections.OrderedDict()
 
-                            # sum hours for each month per staff name for rollup workbook
-                            #  project hours must be high prob of funding
-                            if fund_prob > 0.5:
-                                for ct, m_hr in enumerate(hrs_list):
-                                    self.rollup_dict[nm][ct] = (self.rollup_dict[nm][ct] + m_hr)
+        for code, rows in self.staff_entries:
+            d[cube.staff_names[code]] = [[cube.project_ids[prj],
+                                          cube.project_manager[prj],
+                                          cube.entry_hours[row].tolist(),
+                                          self.project_title(prj),
+                                          float(cube.project_probability[prj])]
+                                         for row, prj in zip(rows, cube.entry_project[rows])]
 
-        self.sort_staff_dict()
+        return d
+
+    @lazy_view
+    def projects_dict(self):
+        """{project_number:[[staff_name, project_manager, total_hrs_per_mth, probability], [...]], ...}"""
+
+        cube = self.cube
+
+        d = collections.OrderedDict()
+
+        for code, rows in self.project_entries:
+            d[cube.project_ids[code]] = [[self.format_sheet_name(cube.staff_names[staff]),
+                                          cube.project_manager[code],
+                                          cube.entry_hours[row].tolist(),
+                                          float(cube.project_probability[code])]
+                                         for row, staff in zip(rows, cube.entry_staff[rows])]
+
+        return d
+
+    @staticmethod
+    def format_sheet_name(staff_name):
+        """Format a staff name for use as a worksheet name."""
+
+        st_name = staff_name.replace('*', '').strip()
+        st_nospc = st_name.replace(' ', '_').replace('(', '').replace(')', '')
+
+        return st_nospc.replace(',', '')
 
     @staticmethod
     def check_int(hour_value):
@@ -190,6 +830,42 @@ class ReadWorkbooks:
             hr = 0
         return hr
 
+    @staticmethod
+    def set_date(d):
+        """Format a project date.
+
+        :param d:                       Date cell value; Excel dates are read as serial numbers
+
+        :return:                        ISO formatted date for Excel dates, otherwise the value as entered
+
+        """
+        if type(d) in (int, float):
+            try:
+                return xlrd.xldate_as_datetime(d, 0).date().isoformat()
+
+            except (ValueError, OverflowError):
+                pass
+
+        return str(d).strip()
+
+    @staticmethod
+    def set_funding(f):
+        """Convert a funding amount to a number.
+
+        :param f:                       Funding amount cell value; text may include '$' and ','
+
+        :return:                        Funding amount; 0.0 when empty or not a number
+
+        """
+        if type(f) in (int, float):
+            return float(f)
+
+        try:
+            return float(str(f).replace('$', '').replace(',', '').strip())
+
+        except ValueError:
+            return 0.0
+
     @staticmethod
     def set_probability(p):
         """Set a probability between 0 and 1.
@@ -233,7 +909,8 @@ class ReadWorkbooks:
         return work_hours_row, month_range_row, month_abbrev_list
 
     def get_files_list(self):
-        """Generate a list of labor planning staff Excel files in the data directory.
+        """Generate a sorted list of labor planning staff Excel files in the data directory.  Files are read
+        in name order so results that depend on read order are the same on every run.
 
         :return:                        List of labor planning files.
 
@@ -241,7 +918,7 @@ class ReadWorkbooks:
         # acceptable Excel extensions
         extensions = ('.xlsx', '.xls')
 
-        return [i for i in os.listdir(self.my_settings.data_dir) if os.path.splitext(i)[-1] in extensions]
+        return sorted(i for i in os.listdir(self.my_settings.data_dir) if os.path.splitext(i)[-1] in extensions)
 
     def get_staff_list(self):
         """Read and process input staff file.  A labor planning workbook will be generated for each
@@ -262,33 +939,46 @@ class ReadWorkbooks:
 
         return df['full_name'].tolist()
 
-    def create_time_span_list(self):
-        """Create a list of 12 values to iterate through for col position.
+    def get_supervisor_list(self):
+        """Read the optional `supervisor` column of the staff file.
 
-        :return:                        List of months to include.
+        :return:                            List of the supervisor full name of each staff member; empty strings
+                                            when the column is not present
 
         """
-        if self.my_settings.design == 'full_year':
-            month_list = range(1, 13, 1)
+        df = pd.read_csv(self.my_settings.in_staff_csv)
+
+        if 'supervisor' not in df.columns:
+            return [''] * len(df)
+
+        return df['supervisor'].fillna('').astype(str).str.strip().tolist()
+
+    @staticmethod
+    def build_staff_index(staff_list):
+        """Create a hash index of staff names to their roster position.  The first position is kept for names
+        that appear in the roster more than once.
 
-        elif self.my_settings.design == 'quarter_2_3_4':
-            month_list = range(1, 10, 1)
+        :param staff_list:              List of staff full names
 
-        elif self.my_settings.design == 'quarter_2_3':
-            month_list = range(1, 7, 1)
+        :return:                        RosterIndex of {staff_name: roster position}
 
-        elif self.my_settings.design == 'quarter_2':
-            month_list = range(1, 4, 1)
+        """
+        return RosterIndex(staff_list)
 
-        elif self.my_settings.design == 'quarter_3_4_1':
-            month_list = range(4, 13, 1)
+    def create_time_span_list(self):
+        """Create a list of 12 values to iterate through for col position.
 
-        elif self.my_settings.design == 'quarter_3_4':
-            month_list = range(4, 10, 1)
+        :return:                        List of months to include.
+
+        """
+        start, stop = design_period(self.my_settings.design)
+
+        month_list = range(start + HOURS_START_COL, stop + HOURS_START_COL)
 
         return list(month_list)
 
-    def type_tostring(self, in_val):
+    @staticmethod
+    def type_tostring(in_val):
         """If value is number make int then string.
 
         """
@@ -298,17 +988,18 @@ class ReadWorkbooks:
         except ValueError:
             return in_val
 
-    def get_prj_id(self, project_number, proposal_number, task_number, staff_name, sheet_index):
+    @staticmethod
+    def get_prj_id(project_number, proposal_number, task_number, staff_name, sheet_index):
         """Determine which project identifier to report"""
 
         if project_number != '':
-            prj_id = self.type_tostring(project_number)
+            prj_id = ReadWorkbooks.type_tostring(project_number)
 
         elif project_number == '' and proposal_number != '':
-            prj_id = self.type_tostring(proposal_number)
+            prj_id = ReadWorkbooks.type_tostring(proposal_number)
 
         elif project_number == '' and proposal_number == '' and task_number != '':
-            prj_id = self.type_tostring(task_number)
+            prj_id = ReadWorkbooks.type_tostring(task_number)
 
         else:
             # format possible name issues
@@ -319,32 +1010,3 @@ class ReadWorkbooks:
             prj_id = "{0}_{1}".format(sn, sheet_index)
 
         return prj_id
-
-    def sort_staff_dict(self):
-        """Sort the staff dictionary by name"""
-
-        # sort dict by staff name
-        self.ind_dict = collections.OrderedDict(sorted(self.ind_dict.items()))
-
-        # Iterate through the individual hours dictionary and reconfigure
-        for k in self.ind_dict.keys():
-
-            v = self.ind_dict[k]
-
-            # format the worksheet name using modified staff name
-            st_name = k.replace('*', '').strip()
-            st_nospc = st_name.replace(' ', '_').replace('(', '').replace(')', '')
-            s_name = st_nospc.replace(',', '')
-
-            # iterate through each project for each staff member
-            for i in v:
-                prj = i[0]
-                manager = i[1]
-                hr_list = i[2]
-                p_per = i[4]
-
-                # add project id to dictionary
-                if prj not in self.projects_dict:
-                    self.projects_dict[prj] = [[s_name, manager, hr_list, p_per]]
-                else:
-                    self.projects_dict[prj].append([s_name, manager, hr_list, p_per])
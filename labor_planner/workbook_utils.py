@@ -7,6 +7,9 @@ Broadly used workbook utility functions.
 
 """
 
+from labor_planner.period_index import DESIGN_SLICES, design_period
+from labor_planner.pivot import quarter_labels
+
 
 def enable_formatting(in_workbook_instance):
     """Index options for preconfigured formatting:
@@ -74,28 +77,39 @@ def implement_design(design, in_list):
     :return:                    Truncated list based on the design type
 
     """
-    if design == 'full_year':
-        out_list = in_list
+    if design not in DESIGN_SLICES:
+        return []
 
-    elif design == 'quarter_2_3_4':
-        out_list = in_list[0:9]
+    return in_list[DESIGN_SLICES[design]]
 
-    elif design == 'quarter_2_3':
-        out_list = in_list[0:6]
 
-    elif design == 'quarter_2':
-        out_list = in_list[0:3]
+def write_quarter_headers(worksheet_instance, design, fy, row, first_col, format_type):
+    """Write a merged header over the month columns of each quarter of a design.
 
-    elif design == 'quarter_3_4_1':
-        out_list = in_list[-9:]
+    :param worksheet_instance:  xlsxwriter worksheet instance
+    :param design:              Run design name
+    :param fy:                  Two digit fiscal year as a string
+    :param row:                 Zero-based row of the headers
+    :param first_col:           Zero-based column of the first month of the design
+    :param format_type:         xlsxwriter format of the headers
+
+    """
+    labels = quarter_labels(fy, *design_period(design))
+
+    col = 0
+    while col < len(labels):
 
-    elif design == 'quarter_3_4':
-        out_list = in_list[3:9]
+        # months of the same quarter are consecutive
+        end = col
+        while end + 1 < len(labels) and labels[end + 1] == labels[col]:
+            end += 1
 
-    else:
-        out_list = []
+        if end == col:
+            worksheet_instance.write(row, first_col + col, labels[col], format_type)
+        else:
+            worksheet_instance.merge_range(row, first_col + col, row, first_col + end, labels[col], format_type)
 
-    return out_list
+        col = end + 1
 
 
 def set_merge_range(worksheet_instance, design, fiscal_year, start_row_num, format_type):
@@ -0,0 +1,236 @@
+"""workbook_validator.py
+
+Check staff labor planning workbooks for data problems without running the planner.
+
+@author Chris R. Vernon (chris.vernon@pnnl.gov)
+@license BSD 2-Clause
+
+"""
+
+import collections
+import concurrent.futures
+import csv
+import os
+
+import numpy as np
+from xlsxwriter.utility import xl_rowcol_to_cell
+
+from labor_planner import stream_reader
+from labor_planner.workbook_reader import (ReadWorkbooks, iter_workbook_blocks, hours_to_int, is_blank_sheet,
+                                           index_staff_rows, HOURS_START_ROW, HOURS_START_COL)
+
+
+# a single data problem; cell is an Excel reference such as 'E16'
+Problem = collections.namedtuple('Problem', ['file', 'sheet', 'cell', 'code', 'value', 'message'])
+
+# project identifier declared on a worksheet
+ProjectDeclaration = collections.namedtuple('ProjectDeclaration', ['file', 'sheet', 'cell', 'prj_id'])
+
+# header cells of the project, proposal, and work package numbers in order of precedence
+ID_CELLS = ((2, 1), (2, 5), (2, 9))
+
+# header cell of the funding probability
+PROBABILITY_CELL = (7, 1)
+
+MESSAGES = {'non_numeric_hours': 'Hours are not a number and are read as 0.',
+            'fractional_hours': 'Hours are not a whole number and are truncated.',
+            'string_probability': 'Funding probability is not a number and is read as 100%.',
+            'missing_project_id': 'No project, proposal, or work package number; an ID is made from the staff name.',
+            'duplicate_project_id': 'Project ID is also declared on another worksheet.',
+            'staff_above_hours': 'Staff name is above the staff rows that start on row {}; its hours are not '
+                                 'read.'.format(HOURS_START_ROW + 1)}
+
+REPORT_FIELDS = list(Problem._fields)
+
+
+def problem(in_file, sheet_name, row, col, code, value):
+    """Create a Problem for a zero-based cell position."""
+
+    return Problem(in_file, sheet_name, xl_rowcol_to_cell(row, col), code, value, MESSAGES[code])
+
+
+def check_hours(in_file, sheet_name, values, types, keep_rows):
+    """Find non-numeric and fractional hours in the hours block of a worksheet.
+
+    :param in_file:                     Full path with file name and extension to the staff workbook
+    :param sheet_name:                  Name of the worksheet
+    :param values:                      2-D array of hours cell values
+    :param types:                       2-D array of hours cell types
+    :param keep_rows:                   Boolean array of hours block rows that belong to roster staff
+
+    :return:                            List of Problem in row and column order
+
+    """
+    problems = []
+
+    types = types[keep_rows]
+    values = values[keep_rows]
+    rows = np.flatnonzero(keep_rows)
+
+    # numbers with a date format are read as hours
+    numeric = (types == stream_reader.XL_CELL_NUMBER) | (types == stream_reader.XL_CELL_DATE)
+    text = (types == stream_reader.XL_CELL_TEXT) & (values != '')
+    invalid = (types == stream_reader.XL_CELL_BOOLEAN) | (types == stream_reader.XL_CELL_ERROR)
+
+    # text is only a problem when it does not convert to an integer
+    for r, c in zip(*np.nonzero(text)):
+        try:
+            int(values[r, c])
+        except ValueError:
+            invalid[r, c] = True
+
+    fractional = np.zeros(numeric.shape, dtype=bool)
+    numbers = values[numeric].astype(np.float64)
+    fractional[numeric] = numbers != np.trunc(numbers)
+
+    for r, c in zip(*np.nonzero(invalid | fractional)):
+        code = 'non_numeric_hours' if invalid[r, c] else 'fractional_hours'
+        problems.append(problem(in_file, sheet_name, HOURS_START_ROW + rows[r], HOURS_START_COL + c, code,
+                                values[r, c]))
+
+    return problems
+
+
+def validate_workbook(in_file, staff_index, reader='xlrd'):
+    """Check a single staff workbook.  Used directly for serial runs and as the worker function when
+    workbooks are checked in parallel.
+
+    :param in_file:                     Full path with file name and extension to the staff workbook
+    :param staff_index:                 Dictionary of {staff_name: roster position}
+    :param reader:                      Reader backend; either 'xlrd' or 'stream'
+
+    :return:                            [0] list of Problem found in the workbook
+                                        [1] list of ProjectDeclaration for each worksheet with a project ID
+
+    """
+    problems = []
+    declarations = []
+
+    for sheet_name, (names, header, values, types) in iter_workbook_blocks(in_file, reader, staff_index):
+
+        hours = hours_to_int(values, types)
+
+        # roster names above the staff rows are not read by the planner
+        for nm, rows in index_staff_rows(names[:HOURS_START_ROW], staff_index).items():
+            problems.extend(problem(in_file, sheet_name, row, 0, 'staff_above_hours', nm) for row in rows)
+
+        # only rows of roster staff are read by the planner
+        keep_rows = np.zeros(values.shape[0], dtype=bool)
+        for rows in index_staff_rows(names[HOURS_START_ROW:], staff_index).values():
+            keep_rows[[r for r in rows if r < values.shape[0]]] = True
+
+        # hours that are not numbers are read as 0, so they are checked before a sheet is found to be blank
+        hours_problems = check_hours(in_file, sheet_name, values, types, keep_rows)
+
+        # only the hours of unused template sheets are checked
+        if is_blank_sheet(header, hours):
+            problems.extend(hours_problems)
+            continue
+
+        # project identifier used by the planner
+        for row, col in ID_CELLS:
+            if header[row, col] != '':
+                prj_id = ReadWorkbooks.type_tostring(header[row, col])
+                declarations.append(ProjectDeclaration(in_file, sheet_name, xl_rowcol_to_cell(row, col), prj_id))
+                break
+
+        else:
+            problems.append(problem(in_file, sheet_name, *ID_CELLS[0], 'missing_project_id', ''))
+
+        probability = header[PROBABILITY_CELL]
+        if isinstance(probability, str):
+            problems.append(problem(in_file, sheet_name, *PROBABILITY_CELL, 'string_probability', probability))
+
+        problems.extend(hours_problems)
+
+    return problems, declarations
+
+
+class ValidateWorkbooks(ReadWorkbooks):
+    """Check all staff workbooks for data problems that the planner would otherwise silently work around and
+    write them to a CSV report.  No Excel outputs are written.
+
+    Problems reported are non-numeric hours, fractional hours, non-numeric funding probabilities, worksheets
+    without a project identifier, staff names above the staff rows, and project identifiers declared on more
+    than one worksheet.
+
+    :param config_obj:                  YAML configuration object
+
+    Attributes:
+        problems (list):                List of Problem in file and worksheet order followed by duplicate
+                                        project identifiers
+
+    """
+
+    def __init__(self, config_obj):
+
+        # the roster and file list are set up without reading the staff workbooks into the hours cube
+        super().__init__(config_obj, ingest=False)
+
+        in_files = [os.path.join(self.my_settings.data_dir, f) for f in self.file_list if f[0] not in ("~", ".")]
+
+        self.problems = []
+        declarations = []
+
+        for file_problems, file_declarations in self.validate_workbooks(in_files):
+            self.problems.extend(file_problems)
+            declarations.extend(file_declarations)
+
+        self.problems.extend(self.check_duplicate_ids(declarations))
+
+        self.write_report(self.my_settings.out_validation_file)
+
+    def validate_workbooks(self, in_files):
+        """Check staff workbooks either serially or across a pool of worker processes.
+
+        :param in_files:                List of full paths to the staff workbooks.
+
+        :return:                        List of `validate_workbook` results in the same order as `in_files`.
+
+        """
+        if len(in_files) == 0:
+            return []
+
+        jobs = min(self.my_settings.jobs, len(in_files))
+
+        reader = self.my_settings.reader
+
+        if jobs <= 1:
+            return [validate_workbook(f, self.staff_index, reader) for f in in_files]
+
+        n_files = len(in_files)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(validate_workbook, in_files, [self.staff_index] * n_files,
+                                     [reader] * n_files))
+
+    @staticmethod
+    def check_duplicate_ids(declarations):
+        """Find project identifiers declared on more than one worksheet.
+
+        :param declarations:            List of ProjectDeclaration in file and sheet order
+
+        :return:                        List of Problem for every declaration after the first
+
+        """
+        seen = set()
+        problems = []
+
+        for d in declarations:
+            if d.prj_id in seen:
+                problems.append(Problem(d.file, d.sheet, d.cell, 'duplicate_project_id', d.prj_id,
+                                        MESSAGES['duplicate_project_id']))
+            seen.add(d.prj_id)
+
+        return problems
+
+    def write_report(self, out_file):
+        """Write problems to a CSV file with one row per problem.
+
+        :param out_file:                Full path with file name and extension to the output CSV file
+
+        """
+        with open(out_file, 'w', newline='') as dst:
+            writer = csv.writer(dst)
+            writer.writerow(REPORT_FIELDS)
+            writer.writerows(self.problems)